@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
 import re
 import urllib.request
 from datetime import datetime
@@ -32,13 +33,13 @@ from .storage.db_writer import db_writer
 from .storage.models import IndexJob, RawMessage
 from .storage.repositories.index_jobs_repo import IndexJobRepository
 from .storage.repositories.media_cache_repo import MediaCacheRepository
-from .storage.repositories.profile_repo import ProfileRepository
 from .storage.repositories.raw_repo import RawRepository
 from .storage.migrations_runner import run_migrations
 from .storage.sqlalchemy_engine import engine
 from .stickers.selector import StickerSelector
 from .stickers.stealer import StickerStealer
 from .stickers.registry import StickerRegistry
+from .stickers.phash_index import phash_index
 from .summary.summary_manager import SummaryManager
 from .vector.qdrant_client import qdrant_manager
 from .workers.index_worker import index_worker
@@ -50,6 +51,7 @@ from .llm.vision import VisionHelper
 from .paths import assets_dir
 from .storage.write_jobs import AddIndexJobJob
 from .storage.write_jobs import AsyncCallableJob
+from .storage.write_jobs import IncrementEffectiveCountJob
 from .tools.adaptive_debouncer import AdaptiveDebouncer
 from .media_mime import is_remote_gif, looks_like_gif_path, looks_like_gif_ref
 
@@ -104,8 +106,8 @@ async def _build_recent_dialogue(
 
     try:
         # 取比 max_lines 稍多的窗口，避免过滤 current 后不足
-        recent = await RawRepository.get_recent_by_scene(scene_type, scene_id, limit=max(30, max_lines + 5))
-        # get_recent_by_scene 是倒序，反转成时间顺序
+        recent = await RawRepository.get_recent_rows_by_scene(scene_type, scene_id, limit=max(30, max_lines + 5))
+        # get_recent_rows_by_scene 是倒序，反转成时间顺序
         recent = list(reversed(recent))
         # 只取当前消息之前的若干条，避免重复“用户消息”
         prev = [m for m in recent if int(getattr(m, "id", 0)) < int(current_raw_msg_id)]
@@ -292,7 +294,7 @@ async def _collect_llm_history_image_inputs(
 
     # 2) 历史图片（从当前消息之前开始，时间倒序）
     try:
-        recent = await RawRepository.get_recent_by_scene(
+        recent = await RawRepository.get_recent_rows_by_scene(
             scene_type,
             scene_id,
             limit=max(50, max_images * 20),
@@ -539,8 +541,18 @@ async def _download_and_steal(
         dst = tmp_dir / f"{media_key}.img"
 
         def _download() -> None:
-            """下载图片到临时路径。"""
-            urllib.request.urlretrieve(url, str(dst))  # nosec - 运行时受配置控制
+            """下载图片到临时路径。
+
+            先写入 `.part` 再原子替换：晋升时 auto 包文件可能与 dst 共享 inode（硬链接），
+            原地截断重写会短暂破坏已入库的表情包文件。下载/替换失败时删除残留的 `.part`。
+            """
+            part = dst.with_name(dst.name + ".part")
+            try:
+                urllib.request.urlretrieve(url, str(part))  # nosec - 运行时受配置控制
+                os.replace(part, dst)
+            except BaseException:
+                part.unlink(missing_ok=True)
+                raise
 
         await asyncio.to_thread(_download)
         await StickerStealer.process_image(
@@ -608,6 +620,14 @@ async def startup() -> None:
             logger.error(f"初始化数据库失败：{exc2}")
             raise
 
+    # 1.1) 回收上次进程退出时仍处于 processing 的任务（须在 worker 启动前执行）
+    try:
+        requeued = await IndexJobRepository.requeue_processing()
+        if requeued:
+            logger.info(f"已将 {requeued} 个遗留的 processing 任务放回队列。")
+    except Exception as exc:
+        logger.warning(f"回收遗留 processing 任务失败，将继续启动：{exc}")
+
     # 2) 初始化向量库（失败允许降级）
     await qdrant_manager.init_collections()
 
@@ -625,6 +645,12 @@ async def startup() -> None:
     except Exception as exc:
         logger.warning(f"扫描本地表情包失败，将继续启动：{exc}")
 
+    # 5.1) 载入表情包 pHash 内存索引（用于近似重复检测，失败允许降级）
+    try:
+        await phash_index.load()
+    except Exception as exc:
+        logger.warning(f"载入表情包 pHash 索引失败，将继续启动：{exc}")
+
     # 6) 初始化定时任务
     init_scheduler()
 
@@ -825,7 +851,7 @@ async def _process_normalized(bot: Bot, normalized: NormalizedMessage) -> None:
     # 5) 有效发言计数与记忆触发点
     if normalized.is_effective:
         await db_writer.submit_and_wait(
-            AsyncCallableJob(ProfileRepository.increment_effective_count, args=(normalized.qq_id,)),
+            IncrementEffectiveCountJob(normalized.qq_id),
             priority=5,
         )
         await MemoryManager.mark_pending_if_needed(normalized.qq_id)
@@ -523,6 +523,20 @@ class Config(BaseModel):
     #   当多个任务同时写入时,后来的任务需要等待
     #   这个参数控制等待多久后放弃
 
+    yuying_db_writer_queue_maxsize: int = Field(default=1024, alias="db_writer_queue_maxsize")
+    # DBWriter写入队列容量上限
+    # - 作用: 排队中的写入任务超过此数量时,提交方等待(背压),避免内存无限增长
+    # - 单位: 个(任务数)
+    # - 默认值: 1024
+    # - 说明: 设为0表示不限制
+
+    yuying_db_writer_batch_linger_ms: int = Field(default=5, alias="db_writer_batch_linger_ms")
+    # DBWriter合并写入的等待窗口
+    # - 作用: 取到可合并任务而队列已空时,最多再等这么久收集后续任务,合并为一次提交
+    # - 单位: 毫秒(ms)
+    # - 默认值: 5
+    # - 说明: 设为0表示不等待,只合并已在排队的任务;调大可减少提交次数,但会增加写入延迟
+
     # ==================== 向量库配置 ====================
 
     yuying_qdrant_host: str = Field(default="localhost", alias="qdrant_host")
@@ -578,6 +592,15 @@ class Config(BaseModel):
     # - 作用: StickerWorker 同时处理多少条 sticker_tag 任务
     # - 默认值: 1（串行，最稳）
     # - 建议: 2~4（取决于 LLM 限流与网络）
+
+    yuying_sticker_steal_max_concurrency: int = Field(
+        default=8,
+        alias="sticker_steal_max_concurrency",
+    )
+    # 表情包学习（偷图）并发上限
+    # - 作用: 同时执行 StickerStealer.process_image 的图片数量（图片解码 + OCR + 写库）
+    # - 默认值: 8
+    # - 说明: 超出上限的图片排队处理，刷图时避免内存与 OCR 请求暴涨
     # - 警告: 设为True会丢失所有向量数据!
 
     yuying_retrieval_topk: int = Field(default=5, alias="retrieval_topk")
@@ -918,6 +941,21 @@ class Config(BaseModel):
     # - 默认值: 3
     # - 说明: 由LLM评估图片是否适合做表情包
 
+    yuying_sticker_content_hash: str = Field(default="sha256", alias="sticker_content_hash")
+    # 自动学习表情包的文件标识哈希算法
+    # - 作用: 计算新学习表情包的sticker_id与文件名
+    # - 可选值: "sha256"(默认), "blake3"(需安装 speedups 可选依赖,未安装时回退sha256)
+    # - 说明: 两者均为64个十六进制字符;切换只影响之后新学习的表情包,已入库的sticker_id不变
+    # - 注意: 切换为blake3后,同一图片的新旧标识不同,重复检测依赖fingerprint与pHash近似检测
+
+    yuying_sticker_phash_near_dup_distance: int = Field(default=6, alias="sticker_phash_near_dup_distance")
+    # 表情包近似重复判定的pHash汉明距离阈值
+    # - 作用: 新图片与正式库某个表情包的pHash距离 ≤ 此值时,视为已收录,跳过学习
+    # - 单位: 比特(64位pHash中不同的位数)
+    # - 默认值: 6
+    # - 说明: 0表示仅pHash完全相同才跳过;设为负数禁用近似检测
+    # - 建议: 4-10之间,过大会误把不同表情包当成同一个
+
     yuying_sticker_use_semantic_search: bool = Field(default=True, alias="sticker_use_semantic_search")
     # 是否启用表情包语义检索
     # - 作用: 控制是否使用向量语义检索替代传统 intent+SQL 匹配
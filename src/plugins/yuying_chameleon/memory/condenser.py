@@ -169,11 +169,11 @@ class MemoryCondenser:
 
         # ==================== 步骤3: 查询所有过期的active记忆 ====================
 
-        # await MemoryRepository.get_expired_active(current_ts): 查询过期记忆
+        # MemoryRepository.iter_expired_active(current_ts): 流式查询过期记忆
         # - 参数: 当前时间戳
         # - SQL逻辑: WHERE tier='active' AND created_at + ttl_days * 86400 < current_ts
-        # - 返回: Memory对象列表
-        expired_memories = await MemoryRepository.get_expired_active(current_ts)
+        # - 返回: 异步迭代器,按批(200行)从游标读取,不一次性加载全部过期记忆
+        # - 读游标在 WAL 模式下是独立快照,遍历期间 DBWriter 的归档写入不影响本次结果
 
         # ==================== 步骤4: 归档过期记忆并收集用户 ====================
 
@@ -183,16 +183,17 @@ class MemoryCondenser:
         users_to_process = set()
 
         # 遍历所有过期记忆
-        for mem in expired_memories:
+        async for mem in MemoryRepository.iter_expired_active(current_ts):
             # ==================== 步骤4.1: 归档单条记忆 ====================
 
             # await db_writer.submit_and_wait(): 提交写入任务并等待完成
             # AsyncCallableJob: 异步可调用任务
-            # MemoryRepository.archive_memory(mem.id): 将记忆归档
+            # MemoryRepository.archive_memory(mem.id, current_ts): 将记忆归档
+            # - 本轮所有归档共用同一个 current_ts 作为 updated_at
             # - 操作: UPDATE memories SET tier='archive' WHERE id=mem.id
             # - 效果: 记忆从active层移到archive层
             await db_writer.submit_and_wait(
-                AsyncCallableJob(MemoryRepository.archive_memory, args=(mem.id,)),
+                AsyncCallableJob(MemoryRepository.archive_memory, args=(mem.id, current_ts)),
                 priority=5,  # 优先级5(中等)
             )
 
@@ -89,6 +89,14 @@ from typing import Dict, Optional, Tuple  # 类型提示
 from ..adapters.lagrange_parser import InboundMessage  # 入站消息类型
 from ..storage.repositories.media_cache_repo import MediaCacheRepository  # 媒体缓存仓库
 
+# 原始图片标记 [image:引用]：每条入站消息都要解析，模块加载时编译一次
+# - \[image:: 匹配"[image:"(转义左括号)
+# - (?P<ref>[^\]]+): 命名捕获组"ref",1个或多个非右方括号字符(引用内容)
+# - \]: 匹配右方括号(转义)
+# - 示例: "[image:http://example.com/cat.jpg]" → ref="http://example.com/cat.jpg"
+_IMAGE_REF_RE = re.compile(r"\[image:(?P<ref>[^\]]+)\]")
+
+
 @dataclass
 class NormalizedMessage:
     """归一化后的消息结构 - 统一的内部消息格式
@@ -659,18 +667,7 @@ class Normalizer:
             # 2
         """
 
-        # ==================== 步骤1: 编译正则表达式 ====================
-
-        # re.compile(r"\[image:(?P<ref>[^\]]+)\]"): 编译正则
-        # - 正则: \[image:(?P<ref>[^\]]+)\]
-        #   * \[image:: 匹配"[image:"(转义左括号)
-        #   * (?P<ref>...): 命名捕获组"ref"
-        #   * [^\]]+: 匹配1个或多个非右方括号字符(引用内容)
-        #   * \]: 匹配右方括号(转义)
-        # - 示例: [image:http://example.com/cat.jpg]
-        #   * 匹配整体: "[image:http://example.com/cat.jpg]"
-        #   * 捕获"ref": "http://example.com/cat.jpg"
-        pattern = re.compile(r"\[image:(?P<ref>[^\]]+)\]")
+        # ==================== 步骤1: 初始化映射 ====================
 
         # mapping: 存储{原始引用: media_key}映射
         mapping: Dict[str, str] = {}
@@ -766,9 +763,9 @@ class Normalizer:
         # last: 上次匹配结束的位置
         last = 0
 
-        # pattern.finditer(text): 迭代所有匹配
+        # _IMAGE_REF_RE.finditer(text): 迭代所有匹配
         # - 返回: 迭代器,每次yield一个Match对象
-        for m in pattern.finditer(text):
+        for m in _IMAGE_REF_RE.finditer(text):
             # ==================== 步骤3.1: 添加匹配前的文本 ====================
 
             # text[last : m.start()]: 上次匹配结束到本次匹配开始的文本
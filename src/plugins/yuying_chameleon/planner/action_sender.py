@@ -16,13 +16,11 @@ from ..policy.gatekeeper import Gatekeeper
 from ..stickers.selector import StickerSelector  # 传统 SQL selector（降级用）
 from ..stickers.semantic_selector import StickerSemanticSelector  # 语义检索 selector
 from ..stickers.sender import StickerSender
-from ..storage.models import RawMessage
 from ..storage.models import IndexJob
 from ..storage.repositories.index_jobs_repo import IndexJobRepository
 from ..storage.repositories.raw_repo import RawRepository
-from ..storage.repositories.sticker_usage_repo import StickerUsageRepository
 from ..storage.db_writer import db_writer
-from ..storage.write_jobs import AsyncCallableJob
+from ..storage.write_jobs import AddStickerUsageJob
 
 
 class ActionSender:
@@ -235,11 +233,7 @@ class ActionSender:
 
                 # 记录使用情况（用于 cooldown）
                 await db_writer.submit(
-                    AsyncCallableJob(
-                        StickerUsageRepository.add_usage,
-                        args=(sticker.sticker_id, scene_type, scene_id),
-                        kwargs={"qq_id": str(bot.self_id)},
-                    ),
+                    AddStickerUsageJob(sticker.sticker_id, scene_type, scene_id, qq_id=str(bot.self_id)),
                     priority=5,
                 )
 
@@ -286,20 +280,24 @@ class ActionSender:
         """
 
         try:
-            msg = RawMessage(
-                qq_id=bot_id,
-                scene_type=scene_type,
-                scene_id=scene_id,
-                timestamp=int(time.time()),
-                onebot_message_id=onebot_message_id,
-                msg_type=msg_type,
-                content=content,
-                raw_ref=None,
-                reply_to_msg_id=reply_to_onebot_message_id,
-                mentioned_bot=False,
-                is_effective=False,
-                is_bot=True,
+            # 留痕无需回读 id：走 Core INSERT，免去 ORM 实例构造与工作单元开销
+            await RawRepository.add_many(
+                [
+                    {
+                        "qq_id": bot_id,
+                        "scene_type": scene_type,
+                        "scene_id": scene_id,
+                        "timestamp": int(time.time()),
+                        "onebot_message_id": onebot_message_id,
+                        "msg_type": msg_type,
+                        "content": content,
+                        "raw_ref": None,
+                        "reply_to_msg_id": reply_to_onebot_message_id,
+                        "mentioned_bot": False,
+                        "is_effective": False,
+                        "is_bot": True,
+                    }
+                ]
             )
-            await RawRepository.add(msg)
         except Exception as exc:
             logger.debug(f"写入机器人消息失败，将降级继续：{exc}")
@@ -91,7 +91,7 @@ from ..llm.flow_decider import nano_should_reply_yes_no  # 心流模式：nano y
 from ..storage.repositories.rate_limit_repo import RateLimitRepository  # 冷却状态仓库
 from ..storage.repositories.raw_repo import RawRepository  # 原始消息仓库
 from ..storage.db_writer import db_writer  # 数据库写入队列
-from ..storage.write_jobs import AsyncCallableJob  # 异步任务
+from ..storage.write_jobs import MarkSentJob  # 可合并写入任务
 
 
 class Gatekeeper:
@@ -560,7 +560,7 @@ class Gatekeeper:
             # 步骤6: 获取最近消息作为上下文
             recent_lines: list[str] = []
             try:
-                recent_msgs = await RawRepository.get_recent_by_scene(
+                recent_msgs = await RawRepository.get_recent_rows_by_scene(
                     scene_type, scene_id, limit=15  # 多取几条以备过滤
                 )
                 # 过滤并构建上下文(排除当前消息,按时间正序)
@@ -794,19 +794,11 @@ class Gatekeeper:
         # ==================== 步骤2: 更新冷却状态 ====================
 
         # await db_writer.submit_and_wait(): 提交写入任务并等待完成
-        # AsyncCallableJob: 异步可调用任务
+        # MarkSentJob: 可合并写入任务,与相邻的同类写入共用一次 commit
+        # - 效果: INSERT INTO bot_rate_limit ... ON CONFLICT(scene_type, scene_id)
+        #         DO UPDATE SET cooldown_until_ts=当前时间+冷却秒数, recent_bot_msg_count+1
         await db_writer.submit_and_wait(
-            AsyncCallableJob(
-                # RateLimitRepository.mark_sent: 标记发送方法
-                # - 参数: scene_type, scene_id
-                # - kwargs: cooldown_seconds=冷却秒数
-                # - 效果: UPDATE rate_limits
-                #         SET cooldown_until_ts=当前时间+冷却秒数
-                #         WHERE scene_type=? AND scene_id=?
-                RateLimitRepository.mark_sent,
-                args=(scene_type, scene_id),
-                kwargs={"cooldown_seconds": cooldown_seconds},
-            ),
+            MarkSentJob(scene_type, scene_id, cooldown_seconds),
             priority=5,  # 优先级5(中等)
         )
 
@@ -77,6 +77,8 @@ prompt = f\"\"\"
 
 from __future__ import annotations
 
+import asyncio
+import re  # Python标准库,用于正则匹配
 from datetime import datetime
 from typing import Any, Dict, List, Optional  # 类型提示
 
@@ -90,9 +92,15 @@ from ..storage.models import Memory  # 记忆模型
 from ..storage.repositories.raw_repo import RawRepository  # 原始消息仓库
 from ..storage.repositories.media_cache_repo import MediaCacheRepository  # 媒体缓存仓库
 from ..storage.repositories.summary_repo import SummaryRepository  # 摘要仓库
+from ..storage.sqlalchemy_engine import gather_reads  # 并发读查询
 from ..vector.embedder import embedder  # 向量化客户端
 from ..vector.qdrant_client import qdrant_manager  # Qdrant客户端
 
+# 图片占位符 [image:media_key] / [image:media_key:caption]：模块加载时编译一次
+# - (?P<key>[0-9a-f]{12}): 命名捕获组"key",匹配12位十六进制字符
+# - (?::(?P<cap>[^\]]+))?: 可选的caption部分(冒号后任意非]字符,命名捕获组"cap")
+_IMAGE_PLACEHOLDER_RE = re.compile(r"\[image:(?P<key>[0-9a-f]{12})(?::(?P<cap>[^\]]+))?\]")
+
 
 class Retriever:
     """RAG检索器 - 负责上下文检索和记忆选择
@@ -156,30 +164,16 @@ class Retriever:
             # "你看[image:abc123:一只猫]和[image:def456:一只狗]"
         """
 
-        # ==================== 步骤1: 导入正则表达式模块 ====================
-        import re  # Python标准库,用于正则匹配
-
-        # ==================== 步骤2: 空值检查 ====================
+        # ==================== 步骤1: 空值检查 ====================
         if not text:  # 如果文本为空或None
             return text  # 直接返回,无需处理
 
-        # ==================== 步骤3: 定义占位符的正则表达式 ====================
-
-        # 占位符格式: [image:media_key] 或 [image:media_key:caption]
-        # - (?P<key>[0-9a-f]{12}): 命名捕获组"key",匹配12位十六进制字符
-        # - (?::(?P<cap>[^\]]+))?: 可选的caption部分
-        #   * (?:...): 非捕获组
-        #   * ::  匹配冒号
-        #   * (?P<cap>[^\]]+): 命名捕获组"cap",匹配任意非]字符
-        #   * ?: 整个caption部分是可选的
-        pattern = re.compile(r"\[image:(?P<key>[0-9a-f]{12})(?::(?P<cap>[^\]]+))?\]")
-
-        # ==================== 步骤4: 提取所有需要查询的media_key ====================
+        # ==================== 步骤2: 提取所有需要查询的media_key ====================
 
         keys: List[str] = []  # 需要查询caption的key列表
 
-        # pattern.finditer(text): 遍历text中所有匹配的占位符
-        for m in pattern.finditer(text):
+        # _IMAGE_PLACEHOLDER_RE.finditer(text): 遍历text中所有匹配的占位符
+        for m in _IMAGE_PLACEHOLDER_RE.finditer(text):
             # m.group("cap"): 获取caption捕获组的内容
             if m.group("cap"):  # 如果已有caption
                 continue  # 跳过,不需要查询
@@ -187,11 +181,11 @@ class Retriever:
             # m.group("key"): 获取media_key捕获组的内容
             keys.append(m.group("key"))  # 添加到待查询列表
 
-        # ==================== 步骤5: 如果没有需要处理的图片,直接返回 ====================
+        # ==================== 步骤3: 如果没有需要处理的图片,直接返回 ====================
         if not keys:  # 如果列表为空
             return text  # 无需查询,直接返回原文本
 
-        # ==================== 步骤6: 去重并限制数量 ====================
+        # ==================== 步骤4: 去重并限制数量 ====================
 
         # 去重: 保持原顺序的去重
         uniq = []  # 去重后的key列表
@@ -204,33 +198,30 @@ class Retriever:
         # 原因: 避免一次查询过多MediaCache记录,影响性能
         uniq = uniq[:3]
 
-        # ==================== 步骤7: 批量查询MediaCache获取caption ====================
+        # ==================== 步骤5: 批量查询MediaCache获取caption ====================
 
         captions: Dict[str, str] = {}  # key → caption的映射
 
-        # 遍历去重后的key列表
-        for k in uniq:
-            try:
-                # await MediaCacheRepository.get(k): 查询MediaCache表
-                # 参数: media_key
-                # 返回: MediaCache对象或None
-                cached = await MediaCacheRepository.get(k)
-
-                # cached.caption: 图片的说明文本
-                if cached and cached.caption:  # 如果记录存在且有caption
-                    # .strip(): 去除首尾空格
-                    captions[k] = cached.caption.strip()
-
-            except Exception:
-                # 查询失败: 数据库错误、表不存在等
-                # 静默忽略,继续处理下一个
+        # gather_reads(): 各key的查询互不依赖,并发执行
+        # - return_exceptions=True: 单个查询失败(数据库错误等)只返回异常对象,不影响其它key
+        results = await gather_reads(
+            *(MediaCacheRepository.get(k) for k in uniq),
+            return_exceptions=True,
+        )
+        for k, cached in zip(uniq, results, strict=True):
+            if isinstance(cached, BaseException):
+                # 查询失败: 静默忽略,继续处理下一个
                 continue
+            # cached.caption: 图片的说明文本
+            if cached and cached.caption:  # 如果记录存在且有caption
+                # .strip(): 去除首尾空格
+                captions[k] = cached.caption.strip()
 
-        # ==================== 步骤8: 如果没有查到任何caption,直接返回 ====================
+        # ==================== 步骤6: 如果没有查到任何caption,直接返回 ====================
         if not captions:  # 如果字典为空
             return text  # 无法增强,返回原文本
 
-        # ==================== 步骤9: 定义替换函数 ====================
+        # ==================== 步骤7: 定义替换函数 ====================
 
         def repl(match: re.Match) -> str:
             """正则替换的回调函数
@@ -263,12 +254,12 @@ class Retriever:
             # 构建新的占位符: [image:key:caption]
             return f"[image:{key}:{short}]"
 
-        # ==================== 步骤10: 执行正则替换 ====================
+        # ==================== 步骤8: 执行正则替换 ====================
 
-        # pattern.sub(repl, text): 用repl函数替换text中所有匹配
+        # _IMAGE_PLACEHOLDER_RE.sub(repl, text): 用repl函数替换text中所有匹配
         # - 对每个匹配调用repl(match)
         # - 用返回值替换原匹配字符串
-        return pattern.sub(repl, text)
+        return _IMAGE_PLACEHOLDER_RE.sub(repl, text)
 
     @staticmethod
     async def build_hybrid_query(
@@ -359,18 +350,18 @@ class Retriever:
         # ==================== 步骤4: 查询最近消息 ====================
 
         try:
-            # await RawRepository.get_recent_by_scene(): 查询场景的最近消息
+            # await RawRepository.get_recent_rows_by_scene(): 查询场景的最近消息(只读行)
             # 参数:
             # - scene_type: 场景类型
             # - scene_id: 场景标识
             # - limit: 查询最近N条消息(可配置)
-            # 返回: RawMessage对象列表,按时间倒序(最新在前)
+            # 返回: Row列表(可按属性名访问 content/qq_id/is_bot 等),按时间倒序(最新在前)
             limit = int(getattr(plugin_config, "yuying_hybrid_query_recent_messages_limit", 30) or 30)
             if limit < 5:
                 limit = 5
             if limit > 200:
                 limit = 200
-            recent = await RawRepository.get_recent_by_scene(scene_type, scene_id, limit=limit)
+            recent = await RawRepository.get_recent_rows_by_scene(scene_type, scene_id, limit=limit)
 
             # ==================== 步骤5: 遍历最近消息,提取有用上下文 ====================
 
@@ -416,14 +407,16 @@ class Retriever:
 
         if recent_user_texts:  # 如果有用户最近消息
             # 增强图片占位符
-            # [await Retriever._enrich_images(t) for t in recent_user_texts[:N]]:
-            # - 列表推导式
-            # - 对每条消息调用_enrich_images
+            # asyncio.gather(*(Retriever._enrich_images(t) for t in recent_user_texts[:N])):
+            # - 对每条消息调用_enrich_images,各条互不依赖,并发执行(结果保持原顺序)
             # - [:N]: 最多取前N条
+            # - 这里用 asyncio.gather 而非 gather_reads: _enrich_images 内部已用 gather_reads 限流
             user_limit = int(getattr(plugin_config, "yuying_hybrid_query_recent_user_messages_limit", 3) or 3)
             if user_limit < 0:
                 user_limit = 0
-            enriched = [await Retriever._enrich_images(t) for t in recent_user_texts[:user_limit]]
+            enriched = list(
+                await asyncio.gather(*(Retriever._enrich_images(t) for t in recent_user_texts[:user_limit]))
+            )
 
             # " / ".join(enriched): 用" / "连接多条消息
             # 例如: "消息1 / 消息2 / 消息3"
@@ -2,15 +2,61 @@
 
 from __future__ import annotations
 
-from nonebot import require
+import time
+from typing import Awaitable, Callable, cast
+
+from nonebot import logger, require
 require("nonebot_plugin_apscheduler")
 from nonebot_plugin_apscheduler import scheduler
 from ..memory.condenser import MemoryCondenser
 from src.plugins.yuying_chameleon.personality.reflection_service import PersonalityReflectionService
 from ..config import plugin_config
+from ..storage.db_writer import db_writer
+from ..storage.repositories.index_jobs_repo import IndexJobRepository
+from ..storage.repositories.sticker_usage_repo import StickerUsageRepository
+from ..storage.write_jobs import AsyncCallableJob
 
 _inited = False
 
+# 保留期（与 models 中 IndexJob / StickerUsage 文档的清理策略一致）
+_INDEX_JOB_RETENTION_DAYS = 7
+_STICKER_USAGE_RETENTION_DAYS = 90
+
+# 单批删除行数：每批一个短事务，批间让出 DBWriter 给其它写入
+_PURGE_BATCH = 5000
+
+async def _purge_in_batches(purge: Callable[..., Awaitable[int]], before_ts: int) -> int:
+    """经 DBWriter 分批调用 purge，直到某批删除 0 行；返回删除总数。"""
+
+    total = 0
+    while True:
+        deleted = cast(
+            int,
+            await db_writer.submit_and_wait(
+                AsyncCallableJob(purge, args=(before_ts,), kwargs={"batch": _PURGE_BATCH}),
+                priority=8,
+            ),
+        )
+        total += deleted
+        if not deleted:
+            return total
+
+async def purge_old_records() -> None:
+    """清理过期的已结束索引任务与表情包使用记录，避免表与索引无限增长。"""
+
+    now_ts = int(time.time())
+    try:
+        jobs = await _purge_in_batches(
+            IndexJobRepository.purge_finished, now_ts - _INDEX_JOB_RETENTION_DAYS * 86400
+        )
+        usages = await _purge_in_batches(
+            StickerUsageRepository.purge_before, now_ts - _STICKER_USAGE_RETENTION_DAYS * 86400
+        )
+    except Exception as exc:
+        logger.warning(f"过期记录清理失败：{exc}")
+        return
+    logger.info(f"过期记录清理完成：index_jobs={jobs} sticker_usage={usages}")
+
 def init_scheduler() -> None:
     """初始化定时任务。"""
 
@@ -42,3 +88,15 @@ def init_scheduler() -> None:
         coalesce=True,
         misfire_grace_time=3600,
     )
+
+    # 每日 05:00 清理过期的已结束索引任务与表情包使用记录
+    scheduler.add_job(
+        purge_old_records,
+        "cron",
+        hour=5,
+        minute=0,
+        id="daily_purge_old_records",
+        replace_existing=True,
+        coalesce=True,
+        misfire_grace_time=3600,
+    )
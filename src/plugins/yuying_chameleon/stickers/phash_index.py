@@ -0,0 +1,168 @@
+"""表情包pHash内存索引 - 基于汉明距离的近似重复检测
+
+这个模块的作用:
+1. 启动时将正式库(Stickers表)所有表情包的pHash载入内存(uint64数组)
+2. 对新图片的pHash做向量化XOR+popcount,求与库内最近的汉明距离
+3. 距离 ≤ 阈值视为"已入库的同一表情包",stealer直接跳过(无需OCR/查库)
+4. 同时记录全部sticker_id,"确定不在库中"时省去get_by_id查询
+
+为什么需要近似检测?
+- fingerprint聚合只认"完全相等"的pHash
+- 同一表情包经过不同压缩/缩放,pHash常有1~几位差异
+- 这些版本会各自成为候选,永远无法合并
+- 汉明距离 ≤ 6(64位中) 是pHash近似重复判定的常用经验阈值
+
+性能说明:
+- 1万条pHash = 80KB连续内存,一次向量化扫描 < 1ms
+- 相比SQL精确查询,无磁盘I/O且能容忍少量比特差异
+- 安装可选依赖numba时(pip install .[speedups]),使用JIT编译的融合循环:
+  XOR+popcount逐元素完成,不分配中间数组,命中距离0时提前结束
+
+使用方式:
+```python
+from .stickers.phash_index import phash_index
+
+await phash_index.load()                    # 启动时载入
+dist = phash_index.min_distance("a1b2...")  # None表示索引为空
+phash_index.may_contain_id("1234...")       # False表示确定不在库中
+phash_index.add("1234...", "a1b2...")       # 新表情包入库后追加
+```
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np  # imagehash的依赖,向量化计算
+from nonebot import logger
+
+from ..storage.repositories.sticker_repo import StickerRepository
+
+try:
+    # numba: 可选依赖(JIT编译热循环,未安装时使用NumPy向量化实现)
+    import numba  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    numba = None
+
+
+def _phash_to_uint64(phash: str) -> Optional[int]:
+    """将16位十六进制pHash字符串转为64位无符号整数,非法值返回None"""
+
+    try:
+        value = int(phash, 16)
+    except (TypeError, ValueError):
+        return None
+    # 仅接受64位pHash(imagehash默认hash_size=8)
+    if value < 0 or value >= 1 << 64:
+        return None
+    return value
+
+
+def _popcount_u64(arr: np.ndarray) -> np.ndarray:
+    """逐元素统计uint64数组中1的个数"""
+
+    # np.bitwise_count: NumPy 2.0+ 原生popcount
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(arr)
+    # 兼容旧版NumPy: 按字节展开为比特再求和
+    return np.unpackbits(arr.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+def _min_hamming_loop(arr: np.ndarray, value: np.uint64) -> int:
+    """最小汉明距离的标量循环实现(仅供numba编译,纯Python下远慢于NumPy向量化)"""
+
+    best = 64
+    m1 = np.uint64(0x5555555555555555)
+    m2 = np.uint64(0x3333333333333333)
+    m4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+    h01 = np.uint64(0x0101010101010101)
+    for i in range(arr.shape[0]):
+        # SWAR popcount: LLVM会将该模式识别为单条POPCNT指令
+        x = arr[i] ^ value
+        x = x - ((x >> np.uint64(1)) & m1)
+        x = (x & m2) + ((x >> np.uint64(2)) & m2)
+        x = (x + (x >> np.uint64(4))) & m4
+        d = int((x * h01) >> np.uint64(56))
+        if d < best:
+            best = d
+            if best == 0:
+                break
+    return best
+
+
+# numba.njit(cache=True): 首次调用时编译并缓存到__pycache__
+_min_hamming_jit = numba.njit(cache=True)(_min_hamming_loop) if numba is not None else None
+
+
+class PhashIndex:
+    """正式表情包pHash的内存索引(汉明距离近似检索)
+
+    设计说明:
+    - 数据: 一个np.uint64数组,追加时整体重建(入库频率很低)
+    - 去重: 用集合记录已收录的值,避免重复追加
+    - sticker_id: 精确集合(1万条约1MB),无误判,无需布隆过滤器
+    - 并发: 仅在事件循环线程中读写,无需加锁
+    """
+
+    def __init__(self) -> None:
+        """初始化空索引"""
+
+        self._values: set[int] = set()
+        self._arr: np.ndarray = np.empty(0, dtype=np.uint64)
+        self._sticker_ids: set[str] = set()
+        self._loaded = False
+
+    def __len__(self) -> int:
+        """索引中的pHash数量"""
+
+        return int(self._arr.size)
+
+    async def load(self) -> None:
+        """从Stickers表载入全部sticker_id与pHash(启动时调用,可重复调用以刷新)"""
+
+        rows = await StickerRepository.list_ids_and_phashes()
+        values = {v for v in (_phash_to_uint64(p) for _, p in rows if p) if v is not None}
+        self._values = values
+        self._arr = np.fromiter(values, dtype=np.uint64, count=len(values))
+        self._sticker_ids = {sid for sid, _ in rows}
+        self._loaded = True
+        logger.info(f"表情包pHash索引已载入：{len(self._sticker_ids)} 个表情包，{len(self._arr)} 条pHash")
+
+    def may_contain_id(self, sticker_id: str) -> bool:
+        """sticker_id是否可能已在正式库中
+
+        Returns:
+            bool: False表示确定不在库中(可跳过查库);
+                  True表示在集合中或索引尚未载入,需要以数据库为准
+        """
+
+        return not self._loaded or sticker_id in self._sticker_ids
+
+    def add(self, sticker_id: str, phash: Optional[str]) -> None:
+        """追加一个表情包(新表情包入库后调用)"""
+
+        self._sticker_ids.add(sticker_id)
+        value = _phash_to_uint64(phash) if phash else None
+        if value is None or value in self._values:
+            return
+        self._values.add(value)
+        self._arr = np.append(self._arr, np.uint64(value))
+
+    def min_distance(self, phash: str) -> Optional[int]:
+        """返回与索引内最近pHash的汉明距离
+
+        Returns:
+            Optional[int]: 最小汉明距离(0-64);索引为空或pHash非法时返回None
+        """
+
+        value = _phash_to_uint64(phash)
+        if value is None or not self._arr.size:
+            return None
+        if _min_hamming_jit is not None:
+            return int(_min_hamming_jit(self._arr, np.uint64(value)))
+        dists = _popcount_u64(np.bitwise_xor(self._arr, np.uint64(value)))
+        return int(dists.min())
+
+
+# 全局实例
+phash_index = PhashIndex()
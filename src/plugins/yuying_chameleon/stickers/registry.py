@@ -90,7 +90,7 @@ from PIL import Image  # Python图像处理库,读取图片
 # 导入项目模块
 from ..storage.repositories.sticker_repo import StickerRepository  # 表情包仓库
 from ..storage.repositories.index_jobs_repo import IndexJobRepository  # 索引任务仓库
-from ..storage.models import Sticker, IndexJob  # 表情包模型、索引任务模型
+from ..storage.models import Sticker  # 表情包模型
 from nonebot import logger  # NoneBot日志
 from ..llm.vision import VisionHelper  # 视觉模型客户端(OCR)
 from .utils import normalize_ocr_text  # OCR文本归一化
@@ -493,23 +493,23 @@ class StickerRegistry:
             # 2. 标签生成任务：调用 LLM 分析图片生成 tags/intents（用于分类和过滤）
             try:
                 # 任务1: 向量化任务（IndexWorker 处理）
-                vector_job = IndexJob(
-                    item_type="sticker",
-                    ref_id=file_sha256,
-                    payload_json=json.dumps(
+                vector_job = {
+                    "item_type": "sticker",
+                    "ref_id": file_sha256,
+                    "payload_json": json.dumps(
                         {"sticker_id": file_sha256}, ensure_ascii=False
                     ),
-                    status="pending",
-                    retry_count=0,
-                    next_retry_ts=0,
-                )
+                    "status": "pending",
+                    "retry_count": 0,
+                    "next_retry_ts": 0,
+                }
 
                 # 任务2: 标签生成任务（StickerWorker 处理）
                 # 注意：OCR 不再预先完成，StickerWorker 会同时完成 OCR + 打标签
-                tag_job = IndexJob(
-                    item_type="sticker_tag",
-                    ref_id=file_sha256,
-                    payload_json=json.dumps(
+                tag_job = {
+                    "item_type": "sticker_tag",
+                    "ref_id": file_sha256,
+                    "payload_json": json.dumps(
                         {
                             "sticker_id": file_sha256,
                             "intent_hint": "",  # 手动导入的表情包没有 intent hint
@@ -517,18 +517,14 @@ class StickerRegistry:
                         },
                         ensure_ascii=False,
                     ),
-                    status="pending",
-                    retry_count=0,
-                    next_retry_ts=0,
-                )
+                    "status": "pending",
+                    "retry_count": 0,
+                    "next_retry_ts": 0,
+                }
 
-                # 提交到数据库写入队列
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.add, args=(vector_job,)),
-                    priority=5,
-                )
+                # 提交到数据库写入队列（两条任务一次批量 INSERT、一次提交）
                 await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.add, args=(tag_job,)),
+                    AsyncCallableJob(IndexJobRepository.add_many, args=([vector_job, tag_job],)),
                     priority=5,
                 )
                 logger.debug(
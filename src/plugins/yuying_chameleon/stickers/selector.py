@@ -87,6 +87,7 @@ from ..config import plugin_config  # 插件配置
 from ..storage.models import Sticker  # 表情包模型
 from ..storage.repositories.sticker_repo import StickerRepository  # 表情包仓库
 from ..storage.repositories.sticker_usage_repo import StickerUsageRepository  # 使用记录仓库
+from ..storage.sqlalchemy_engine import get_session  # 数据库会话
 
 
 class StickerSelector:
@@ -364,7 +365,7 @@ class StickerSelector:
 
         # await StickerRepository.list_enabled_by_intent(): 查询表情包
         # - 参数: 意图字符串, limit=80(最多80个候选)
-        # - SQL: WHERE intents LIKE '%intent%' AND is_enabled=True AND is_banned=False
+        # - SQL: 经 sticker_intent 按意图索引查找, 再过滤 is_enabled=True AND is_banned=False
         # - 返回: Sticker对象列表
         # - 排序: 按sticker_id(随机性)
         candidates = await StickerRepository.list_enabled_by_intent(normalized_intent, limit=80)
@@ -405,27 +406,32 @@ class StickerSelector:
         # ==================== 步骤7: 遍历候选,检查冷却状态 ====================
 
         # 遍历打乱后的候选列表
-        for s in candidates:
-            # ==================== 步骤7.1: 查询上次使用时间 ====================
-
-            # await StickerUsageRepository.get_last_used_ts(): 查询上次使用时间
-            # - 参数: scene_type, scene_id, sticker_id
-            # - SQL: SELECT MAX(used_at) FROM sticker_usage WHERE scene_type=? AND scene_id=? AND sticker_id=?
-            # - 返回: Unix时间戳(秒级)或None(从未使用)
-            last_used = await StickerUsageRepository.get_last_used_ts(scene_type, scene_id, s.sticker_id)
-
-            # ==================== 步骤7.2: 检查是否在冷却期 ====================
-
-            # last_used: 如果查到上次使用时间(非None)
-            # now_ts - last_used < cooldown: 距离上次使用时间<冷却时间
-            if last_used and now_ts - last_used < cooldown:
-                # 仍在冷却期,跳过这个表情包
-                continue  # 继续检查下一个候选
-
-            # ==================== 步骤7.3: 找到可用表情包 ====================
-
-            # 不在冷却期(从未使用 或 已过冷却时间)
-            return s  # 返回这个表情包
+        # async with get_session(): 整个循环共用一个会话
+        # - 逐个查询冷却时间时复用同一连接,避免每个候选都从连接池取连接、开启/结束事务
+        async with get_session() as session:
+            for s in candidates:
+                # ==================== 步骤7.1: 查询上次使用时间 ====================
+
+                # await StickerUsageRepository.get_last_used_ts(): 查询上次使用时间
+                # - 参数: scene_type, scene_id, sticker_id
+                # - SQL: SELECT MAX(used_at) FROM sticker_usage WHERE scene_type=? AND scene_id=? AND sticker_id=?
+                # - 返回: Unix时间戳(秒级)或None(从未使用)
+                last_used = await StickerUsageRepository.get_last_used_ts(
+                    scene_type, scene_id, s.sticker_id, session=session
+                )
+
+                # ==================== 步骤7.2: 检查是否在冷却期 ====================
+
+                # last_used: 如果查到上次使用时间(非None)
+                # now_ts - last_used < cooldown: 距离上次使用时间<冷却时间
+                if last_used and now_ts - last_used < cooldown:
+                    # 仍在冷却期,跳过这个表情包
+                    continue  # 继续检查下一个候选
+
+                # ==================== 步骤7.3: 找到可用表情包 ====================
+
+                # 不在冷却期(从未使用 或 已过冷却时间)
+                return s  # 返回这个表情包
 
         # ==================== 步骤8: 降级策略 - 全部冷却 ====================
 
@@ -42,6 +42,7 @@ from ..config import plugin_config
 from ..storage.models import Sticker
 from ..storage.repositories.sticker_repo import StickerRepository
 from ..storage.repositories.sticker_usage_repo import StickerUsageRepository
+from ..storage.sqlalchemy_engine import get_session
 from ..vector.embedder import embedder
 from ..vector.qdrant_client import qdrant_manager
 from .selector import StickerSelector  # 降级用的旧版 selector
@@ -406,45 +407,48 @@ class StickerSemanticSelector:
             # ==================== 步骤5: Cooldown 过滤 + 选择 ====================
 
             current_ts = int(time.time())
-            for final_score, sid, vector_score in ranked:
-                # 从数据库获取完整的 sticker 对象
-                s = await StickerRepository.get_by_id(sid)
-
-                if not s:
-                    # 数据库中已不存在（可能被删除）
-                    logger.debug(
-                        f"[语义检索] 跳过不存在的表情包: sticker_id={sid}"
+            # 整个候选循环共用一个会话：逐个查询 sticker 与冷却时间时复用同一连接，
+            # 不再为每次查询单独从连接池取连接、开启/结束事务
+            async with get_session() as session:
+                for final_score, sid, vector_score in ranked:
+                    # 从数据库获取完整的 sticker 对象
+                    s = await StickerRepository.get_by_id(sid, session=session)
+
+                    if not s:
+                        # 数据库中已不存在（可能被删除）
+                        logger.debug(
+                            f"[语义检索] 跳过不存在的表情包: sticker_id={sid}"
+                        )
+                        continue
+
+                    if not s.is_enabled or s.is_banned:
+                        # 再次检查状态（防止 Qdrant 数据陈旧）
+                        logger.debug(
+                            f"[语义检索] 跳过已禁用/封禁的表情包: sticker_id={sid}, "
+                            f"is_enabled={s.is_enabled}, is_banned={s.is_banned}"
+                        )
+                        continue
+
+                    # 检查 cooldown
+                    last_used = await StickerUsageRepository.get_last_used_ts(
+                        scene_type, scene_id, s.sticker_id, session=session
                     )
-                    continue
 
-                if not s.is_enabled or s.is_banned:
-                    # 再次检查状态（防止 Qdrant 数据陈旧）
-                    logger.debug(
-                        f"[语义检索] 跳过已禁用/封禁的表情包: sticker_id={sid}, "
-                        f"is_enabled={s.is_enabled}, is_banned={s.is_banned}"
+                    if last_used and (current_ts - int(last_used) < cooldown):
+                        elapsed = current_ts - int(last_used)
+                        logger.debug(
+                            f"[语义检索] 跳过冷却期内的表情包: sticker_id={sid}, "
+                            f"冷却期={cooldown}s, 已过={elapsed}s"
+                        )
+                        continue
+
+                    # 找到了！
+                    logger.info(
+                        f"[语义检索] 选中表情包: sticker_id={sid}, name={s.name}, "
+                        f"final_score={round(final_score, 3)}, vector_score={round(vector_score, 3)}, "
+                        f"tags={s.tags}, intents={s.intents}"
                     )
-                    continue
-
-                # 检查 cooldown
-                last_used = await StickerUsageRepository.get_last_used_ts(
-                    scene_type, scene_id, s.sticker_id
-                )
-
-                if last_used and (current_ts - int(last_used) < cooldown):
-                    elapsed = current_ts - int(last_used)
-                    logger.debug(
-                        f"[语义检索] 跳过冷却期内的表情包: sticker_id={sid}, "
-                        f"冷却期={cooldown}s, 已过={elapsed}s"
-                    )
-                    continue
-
-                # 找到了！
-                logger.info(
-                    f"[语义检索] 选中表情包: sticker_id={sid}, name={s.name}, "
-                    f"final_score={round(final_score, 3)}, vector_score={round(vector_score, 3)}, "
-                    f"tags={s.tags}, intents={s.intents}"
-                )
-                return s
+                    return s
 
             # 所有候选都因为 cooldown 或状态问题被过滤掉了
             logger.warning(
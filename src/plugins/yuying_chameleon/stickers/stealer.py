@@ -86,7 +86,10 @@ async def handle_image(event):
 
 from __future__ import annotations
 
+import asyncio  # Python标准库,并发信号量
 import hashlib  # Python标准库,哈希算法(SHA256)
+import io  # Python标准库,内存字节流
+import os  # Python标准库,硬链接
 import shutil  # Python标准库,文件操作(复制)
 import time  # Python标准库,时间戳
 import json  # Python标准库,JSON编解码
@@ -97,18 +100,78 @@ import imagehash  # 第三方库,感知哈希算法
 from nonebot import logger  # NoneBot日志记录器
 from PIL import Image  # Python图像处理库,读取图片
 
+try:
+    # orjson: 可选依赖(C扩展JSON编码,比标准库json快数倍)
+    # - 安装: pip install .[speedups]
+    # - 未安装时回退为标准库json,输出等价
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
 # 导入项目模块
 from ..config import plugin_config  # 插件配置
 from ..llm.vision import VisionHelper  # 视觉模型客户端(OCR)
-from ..storage.models import Sticker, StickerCandidate  # 数据库模型
+from ..storage.models import StickerCandidate  # 数据库模型
 from ..storage.models import IndexJob  # 索引任务模型
 from ..storage.db_writer import db_writer  # 数据库写入队列
 from ..storage.write_jobs import AddIndexJobJob, AsyncCallableJob  # 写入任务
 from ..storage.repositories.sticker_candidate_repo import StickerCandidateRepository  # 候选表情包仓库
 from ..storage.repositories.sticker_repo import StickerRepository  # 表情包仓库
 from .utils import normalize_ocr_text  # OCR文本归一化
+from .phash_index import phash_index  # 正式库pHash内存索引(近似重复检测)
 from ..paths import assets_dir  # 获取assets目录
 
+try:
+    # blake3: 可选依赖(SIMD并行树哈希,比SHA256快数倍)
+    import blake3  # type: ignore
+except ImportError:  # pragma: no cover - 可选依赖
+    blake3 = None
+
+_warned_blake3_missing = False
+
+
+def _content_hash(content: bytes) -> str:
+    """计算新表情包的文件标识哈希(64个十六进制字符)
+
+    - 默认SHA256,与已入库表情包的sticker_id保持一致
+    - yuying_sticker_content_hash="blake3"且已安装blake3时使用blake3(仅影响新学习的表情包)
+    - 标识用途只需唯一性,不依赖密码学强度
+    """
+
+    global _warned_blake3_missing
+    algo = str(getattr(plugin_config, "yuying_sticker_content_hash", "sha256") or "sha256").lower()
+    if algo == "blake3":
+        if blake3 is not None:
+            return blake3.blake3(content).hexdigest(length=32)
+        if not _warned_blake3_missing:
+            _warned_blake3_missing = True
+            logger.warning("已配置 sticker_content_hash=blake3 但未安装 blake3，回退为 SHA256")
+    return hashlib.sha256(content).hexdigest()
+
+
+def _dumps_json(obj: object) -> str:
+    """序列化为JSON字符串(保留中文),优先使用orjson"""
+
+    if orjson is not None:
+        # orjson.dumps(): 返回UTF-8 bytes,默认不转义非ASCII字符
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False)
+
+
+# process_image并发上限(模块级共享,所有调用共用同一个信号量)
+_PROCESS_SEMAPHORE = asyncio.Semaphore(
+    max(1, int(getattr(plugin_config, "yuying_sticker_steal_max_concurrency", 8) or 8))
+)
+
+
+# PIL格式名 → 文件扩展名映射(未知格式兜底为.png)
+_FMT_TO_EXT = {
+    "png": ".png",
+    "jpeg": ".jpg",
+    "jpg": ".jpg",
+    "gif": ".gif",
+    "webp": ".webp",
+}
 
 class StickerStealer:
     """表情包窃取器 - 从群聊图片中学习新表情包
@@ -167,6 +230,7 @@ class StickerStealer:
         处理流程:
         1. 计算特征(score, phash, sha256)
         2. 判断meme分数,低于阈值则跳过
+        2.1 与正式库pHash做汉明距离比对,近似重复则跳过
         3. OCR识别图片文字
         4. 生成fingerprint(phash + 归一化OCR)
         5. 检查是否已在正式库(Stickers表)
@@ -215,6 +279,10 @@ class StickerStealer:
             - 可能创建IndexJob任务(晋升时)
             - 输出日志
 
+        并发控制:
+            - 所有调用共享一个信号量(yuying_sticker_steal_max_concurrency,默认8)
+            - 超出上限的调用排队等待,不会丢弃
+
         异常处理:
             - 任何异常都被捕获并记录
             - 不会抛出异常,确保不中断消息处理流程
@@ -249,26 +317,65 @@ class StickerStealer:
             # 晋升为正式表情包,复制到auto包,写入Stickers表
         """
 
+        # _PROCESS_SEMAPHORE: 限制同时处理的图片数量(背压)
+        # - 刷图时gatekeeper可能同时发起上百个process_image
+        # - 每个都持有PIL解码 + OCR请求 + 多次DB等待
+        # - 超出上限的调用在此排队,控制内存/文件句柄/OCR并发
+        async with _PROCESS_SEMAPHORE:
+            await StickerStealer._process_image(
+                scene_id=scene_id,
+                source_qq_id=source_qq_id,
+                file_path=file_path,
+                intent_hint=intent_hint,
+            )
+
+    @staticmethod
+    async def _process_image(
+        *,
+        scene_id: str,
+        source_qq_id: str,
+        file_path: str,
+        intent_hint: Optional[str],
+    ) -> None:
+        """process_image的实际处理流程(调用方已持有并发信号量)"""
+
         try:
             # ==================== 步骤1: 计算图片特征 ====================
 
             # StickerStealer._compute_features(): 计算meme分数和哈希
             # - 参数: file_path(图片路径)
-            # - 返回: (score, phash, sha256)元组
+            # - 返回: (score, phash, sha256, ext)元组
             #   * score: meme分数(0-3分,满足1个条件+1分)
             #   * phash: 感知哈希(16个十六进制字符)
             #   * sha256: 文件内容哈希(64个十六进制字符)
-            score, phash, sha256 = StickerStealer._compute_features(file_path)
+            #   * ext: PIL检测到的真实扩展名(晋升时复用,避免再次打开图片)
+            # - min_score: 分数不达标时只解析文件头,跳过像素解码与哈希
+            meme_threshold = int(plugin_config.yuying_sticker_meme_score_threshold)
+            score, phash, sha256, ext = StickerStealer._compute_features(
+                file_path, min_score=meme_threshold
+            )
 
             # ==================== 步骤2: 判断meme分数阈值 ====================
 
             # score < 阈值: meme分数不达标
-            # int(plugin_config.yuying_sticker_meme_score_threshold): 阈值
+            # meme_threshold: plugin_config.yuying_sticker_meme_score_threshold
             # - 默认值: 2分
             # - 意义: 至少满足2个条件(大小/尺寸/比例)才是表情包
-            if score < int(plugin_config.yuying_sticker_meme_score_threshold):
+            if score < meme_threshold:
                 return  # 不符合表情包标准,跳过
 
+            # ==================== 步骤2.1: pHash近似重复检测 ====================
+
+            # phash_index.min_distance(phash): 与正式库所有pHash的最小汉明距离
+            # - 内存向量化扫描,无需OCR与查库
+            # - 距离 ≤ 阈值: 同一表情包的不同压缩/缩放版本,已收录则直接跳过
+            # - 返回None: 索引为空
+            near_dup_distance = int(plugin_config.yuying_sticker_phash_near_dup_distance)
+            if near_dup_distance >= 0:
+                dist = phash_index.min_distance(phash)
+                if dist is not None and dist <= near_dup_distance:
+                    return  # 与已收录表情包近似,跳过
+
             # ==================== 步骤3: OCR识别图片文字 ====================
 
             # await VisionHelper.ocr_image(file_path): 调用OCR识别
@@ -289,15 +396,19 @@ class StickerStealer:
 
             # ==================== 步骤5: 检查是否已在正式库 ====================
 
+            # phash_index.may_contain_id(sha256): 内存集合预判
+            # - False: 确定不在正式库,跳过SELECT(常见情况)
+            # - True: 可能已在库中(或索引未载入),以数据库为准
             # await StickerRepository.get_by_id(sha256): 查询Stickers表
             # - sticker_id就是SHA256哈希
             # - 如果存在: 返回Sticker对象
             # - 如果不存在: 返回None
-            existing = await StickerRepository.get_by_id(sha256)
+            if phash_index.may_contain_id(sha256):
+                existing = await StickerRepository.get_by_id(sha256)
 
-            # existing: 如果查到记录
-            if existing:
-                return  # 已在正式库,无需再学习,直接返回
+                # existing: 如果查到记录
+                if existing:
+                    return  # 已在正式库,无需再学习,直接返回
 
             # ==================== 步骤6: 查询候选池 ====================
 
@@ -313,40 +424,26 @@ class StickerStealer:
             if candidate:
                 # ==================== 情况1: 已有候选,更新计数 ====================
 
-                # ==================== 步骤7.1: 增加seen_count(出现次数+1) ====================
+                # ==================== 步骤7.1: 增加seen_count并追加source_qq_id ====================
 
                 # await db_writer.submit_and_wait(): 提交写入任务并等待完成
                 # AsyncCallableJob: 异步可调用任务
-                # StickerCandidateRepository.increment_seen_count(): 增加计数
-                # - 参数: candidate_id(候选ID)
-                # - 效果: UPDATE sticker_candidates SET seen_count=seen_count+1
+                # StickerCandidateRepository.record_sighting(): 记录一次出现
+                # - 参数: candidate_id(候选ID), source_qq_id(发送者QQ号)
+                # - 效果: 单条UPDATE内 seen_count+1、刷新last_seen_ts、去重追加QQ号到source_qq_ids
+                # - 用途: 计数用于晋升判断,来源列表用于追踪谁在使用这个表情包
                 # - 返回: 更新后的StickerCandidate对象
                 candidate = await db_writer.submit_and_wait(
                     AsyncCallableJob(
-                        StickerCandidateRepository.increment_seen_count,
-                        args=(candidate.candidate_id,),
+                        StickerCandidateRepository.record_sighting,
+                        args=(candidate.candidate_id, source_qq_id),
                     ),
                     priority=5,  # 优先级5(中等)
                 )
                 if not isinstance(candidate, StickerCandidate):
                     return
 
-                # ==================== 步骤7.2: 追加source_qq_id(发送者列表) ====================
-
-                # await db_writer.submit_and_wait(): 提交写入任务并等待完成
-                # StickerCandidateRepository.append_source_qq_id(): 追加QQ号
-                # - 参数: candidate_id(候选ID), source_qq_id(发送者QQ号)
-                # - 效果: 将QQ号追加到source_qq_ids JSON数组
-                # - 用途: 追踪谁在使用这个表情包
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(
-                        StickerCandidateRepository.append_source_qq_id,
-                        args=(candidate.candidate_id, source_qq_id),
-                    ),
-                    priority=5,
-                )
-
-                # ==================== 步骤7.3: 检查是否达到晋升条件 ====================
+                # ==================== 步骤7.2: 检查是否达到晋升条件 ====================
 
                 # 晋升条件(同时满足):
                 # 1. candidate.status == "pending": 状态是待定(未晋升)
@@ -364,21 +461,28 @@ class StickerStealer:
                     # - phash: 感知哈希
                     # - ocr_text: OCR识别的文本
                     # - intent_hint: 意图提示(可选)
+                    # - ext: 已检测的扩展名(无需再次打开图片)
+                    #   * 仅当本次图片就是候选样本时才传入:晋升复制的是样本文件,
+                    #     首次出现的样本可能与本次图片格式不同(如样本gif,本次jpg)
                     await StickerStealer.promote_candidate(
                         candidate,
                         sha256=sha256,
                         phash=phash,
                         ocr_text=ocr_text,
                         intent_hint=intent_hint,
+                        ext=ext if file_path == candidate.sample_file_path else None,
                     )
 
             else:
                 # ==================== 情况2: 新候选,创建记录 ====================
 
-                # ==================== 步骤7.4: 创建StickerCandidate对象 ====================
+                # ==================== 步骤7.3: 构造候选记录字段 ====================
 
-                # StickerCandidate(): 创建候选表情包模型对象
-                new_candidate = StickerCandidate(
+                # 普通dict而非StickerCandidate ORM实例:
+                # - 热路径只需写入,不需要ORM的属性追踪与回读
+                # - 由仓储以Core INSERT直接写入
+                now = int(time.time())
+                new_candidate = dict(
                     # fingerprint: 去重指纹(pHash + 归一化OCR)
                     fingerprint=fingerprint,
 
@@ -398,29 +502,29 @@ class StickerStealer:
                     scene_id=scene_id,
 
                     # first_seen_ts: 首次出现时间戳
-                    # int(time.time()): 当前Unix时间戳(秒级)
-                    first_seen_ts=int(time.time()),
+                    # now: 当前Unix时间戳(秒级)
+                    first_seen_ts=now,
 
                     # last_seen_ts: 最后出现时间戳(初始=首次)
-                    last_seen_ts=int(time.time()),
+                    last_seen_ts=now,
 
                     # status: 状态(pending=待定,promoted=已晋升)
                     status="pending",
 
                     # source_qq_ids: 发送者QQ号列表(JSON数组格式)
-                    # f'["{source_qq_id}"]': 初始只有一个QQ号
+                    # _dumps_json([source_qq_id]): 初始只有一个QQ号,由JSON编码器负责转义
                     # 格式: '["123456789"]'
-                    source_qq_ids=f'["{source_qq_id}"]',
+                    source_qq_ids=_dumps_json([source_qq_id]),
                 )
 
-                # ==================== 步骤7.5: 写入数据库 ====================
+                # ==================== 步骤7.4: 写入数据库 ====================
 
                 # await db_writer.submit_and_wait(): 提交写入任务并等待完成
                 # AsyncCallableJob: 异步可调用任务
-                # StickerCandidateRepository.add(new_candidate): 插入候选记录
+                # StickerCandidateRepository.add_core(new_candidate): 插入候选记录
                 # - 操作: INSERT INTO sticker_candidates VALUES (...)
                 await db_writer.submit_and_wait(
-                    AsyncCallableJob(StickerCandidateRepository.add, args=(new_candidate,)),
+                    AsyncCallableJob(StickerCandidateRepository.add_core, args=(new_candidate,)),
                     priority=5,
                 )
 
@@ -434,14 +538,15 @@ class StickerStealer:
             # 不抛出异常,让消息处理流程继续
 
     @staticmethod
-    def _compute_features(file_path: str) -> Tuple[int, str, str]:
-        """计算候选判定与指纹所需特征(meme分数、pHash、SHA256)
+    def _compute_features(file_path: str, min_score: int = 0) -> Tuple[int, str, str, str]:
+        """计算候选判定与指纹所需特征(meme分数、pHash、SHA256、扩展名)
 
         这个方法的作用:
         - 读取图片文件
         - 计算SHA256哈希(精确去重)
         - 计算pHash感知哈希(相似检测)
         - 计算meme分数(表情包质量判定)
+        - 记录PIL检测到的真实格式(晋升时推断扩展名,避免重复打开)
 
         Meme分数计算规则(满分3分):
         1. 文件大小 ≤ 1MB(1024 KB): +1分
@@ -473,77 +578,109 @@ class StickerStealer:
                 - 必须是绝对路径
                 - 文件必须存在且可读
                 - 示例: "/tmp/image_123.jpg"
+            min_score: 需要计算哈希的最低meme分数
+                - 类型: 整数
+                - 默认值: 0(总是计算)
+                - 分数低于此值时直接返回,phash/sha256为空字符串
+                - 用途: 非表情包图片只解析文件头,省去像素解码与哈希
 
         Returns:
-            Tuple[int, str, str]: 特征元组
+            Tuple[int, str, str, str]: 特征元组
                 - score: meme分数(0-3分,整数)
                 - phash: 感知哈希(16个十六进制字符)
                 - sha256: 文件SHA256哈希(64个十六进制字符)
+                - ext: 文件扩展名(.png/.jpg/.gif/.webp,未知格式为.png)
 
         Side Effects:
-            - 读取文件内容(I/O)
-            - 打开图片文件(PIL)
-            - 计算哈希(CPU密集)
+            - 读取文件内容(I/O,只读一次)
+            - 打开图片(PIL,最多解码一次像素)
+            - 计算哈希(CPU密集,分数不达标时跳过)
 
         Example:
             >>> # 示例1: 标准表情包(满分3分)
-            >>> score, phash, sha256 = StickerStealer._compute_features("/tmp/cat.jpg")
+            >>> score, phash, sha256, ext = StickerStealer._compute_features("/tmp/cat.jpg")
             >>> # 文件: 200KB(✓), 尺寸: 500x500(✓), 比例: 1.0(✓)
             >>> print(score)  # 3
             >>> print(phash)  # "a1b2c3d4e5f6g7h8"
             >>> print(sha256)  # "1234567890abcdef..."
 
             >>> # 示例2: 低质量图片(1分)
-            >>> score, phash, sha256 = StickerStealer._compute_features("/tmp/photo.jpg")
+            >>> score, phash, sha256, ext = StickerStealer._compute_features("/tmp/photo.jpg")
             >>> # 文件: 5MB(✗), 尺寸: 4000x3000(✗), 比例: 1.33(✓)
             >>> print(score)  # 1 (只满足宽高比条件)
 
             >>> # 示例3: 长条图(0分)
-            >>> score, phash, sha256 = StickerStealer._compute_features("/tmp/banner.jpg")
+            >>> score, phash, sha256, ext = StickerStealer._compute_features("/tmp/banner.jpg")
             >>> # 文件: 2MB(✗), 尺寸: 1920x300(✗), 比例: 6.4(✗)
             >>> print(score)  # 0 (不满足任何条件)
         """
 
         # ==================== 步骤1: 读取文件内容 ====================
 
-        # Path(file_path): 创建Path对象
-        p = Path(file_path)
+        # Path(file_path).read_bytes(): 一次读取文件的所有字节内容
+        # - 后续哈希与PIL解码都基于这份内存数据,不再重复读盘
+        content = Path(file_path).read_bytes()
 
-        # p.read_bytes(): 读取文件的所有字节内容
-        # - 返回: bytes对象
-        content = p.read_bytes()
+        # ==================== 步骤2: 打开图片(仅解析文件头) ====================
 
-        # ==================== 步骤2: 计算SHA256哈希 ====================
+        # Image.open(BytesIO(content)): PIL打开图片,此时只解析文件头,不解码像素
+        # with: 自动释放图片资源
+        with Image.open(io.BytesIO(content)) as img:
+            # img.format: PIL检测的真实格式(convert前读取,convert后的副本没有format)
+            # 示例: "PNG", "JPEG", "GIF", "WEBP"
+            ext = _FMT_TO_EXT.get((img.format or "").lower(), ".png")
 
-        # hashlib.sha256(content): 计算SHA256哈希
-        # .hexdigest(): 转为16进制字符串(64个字符)
-        sha256 = hashlib.sha256(content).hexdigest()
+            # img.size: 获取图片尺寸(宽, 高)元组(来自文件头,无需解码)
+            w, h = img.size
 
-        # ==================== 步骤3: 打开图片并计算pHash ====================
+            # ==================== 步骤3: 计算meme分数(0-3分) ====================
 
-        # Image.open(p): 使用PIL打开图片
-        # with: 自动释放图片资源
-        with Image.open(p) as img:
-            # img.convert("RGB"): 转换为RGB模式
-            # - 原因: 确保图片是RGB格式(pHash需要RGB)
-            # - 效果: RGBA/灰度/索引色等都转为RGB
-            img = img.convert("RGB")
+            # StickerStealer._meme_score(): 只依赖文件大小与尺寸,无需解码像素
+            score = StickerStealer._meme_score(len(content), w, h)
+
+            # score < min_score: 不达标的图片不再解码像素、不计算哈希
+            if score < min_score:
+                return score, "", "", ext
 
-            # imagehash.phash(img): 计算感知哈希
+            # ==================== 步骤4: 解码像素并计算pHash ====================
+
+            # img.convert("RGB"): 仅对少见模式(索引色P、CMYK等)转换
+            # - imagehash.phash内部会convert("L")灰度化,RGB/L/RGBA可直接传入
+            # - 这三种模式灰度化结果与先转RGB再灰度化一致,pHash不变
+            # - 效果: 常见JPEG/PNG省去一次整图像素复制
+            if img.mode not in ("RGB", "L", "RGBA"):
+                img = img.convert("RGB")
+
+            # imagehash.phash(img): 计算感知哈希(此处才真正解码一次像素)
             # str(...): 转为字符串(16个十六进制字符)
             phash = str(imagehash.phash(img))
 
-            # img.size: 获取图片尺寸(宽, 高)元组
-            w, h = img.size
+        # ==================== 步骤5: 计算文件内容哈希 ====================
+
+        # _content_hash(content): 默认SHA256,可配置为blake3(更快,同为64个十六进制字符)
+        # - 变量名沿用sha256: 作为sticker_id与文件名使用,宽度与SHA256一致
+        sha256 = _content_hash(content)
+
+        # ==================== 步骤6: 返回特征元组 ====================
+
+        # return (score, phash, sha256, ext): 返回4个特征
+        # - score: meme分数(0-3分)
+        # - phash: 感知哈希(16字符)
+        # - sha256: 文件哈希(64字符)
+        # - ext: 文件扩展名
+        return score, phash, sha256, ext
+
+    @staticmethod
+    def _meme_score(size_bytes: int, w: int, h: int) -> int:
+        """根据文件大小与图片尺寸计算meme分数(0-3分,规则见_compute_features)"""
 
-        # ==================== 步骤4: 计算文件大小(KB) ====================
+        # ==================== 计算文件大小(KB) ====================
 
-        # len(content): 文件字节数
-        # int(len(content) / 1024): 转换为KB(整数)
+        # int(size_bytes / 1024): 转换为KB(整数)
         # max(1, ...): 最小值为1KB(避免0导致的除法错误)
-        size_kb = max(1, int(len(content) / 1024))
+        size_kb = max(1, int(size_bytes / 1024))
 
-        # ==================== 步骤5: 计算宽高比 ====================
+        # ==================== 计算宽高比 ====================
 
         # w / h: 宽除以高
         # if h: 如果高度不为0
@@ -553,8 +690,6 @@ class StickerStealer:
         #   * 返回: 0.0(避免除零错误)
         ratio = w / h if h else 0.0
 
-        # ==================== 步骤6: 计算meme分数(0-3分) ====================
-
         # score: 初始为0分
         score = 0
 
@@ -576,13 +711,7 @@ class StickerStealer:
         if 0.75 <= ratio <= 1.35:
             score += 1  # 满足条件,+1分
 
-        # ==================== 步骤7: 返回特征元组 ====================
-
-        # return (score, phash, sha256): 返回3个特征
-        # - score: meme分数(0-3分)
-        # - phash: 感知哈希(16字符)
-        # - sha256: 文件哈希(64字符)
-        return score, phash, sha256
+        return score
 
     @staticmethod
     async def promote_candidate(
@@ -592,6 +721,7 @@ class StickerStealer:
         phash: str,
         ocr_text: str,
         intent_hint: Optional[str],
+        ext: Optional[str] = None,
     ) -> None:
         """将候选晋升为正式表情包(复制到auto包并写入stickers表)
 
@@ -648,6 +778,12 @@ class StickerStealer:
                 - 默认值: None
                 - 用途: 打标任务的意图参考
                 - 示例: "funny", "happy", "sad"
+            ext: 样本文件已检测的扩展名(由_compute_features给出)
+                - 类型: 字符串或None
+                - 默认值: None (需要时用PIL检测样本文件的真实格式)
+                - 用途: 样本文件无可识别后缀时使用,避免再次打开图片
+                - 注意: 必须是样本文件(sample_file_path)的格式,而非本次图片
+                - 示例: ".jpg"
 
         Returns:
             None: 无返回值
@@ -661,8 +797,9 @@ class StickerStealer:
             - 输出日志
 
         异常处理:
+            - 硬链接失败(跨盘/已存在): 回退为shutil.copyfile
             - 文件复制失败: 使用read_bytes()回退
-            - 扩展名识别失败: 默认使用.png
+            - 扩展名无法从后缀识别: 使用调用方传入的ext,未传入则PIL检测,失败用.png
 
         Example:
             >>> candidate = StickerCandidate(
@@ -705,31 +842,18 @@ class StickerStealer:
         # src.suffix: 获取文件扩展名(包括".")
         # .lower(): 转小写
         # 示例: "/tmp/cat.JPG" → ".jpg"
-        ext = (src.suffix or "").lower()
-
-        # ext not in {...}: 扩展名不在支持的格式中
-        # - 原因: src可能是临时.img文件,需要用真实格式兜底
-        if ext not in {".png", ".jpg", ".jpeg", ".gif", ".webp"}:
-            # ==================== 步骤2.1: 使用PIL检测真实格式 ====================
-
+        suffix = (src.suffix or "").lower()
+
+        # suffix in {...}: 后缀是支持的格式,直接使用
+        # - 否则(如临时.img文件)使用调用方已检测的样本格式兜底(无需再次Image.open)
+        # - 调用方未给出时,用PIL检测样本文件的真实格式
+        if suffix in {".png", ".jpg", ".jpeg", ".gif", ".webp"}:
+            ext = suffix
+        elif ext is None:
             try:
-                # Image.open(src): 打开图片
-                # img.format: 获取图片格式(PIL检测的真实格式)
-                # 示例: "PNG", "JPEG", "GIF", "WEBP"
+                # Image.open(src): 只解析文件头,img.format 为真实格式(如"PNG"/"JPEG")
                 with Image.open(src) as img:
-                    fmt = (img.format or "").lower()
-
-                # {...}.get(fmt, ".png"): 格式映射
-                # - 将PIL格式名转换为文件扩展名
-                # - 默认值: ".png"(如果格式不在映射中)
-                ext = {
-                    "png": ".png",
-                    "jpeg": ".jpg",
-                    "jpg": ".jpg",
-                    "gif": ".gif",
-                    "webp": ".webp",
-                }.get(fmt, ".png")
-
+                    ext = _FMT_TO_EXT.get((img.format or "").lower(), ".png")
             except Exception:
                 # PIL检测失败,使用默认扩展名
                 ext = ".png"
@@ -743,23 +867,14 @@ class StickerStealer:
         # 示例: assets/stickers/auto/1234567890abcdef...jpg
         dst = auto_dir / f"{sha256}{ext}"
 
-        # ==================== 步骤4: 复制文件 ====================
-
-        try:
-            # shutil.copyfile(src, dst): 复制文件
-            # - src: 源文件路径
-            # - dst: 目标文件路径
-            # - 效果: 复制文件内容(不复制元数据)
-            shutil.copyfile(src, dst)
-
-        except Exception:
-            # ==================== 复制失败回退策略 ====================
+        # ==================== 步骤4: 落盘文件(优先硬链接) ====================
 
-            # 若跨盘失败(源和目标在不同磁盘),则回退为复制字节内容
-            # dst.write_bytes(src.read_bytes()): 读取源文件字节并写入目标
-            # - src.read_bytes(): 读取源文件的所有字节
-            # - dst.write_bytes(...): 写入目标文件
-            dst.write_bytes(src.read_bytes())
+        # StickerStealer._link_or_copy(src, dst): 按代价从低到高依次尝试
+        # - os.link: 同一文件系统下O(1),不复制任何字节
+        # - shutil.copyfile: 跨文件系统时回退为内核复制
+        # - read_bytes/write_bytes: 最后兜底
+        # 注意: 不使用os.replace移动,样本文件仍是候选记录的sample_file_path
+        StickerStealer._link_or_copy(src, dst)
 
         # ==================== 步骤5: 生成fingerprint ====================
 
@@ -767,10 +882,10 @@ class StickerStealer:
         # f"{phash}+{normalize_ocr_text(ocr_text)}": 拼接pHash和归一化OCR
         fingerprint = f"{phash}+{normalize_ocr_text(ocr_text)}"
 
-        # ==================== 步骤6: 创建Sticker对象 ====================
+        # ==================== 步骤6: 构造Sticker记录字段 ====================
 
-        # Sticker(): 创建表情包模型对象
-        sticker = Sticker(
+        # 普通dict而非Sticker ORM实例,由仓储以Core INSERT直接写入
+        sticker = dict(
             # sticker_id: 主键,使用SHA256哈希
             sticker_id=sha256,
 
@@ -804,13 +919,16 @@ class StickerStealer:
 
         # await db_writer.submit_and_wait(): 提交写入任务并等待完成
         # AsyncCallableJob: 异步可调用任务
-        # StickerRepository.add(sticker): 插入表情包记录
+        # StickerRepository.add_core(sticker): 插入表情包记录
         # - 操作: INSERT INTO stickers VALUES (...)
         await db_writer.submit_and_wait(
-            AsyncCallableJob(StickerRepository.add, args=(sticker,)),
+            AsyncCallableJob(StickerRepository.add_core, args=(sticker,)),
             priority=5,
         )
 
+        # phash_index.add(sha256, phash): 追加到内存索引,后续相同/近似版本直接命中
+        phash_index.add(sha256, phash)
+
         # ==================== 步骤8: 更新候选状态 ====================
 
         # await db_writer.submit_and_wait(): 提交写入任务并等待完成
@@ -855,9 +973,9 @@ class StickerStealer:
                     ref_id=str(sha256),
 
                     # payload_json: 任务载荷(JSON格式)
-                    # json.dumps(payload, ensure_ascii=False): 转为JSON字符串
-                    # - ensure_ascii=False: 保留中文字符,不转义为\uXXXX
-                    payload_json=json.dumps(payload, ensure_ascii=False),
+                    # _dumps_json(payload): 转为JSON字符串(优先orjson)
+                    # - 保留中文字符,不转义为\uXXXX
+                    payload_json=_dumps_json(payload),
 
                     # status: 状态(pending=待处理)
                     status="pending",
@@ -873,6 +991,44 @@ class StickerStealer:
         # - 更新Stickers表的intents和is_banned字段
         # - 更新IndexJob状态(status="done")
 
+    @staticmethod
+    def _link_or_copy(src: Path, dst: Path) -> None:
+        """将样本文件落盘到目标路径(硬链接 → 复制 → 字节写入)
+
+        这个方法的作用:
+        - 临时目录与assets通常在同一文件系统,硬链接无需复制任何字节
+        - 跨文件系统(os.link抛出OSError)时回退为shutil.copyfile
+        - 复制也失败时回退为读取全部字节后写入
+
+        为什么不直接移动(os.replace)?
+        - 候选记录仍引用sample_file_path,移动后原路径失效
+        - 临时下载使用原子替换写入(见_download_and_steal),不会原地改写已链接的文件
+
+        Args:
+            src: 源文件路径(候选样本文件)
+            dst: 目标文件路径(assets/stickers/auto/<sha256><ext>)
+
+        Side Effects:
+            - 在dst创建硬链接或文件副本
+            - dst已存在时(重复晋升)由copyfile覆盖
+        """
+
+        try:
+            # os.link(src, dst): 创建硬链接(同一inode,零拷贝)
+            # - dst已存在时抛出FileExistsError(OSError子类)
+            # - 跨文件系统时抛出OSError(EXDEV)
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+        try:
+            # shutil.copyfile(src, dst): 复制文件内容(不复制元数据)
+            shutil.copyfile(src, dst)
+        except OSError:
+            # dst.write_bytes(src.read_bytes()): 读取源文件字节并写入目标
+            dst.write_bytes(src.read_bytes())
+
     @staticmethod
     def _auto_pack_dir() -> Path:
         """获取自动表情包目录(assets/stickers/auto)
@@ -1,18 +1,40 @@
 """DBWriter：将非关键写入串行化，降低 SQLite 并发写争用。
 
 注意：
-- `asyncio.PriorityQueue` 在优先级相同的情况下会继续比较下一个元素；
-  如果队列元素是不可比较的对象，会触发 TypeError。
-- 因此这里加入自增序号作为稳定的次级排序键。
+- 每个优先级一条 FIFO 队列（deque），消费时总是先取编号最小的非空队列；
+  同一优先级内严格按提交顺序执行，入队/出队均为 O(1)，无需堆排序与元组比较。
+- 优先级会被限制在 [0, 9] 区间内。
+- 入队/出队与计数（`_size`）只在事件循环线程中进行，用普通 int 即可，无需锁或
+  itertools.count；不得从其它线程直接调用 submit。
+- 队列有容量上限（db_writer_queue_maxsize），满时 `submit` 会等待，形成背压；
+  写入任务内部不得再向 DBWriter 提交并等待，否则队列满时会自锁。
+- 声明 `batchable = True` 的任务（实现 `execute_in(session)`）会被合并：
+  连续排队的此类任务最多 64 个共用一个 Session，一次 commit（合并 fsync）；
+  队列暂时为空时最多再等待 db_writer_batch_linger_ms 收集后续任务（0 表示不等待）；
+  合并事务失败时回退为逐个独立执行，保证单个任务的失败不影响其它任务。
 """
 
 from __future__ import annotations
 
 import asyncio
-from itertools import count
+import time
+from collections import deque
 from typing import Optional, Protocol
 
 from nonebot import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import plugin_config
+from .sqlalchemy_engine import get_session
+
+# 队列满告警的最小间隔（秒），避免刷屏
+_FULL_WARN_INTERVAL_SECONDS = 30.0
+
+# 优先级档位数量（0~9）
+_PRIORITY_LEVELS = 10
+
+# 单个合并事务最多包含的任务数
+_MAX_BATCH = 64
 
 class DBWriteJob(Protocol):
     """写入任务协议：任务内部自行管理 Session 与事务。"""
@@ -21,30 +43,79 @@ class DBWriteJob(Protocol):
         """执行写入任务。"""
         ...
 
+class BatchableDBWriteJob(DBWriteJob, Protocol):
+    """可合并写入任务：可在调用方提供的 Session 内执行，由 DBWriter 统一 commit。"""
+
+    batchable: bool
+
+    async def execute_in(self, session: AsyncSession) -> object:
+        """在给定 Session 内执行写入（不得自行 commit）。"""
+        ...
+
+_Item = tuple[DBWriteJob, Optional["asyncio.Future[object]"]]
+
+def _is_batchable(job: DBWriteJob) -> bool:
+    """任务是否声明可合并。"""
+
+    return bool(getattr(job, "batchable", False))
+
 class DBWriter:
     """全局单例写入队列（优先级越小越优先）。"""
 
+    # 实例属性固定，使用 __slots__ 以偏移量访问（run_forever 热循环中频繁读取）；
+    # `_instance` 是类属性，不在 slots 中
+    __slots__ = (
+        "_tiers",
+        "_size",
+        "_maxsize",
+        "_slots",
+        "_not_empty",
+        "_running",
+        "_last_full_warn",
+        "_linger",
+        "__weakref__",
+    )
+
     _instance: Optional["DBWriter"] = None
-    q: asyncio.PriorityQueue[
-        tuple[int, int, DBWriteJob, Optional[asyncio.Future[object]]]
-    ]
-    _seq: count[int]
+    _tiers: list[deque[_Item]]
+    _size: int
+    _maxsize: int
+    _slots: Optional[asyncio.Semaphore]
+    _not_empty: asyncio.Event
     _running: bool
+    _last_full_warn: float
+    _linger: float
 
     def __new__(cls) -> DBWriter:
         """创建/获取单例实例。"""
 
         if cls._instance is None:
             cls._instance = super(DBWriter, cls).__new__(cls)
-            cls._instance.q = asyncio.PriorityQueue()
+            maxsize = max(0, int(plugin_config.yuying_db_writer_queue_maxsize))
+            cls._instance._tiers = [deque() for _ in range(_PRIORITY_LEVELS)]
+            cls._instance._size = 0
+            cls._instance._maxsize = maxsize
+            cls._instance._slots = asyncio.Semaphore(maxsize) if maxsize > 0 else None
+            cls._instance._not_empty = asyncio.Event()
             cls._instance._running = False
-            cls._instance._seq = count()
+            cls._instance._last_full_warn = 0.0
+            cls._instance._linger = max(0, int(plugin_config.yuying_db_writer_batch_linger_ms)) / 1000.0
         return cls._instance
 
     def __init__(self) -> None:
         """单例初始化在 `__new__` 中完成。"""
         pass
 
+    def qsize(self) -> int:
+        """当前排队中的任务数。"""
+
+        return self._size
+
+    def full(self) -> bool:
+        """队列是否已达容量上限。"""
+
+        return self._maxsize > 0 and self._size >= self._maxsize
+
     async def submit(self, job: DBWriteJob, priority: int = 5) -> None:
         """提交一个写入任务。
 
@@ -53,35 +124,142 @@ class DBWriter:
             priority: 优先级，数字越小优先级越高，默认 5。
         """
 
-        await self.q.put((priority, next(self._seq), job, None))
+        await self._put(job, None, priority)
 
     async def submit_and_wait(self, job: DBWriteJob, priority: int = 5) -> object:
         """提交一个写入任务并等待其执行完成，返回 execute() 的结果。"""
 
+        # loop.create_future() 是 C 实现，比 asyncio.Event + 结果槽更轻（Event.wait
+        # 内部仍会创建 Future）；Future 完成后无法重置，因此也不做对象池复用。
         loop = asyncio.get_running_loop()
         fut: asyncio.Future[object] = loop.create_future()
-        await self.q.put((priority, next(self._seq), job, fut))
+        await self._put(job, fut, priority)
         return await fut
 
+    async def _put(
+        self,
+        job: DBWriteJob,
+        fut: Optional[asyncio.Future[object]],
+        priority: int,
+    ) -> None:
+        """按优先级入队（队列满时等待空位）。"""
+
+        if self._slots is not None:
+            self._warn_if_full()
+            await self._slots.acquire()
+        tier = min(max(int(priority), 0), _PRIORITY_LEVELS - 1)
+        self._tiers[tier].append((job, fut))
+        self._size += 1
+        self._not_empty.set()
+
+    def _peek(self) -> Optional[_Item]:
+        """查看下一个将被取出的任务（不出队）。"""
+
+        for tier in self._tiers:
+            if tier:
+                return tier[0]
+        return None
+
+    def _pop(self) -> _Item:
+        """取出优先级最高（编号最小）队列的队首任务；调用方保证队列非空。"""
+
+        for tier in self._tiers:
+            if tier:
+                item = tier.popleft()
+                self._size -= 1
+                if self._slots is not None:
+                    self._slots.release()
+                return item
+        raise RuntimeError("DBWriter 队列为空")
+
+    def _warn_if_full(self) -> None:
+        """队列已满时输出告警（限频），便于定位写入热点。"""
+
+        if not self.full():
+            return
+        now = time.monotonic()
+        if now - self._last_full_warn < _FULL_WARN_INTERVAL_SECONDS:
+            return
+        self._last_full_warn = now
+        logger.warning(f"DBWriter 队列已满（{self._maxsize}），提交方将等待。")
+
     async def run_forever(self) -> None:
-        """持续运行队列消费循环（应在 startup 时以 task 方式启动）。"""
+        """持续运行队列消费循环（应在 startup 时以 task 方式启动）。
+
+        仅在队列为空时才挂起等待；有积压时直接同步出队（相当于 get_nowait 连续取），
+        不会为每个任务额外让出一次事件循环。
+        """
 
         if self._running:
             return
         self._running = True
         logger.info("DBWriter 已启动。")
         while True:
-            _priority, _seq, job, fut = await self.q.get()
-            try:
-                result = await job.execute()
-                if fut is not None and not fut.done():
-                    fut.set_result(result)
-            except Exception as e:
-                if fut is not None and not fut.done():
-                    fut.set_exception(e)
-                logger.error(f"DBWriter 任务执行失败：{e}")
-            finally:
-                self.q.task_done()
+            while self._size == 0:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            job, fut = self._pop()
+            if not _is_batchable(job):
+                await self._run_one(job, fut)
+                continue
+
+            # 合并紧随其后的可合并任务（保持出队顺序）
+            batch: list[_Item] = [(job, fut)]
+            deadline: Optional[float] = None
+            while len(batch) < _MAX_BATCH:
+                nxt = self._peek()
+                if nxt is None:
+                    # 队列已空：在等待窗口内继续收集，窗口从第一次排空时开始计时
+                    if self._linger <= 0:
+                        break
+                    if deadline is None:
+                        deadline = time.monotonic() + self._linger
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._not_empty.clear()
+                    try:
+                        await asyncio.wait_for(self._not_empty.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    continue
+                if not _is_batchable(nxt[0]):
+                    break
+                batch.append(self._pop())
+            await self._run_batch(batch)
+
+    async def _run_one(self, job: DBWriteJob, fut: Optional[asyncio.Future[object]]) -> None:
+        """独立执行单个任务并回填结果。"""
+
+        try:
+            result = await job.execute()
+            if fut is not None and not fut.done():
+                fut.set_result(result)
+        except Exception as e:
+            if fut is not None and not fut.done():
+                fut.set_exception(e)
+            logger.error(f"DBWriter 任务执行失败：{e}")
+
+    async def _run_batch(self, batch: list[_Item]) -> None:
+        """在一个 Session/事务内执行一批可合并任务；失败时回退为逐个执行。"""
+
+        if len(batch) == 1:
+            await self._run_one(*batch[0])
+            return
+        try:
+            results: list[object] = []
+            async with get_session() as session:
+                for job, _fut in batch:
+                    results.append(await job.execute_in(session))  # type: ignore[attr-defined]
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"DBWriter 合并写入失败，回退为逐个执行（{len(batch)} 个）：{e}")
+            for job, fut in batch:
+                await self._run_one(job, fut)
+            return
+        for (_job, fut), result in zip(batch, results, strict=True):
+            if fut is not None and not fut.done():
+                fut.set_result(result)
 
 # 全局实例
 db_writer = DBWriter()
@@ -0,0 +1,45 @@
+-- 0003_without_rowid.sql: 小行宽、非整数/复合主键的表改为 WITHOUT ROWID
+-- 主键即聚簇 B 树，省去隐藏 rowid 与主键自动索引（一次主键查找少一次 B 树下探）
+-- media_cache / stickers 含较长文本列，行宽不适合 WITHOUT ROWID，保持不变
+-- SQLite 不支持 ALTER 为 WITHOUT ROWID，需重建表；由 migrations_runner 的事务整体包裹
+
+DROP TABLE IF EXISTS user_profile__new;
+CREATE TABLE user_profile__new (
+  qq_id TEXT PRIMARY KEY,
+  effective_count INTEGER NOT NULL DEFAULT 0,
+  next_memory_at INTEGER NOT NULL DEFAULT 50,
+  last_memory_msg_id INTEGER NULL,
+  pending_memory INTEGER NOT NULL DEFAULT 0,
+  created_at INTEGER NOT NULL,
+  updated_at INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT INTO user_profile__new
+  SELECT qq_id, effective_count, next_memory_at, last_memory_msg_id, pending_memory, created_at, updated_at
+  FROM user_profile;
+DROP TABLE user_profile;
+ALTER TABLE user_profile__new RENAME TO user_profile;
+
+DROP TABLE IF EXISTS memory_evidence__new;
+CREATE TABLE memory_evidence__new (
+  memory_id INTEGER NOT NULL,
+  msg_id INTEGER NOT NULL,
+  PRIMARY KEY (memory_id, msg_id)
+) WITHOUT ROWID;
+INSERT INTO memory_evidence__new SELECT memory_id, msg_id FROM memory_evidence;
+DROP TABLE memory_evidence;
+ALTER TABLE memory_evidence__new RENAME TO memory_evidence;
+
+DROP TABLE IF EXISTS bot_rate_limit__new;
+CREATE TABLE bot_rate_limit__new (
+  scene_type TEXT NOT NULL,
+  scene_id TEXT NOT NULL,
+  last_sent_ts INTEGER NOT NULL DEFAULT 0,
+  cooldown_until_ts INTEGER NOT NULL DEFAULT 0,
+  recent_bot_msg_count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (scene_type, scene_id)
+) WITHOUT ROWID;
+INSERT INTO bot_rate_limit__new
+  SELECT scene_type, scene_id, last_sent_ts, cooldown_until_ts, recent_bot_msg_count
+  FROM bot_rate_limit;
+DROP TABLE bot_rate_limit;
+ALTER TABLE bot_rate_limit__new RENAME TO bot_rate_limit;
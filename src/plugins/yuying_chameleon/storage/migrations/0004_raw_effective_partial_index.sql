@@ -0,0 +1,6 @@
+-- 0004_raw_effective_partial_index.sql: raw_messages 有效用户消息的部分索引
+-- 反思任务按 (scene_type, 时间窗口) 统计有效、非机器人消息；条件与 ORM 的 .is_(True)/.is_(False) 保持一致
+
+CREATE INDEX IF NOT EXISTS idx_raw_eff_scene_ts
+  ON raw_messages (scene_type, timestamp, scene_id)
+  WHERE is_effective IS 1 AND is_bot IS 0;
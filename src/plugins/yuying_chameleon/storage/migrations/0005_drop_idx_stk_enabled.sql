@@ -0,0 +1,4 @@
+-- 0005_drop_idx_stk_enabled.sql: 删除 stickers.is_enabled 低基数单列索引
+-- 布尔列仅 2 个取值且绝大多数为启用，查询规划器不会选用；保留只会拖慢写入
+
+DROP INDEX IF EXISTS idx_stk_enabled;
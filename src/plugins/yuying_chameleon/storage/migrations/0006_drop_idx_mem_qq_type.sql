@@ -0,0 +1,4 @@
+-- 0006_drop_idx_mem_qq_type.sql: 删除 memories (qq_id, type, updated_at) 索引
+-- 记忆查询均按 (qq_id, tier) 过滤并按 updated_at 排序，由 idx_mem_qq_tier 覆盖；无按 type 过滤的查询
+
+DROP INDEX IF EXISTS idx_mem_qq_type;
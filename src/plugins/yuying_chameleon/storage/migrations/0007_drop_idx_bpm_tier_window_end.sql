@@ -0,0 +1,5 @@
+-- 0007_drop_idx_bpm_tier_window_end.sql: 删除 bot_personality_memories (tier, window_end_ts) 索引
+-- 人格检索按 (tier, scope_type, scope_id) 过滤，由 idx_bpm_lookup 前缀覆盖；
+-- 仅每日清理过期 recent 记录时按 window_end_ts 扫描，小表全扫即可，省去每次写入的索引维护
+
+DROP INDEX IF EXISTS idx_bpm_tier_window_end;
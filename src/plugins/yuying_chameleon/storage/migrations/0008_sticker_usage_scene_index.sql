@@ -0,0 +1,5 @@
+-- 0008_sticker_usage_scene_index.sql: sticker_usage 场景冷却查询的覆盖索引
+-- 选表情时对每个候选查询"本场景上次使用时间"；此前该表无任何索引，每次都是全表扫描
+
+CREATE INDEX IF NOT EXISTS idx_su_scene_sticker_used
+  ON sticker_usage (scene_type, scene_id, sticker_id, used_at);
@@ -0,0 +1,9 @@
+-- 0009_memory_expiry_index.sql: get_expired_active 的表达式部分索引
+-- 过期判断 (created_at + ttl_days * 86400) < now 无法利用普通列索引，此前需扫描全部记忆；
+-- 按 (tier, 到期时间) 建表达式索引，只收录设置了 ttl_days 的行
+-- 注意：tier 在查询中是绑定参数，不能写进 WHERE（部分索引条件需与查询字面量一致）；
+--       查询侧的表达式必须与此处完全一致（86400 需内联为字面量）
+
+CREATE INDEX IF NOT EXISTS idx_mem_expiry
+  ON memories (tier, (created_at + ttl_days * 86400))
+  WHERE ttl_days IS NOT NULL;
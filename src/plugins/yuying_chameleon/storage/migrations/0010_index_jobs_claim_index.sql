@@ -0,0 +1,9 @@
+-- 0010_index_jobs_claim_index.sql: 任务认领查询的覆盖索引
+-- 认领子查询按 status/next_retry_ts 过滤、再按 item_type 过滤并按 created_at 排序，只取 job_id；
+-- (status, next_retry_ts, item_type, created_at) 覆盖全部列，无需回表
+-- 原 idx_jobs_status(status, next_retry_ts) 是新索引的前缀，删除以免重复维护
+
+CREATE INDEX IF NOT EXISTS idx_jobs_claim
+  ON index_jobs (status, next_retry_ts, item_type, created_at);
+
+DROP INDEX IF EXISTS idx_jobs_status;
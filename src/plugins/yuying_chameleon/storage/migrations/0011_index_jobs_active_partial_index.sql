@@ -0,0 +1,12 @@
+-- 0011_index_jobs_active_partial_index.sql: 任务认领改用部分索引
+-- 已完成（done/dead）的任务占 index_jobs 绝大多数，只为可认领状态建索引，
+-- 索引大小只随待处理积压增长，与历史任务总量无关
+-- 查询以字面量 status IN ('pending', 'failed') 过滤，与此处 WHERE 逐字一致；
+-- 末列 status 使认领子查询成为覆盖索引扫描
+-- 取代 0010 的 idx_jobs_claim（其余查询不按 status 过滤）
+
+CREATE INDEX IF NOT EXISTS idx_jobs_active
+  ON index_jobs (next_retry_ts, item_type, created_at, status)
+  WHERE status IN ('pending', 'failed');
+
+DROP INDEX IF EXISTS idx_jobs_claim;
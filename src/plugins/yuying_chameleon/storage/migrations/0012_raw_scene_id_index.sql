@@ -0,0 +1,7 @@
+-- 0012_raw_scene_id_index.sql: raw_messages 按场景 + 消息 id 计数的覆盖索引
+-- 发送前统计"某条消息之后本场景又来了多少条"（scene_type=? AND scene_id=? AND id>?）；
+-- idx_raw_scene_ts 第三列是 timestamp，id 条件无法作为范围使用，只能扫完该场景的全部索引项
+-- (scene_type, scene_id, id) 让计数变为只扫描 id 之后那一段的索引范围
+
+CREATE INDEX IF NOT EXISTS idx_raw_scene_id
+  ON raw_messages (scene_type, scene_id, id);
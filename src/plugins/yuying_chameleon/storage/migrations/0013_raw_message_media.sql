@@ -0,0 +1,19 @@
+-- 0013_raw_message_media.sql: 图片短标识 -> 消息 id 的映射表
+-- 图片说明生成后需要找出"内容里带 [image:media_key] 标记的历史消息"回填说明；
+-- 此前用 content LIKE '%[image:key]%' 查询，前导通配符用不上任何索引，每次全表扫描 raw_messages
+-- 写入消息时同步登记其中的图片标记，查询改为按主键 (media_key, msg_id) 的范围查找
+-- 行很小（短文本 + 整数），使用 WITHOUT ROWID
+
+CREATE TABLE IF NOT EXISTS raw_message_media (
+  media_key TEXT NOT NULL,
+  msg_id INTEGER NOT NULL,
+  PRIMARY KEY (media_key, msg_id)
+) WITHOUT ROWID;
+
+-- 回填：只需覆盖仍在等待处理的图片任务（item_type=ocr，ref_id 即 media_key），
+-- 已处理完的图片不会再触发回填查询；这里的 LIKE 扫描只在迁移时执行一次
+INSERT OR IGNORE INTO raw_message_media (media_key, msg_id)
+  SELECT j.ref_id, r.id
+  FROM index_jobs AS j
+  JOIN raw_messages AS r ON r.content LIKE '%[image:' || j.ref_id || '%'
+  WHERE j.item_type = 'ocr' AND j.status IN ('pending', 'failed', 'processing');
@@ -0,0 +1,36 @@
+-- 0014_sticker_intent.sql: 表情包意图拆分表 + 待打标部分索引
+-- 选表情按意图筛选此前用 intents LIKE '%intent%'（intents 为逗号分隔字符串），
+-- 前导通配符用不上任何索引，每次选表情都全表扫描 stickers
+-- 意图拆成 (sticker_id, intent) 一行一个，查询改为按 intent 的索引查找再按主键回表
+-- 意图统一 trim + 小写存储；行很小（两列短文本），使用 WITHOUT ROWID
+
+CREATE TABLE IF NOT EXISTS sticker_intent (
+  sticker_id TEXT NOT NULL,
+  intent TEXT NOT NULL,
+  PRIMARY KEY (sticker_id, intent)
+) WITHOUT ROWID;
+
+-- 主键前缀 sticker_id 用于更新元信息时按表情包整体替换；按意图查找走这条二级索引
+-- （WITHOUT ROWID 表的二级索引自带主键列，查找 sticker_id 无需回表）
+CREATE INDEX IF NOT EXISTS idx_stk_intent ON sticker_intent (intent);
+
+-- 回填：递归 CTE 按逗号拆分现有 intents
+WITH RECURSIVE split(sticker_id, item, rest) AS (
+  SELECT sticker_id, '', intents || ',' FROM stickers
+  WHERE intents IS NOT NULL AND intents <> ''
+  UNION ALL
+  SELECT sticker_id,
+         lower(trim(substr(rest, 1, instr(rest, ',') - 1))),
+         substr(rest, instr(rest, ',') + 1)
+  FROM split WHERE rest <> ''
+)
+INSERT OR IGNORE INTO sticker_intent (sticker_id, intent)
+  SELECT sticker_id, item FROM split WHERE item <> '';
+
+-- 待打标（auto 包、启用、未封禁、tags 为空）的部分索引：
+-- 已打标的表情包占绝大多数，索引只收录待处理积压，打标后随 UPDATE 移出
+-- 条件与查询逐字一致（IS 1 / IS 0 对应 .is_(True)/.is_(False)，'' 为内联字面量），
+-- SQLite 才能判定查询条件蕴含索引条件
+CREATE INDEX IF NOT EXISTS idx_stk_pending_tag
+  ON stickers (pack)
+  WHERE is_enabled IS 1 AND is_banned IS 0 AND (tags IS NULL OR tags = '');
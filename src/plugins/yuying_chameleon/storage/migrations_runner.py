@@ -8,7 +8,11 @@
 
 from __future__ import annotations
 
+import os
+import re
 import time
+import zlib
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable
 
@@ -17,6 +21,13 @@ from sqlalchemy import text
 
 from .sqlalchemy_engine import engine
 
+# 空白行与整行注释（连同行尾换行符，单次正则替换完成清理，替代逐行 Python 循环）
+# - [ \t]* 不跨行匹配，避免 \s* 在多行间回溯；末行无换行符时由 \Z 兜底
+_BLANK_OR_COMMENT_LINE_RE = re.compile(r"(?m)^[ \t]*(?:--[^\n]*)?(?:\n|\Z)")
+
+# 已解析语句缓存：(路径, mtime_ns, size) -> 语句列表；文件改动后自动失效
+_STATEMENTS_CACHE: dict[tuple[str, int, int], list[str]] = {}
+
 
 def _migrations_dir() -> Path:
     return Path(__file__).resolve().parent / "migrations"
@@ -24,45 +35,80 @@ def _migrations_dir() -> Path:
 
 def _iter_migration_files() -> Iterable[Path]:
     d = _migrations_dir()
-    if not d.exists() or not d.is_dir():
+    if not d.is_dir():
         return []
-    files = [p for p in d.iterdir() if p.is_file() and p.name.endswith(".sql")]
-    files.sort(key=lambda p: p.name)
-    return files
+    # os.scandir 的 DirEntry 自带目录读取时得到的类型信息，is_file() 无需额外 stat
+    with os.scandir(d) as it:
+        entries = [e for e in it if e.name.endswith(".sql") and e.is_file()]
+    entries.sort(key=lambda e: e.name)
+    return [Path(e.path) for e in entries]
+
+
+@lru_cache(maxsize=1)
+def _migration_files_cached() -> tuple[Path, ...]:
+    """已排序的 migration 文件列表（进程内只扫描一次目录）。
+
+    运行时新增 migration 文件（如测试）后需调用 `_migration_files_cached.cache_clear()`。
+    """
+
+    return tuple(_iter_migration_files())
 
 
 def _split_sql(sql: str) -> list[str]:
     """将一个 .sql 文件内容拆成可执行语句列表（简单分号拆分，适用于本项目的迁移文件）。"""
 
     # 移除整行注释，避免把注释和 SQL 拼到同一个 statement 里导致驱动报错
-    cleaned_lines: list[str] = []
-    for line in (sql or "").splitlines():
-        s = line.strip()
-        if not s:
-            continue
-        if s.startswith("--"):
-            continue
-        cleaned_lines.append(line)
+    cleaned = _BLANK_OR_COMMENT_LINE_RE.sub("", sql or "")
+
+    return [stmt for stmt in (raw.strip() for raw in cleaned.split(";")) if stmt]
+
 
-    cleaned = "\n".join(cleaned_lines)
+def _load_statements(f: Path) -> list[str]:
+    """读取并拆分一个 migration 文件（按 mtime+size 缓存解析结果）。"""
 
-    parts: list[str] = []
-    for raw in cleaned.split(";"):
-        stmt = raw.strip()
-        if stmt:
-            parts.append(stmt)
-    return parts
+    st = f.stat()
+    key = (str(f), st.st_mtime_ns, st.st_size)
+    cached = _STATEMENTS_CACHE.get(key)
+    if cached is None:
+        cached = _split_sql(f.read_text(encoding="utf-8"))
+        _STATEMENTS_CACHE[key] = cached
+    return cached
+
+
+def _files_fingerprint(files: Iterable[Path]) -> int:
+    """migration 文件名集合的指纹（写入 SQLite 的 PRAGMA user_version）。
+
+    本项目存在同序号文件（两个 0002_*），无法用“最大序号”判断是否全部执行过，
+    因此对排序后的文件名列表取 crc32；限制在 1..2^31-1，适配 user_version 的有符号
+    32 位整数，且不与新库默认值 0 冲突。
+    """
+
+    crc = zlib.crc32("\n".join(f.name for f in files).encode("utf-8")) & 0x7FFFFFFF
+    return crc or 1
 
 
 async def run_migrations() -> None:
     """执行 migrations（在插件启动时调用）。"""
 
-    files = list(_iter_migration_files())
+    files = _migration_files_cached()
     if not files:
         logger.warning("未发现 migrations 文件，将回退为 create_all。")
         return
 
+    is_sqlite = engine.dialect.name == "sqlite"
+    fingerprint = _files_fingerprint(files)
+
     async with engine.begin() as conn:
+        if is_sqlite:
+            # 快速路径：上次启动已执行完同一组文件，跳过 schema_migrations 查询
+            user_version = (await conn.exec_driver_sql("PRAGMA user_version")).scalar()
+            if user_version == fingerprint:
+                return
+            # pysqlite 只在 DML 前隐式 BEGIN，DDL 默认逐条自动提交；
+            # 显式开启事务，使本次执行的全部 migration（含 DDL 与 schema_migrations 记录）
+            # 随 engine.begin() 一起提交或回滚，失败时不会留下半应用的表结构
+            await conn.exec_driver_sql("BEGIN")
+
         await conn.execute(
             text(
                 """
@@ -74,20 +120,24 @@ async def run_migrations() -> None:
             )
         )
 
-        existing = await conn.execute(text("SELECT version FROM schema_migrations"))
-        applied = {str(row[0]) for row in existing.fetchall()}
+        applied = set(await conn.scalars(text("SELECT version FROM schema_migrations")))
 
         for f in files:
             version = f.name
             if version in applied:
                 continue
-            sql = f.read_text(encoding="utf-8").strip()
-            if not sql:
+            statements = _load_statements(f)
+            if not statements:
                 continue
             logger.info(f"Applying migration: {version}")
-            for stmt in _split_sql(sql):
+            # 逐条经 exec_driver_sql 执行（本项目 migrations 不含绑定参数）；
+            # 不用驱动的 executescript：它会先隐式 COMMIT，破坏上面的事务
+            for stmt in statements:
                 await conn.exec_driver_sql(stmt)
             await conn.execute(
                 text("INSERT INTO schema_migrations(version, applied_at) VALUES (:v, :ts)"),
                 {"v": version, "ts": int(time.time())},
             )
+
+        if is_sqlite:
+            await conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
@@ -34,13 +34,14 @@ from __future__ import annotations
 from typing import Optional
 
 # SQLAlchemy类型导入
-from sqlalchemy import String, Integer, Text, Boolean, Float, Index, UniqueConstraint
+from sqlalchemy import String, Integer, Text, Boolean, Float, Index, UniqueConstraint, text
 # - String: 可变长度字符串(VARCHAR)
 # - Integer: 整数类型(INT)
 # - Text: 长文本类型(TEXT),无长度限制
 # - Boolean: 布尔值(0/1)
 # - Float: 浮点数(REAL)
 # - Index: 索引定义,用于优化查询性能
+# - text: 原始SQL片段(用于部分索引的WHERE条件)
 
 # SQLAlchemy ORM核心类
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
@@ -51,6 +52,20 @@ from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 import time  # Python标准库,用于获取Unix时间戳
 
 
+def _now_ts() -> int:
+    """当前Unix时间戳(秒) - 所有时间戳字段共用的default/onupdate
+
+    说明:
+    - 模块级函数只创建一次,所有列共享,避免每个字段各持一个lambda
+    - 表结构由SQL迁移文件定义,created_at等列在库中没有DEFAULT,
+      因此时间戳仍由应用侧填充(而不是server_default)
+    - 保持 int(time.time()): 实测比 time.clock_gettime(CLOCK_REALTIME_COARSE)
+      及其 _ns 版本更快(后两者约慢1.7倍),粗粒度时钟在此无收益
+    """
+
+    return int(time.time())
+
+
 class Base(DeclarativeBase):
     """ORM 基类 - 所有数据库模型类的父类
 
@@ -59,6 +74,11 @@ class Base(DeclarativeBase):
     - 所有数据库模型都继承自这个类
     - 自动生成表的元数据信息
 
+    SQLite连接参数(见 sqlalchemy_engine.set_sqlite_pragma,修改表结构时注意保持一致):
+    - journal_mode=WAL + synchronous=NORMAL: 读写并发,提交只追加WAL
+    - foreign_keys=ON, busy_timeout(可配置)
+    - temp_store=MEMORY, mmap_size=128MB, cache_size≈64MB
+
     使用方式:
     ```python
     class MyModel(Base):
@@ -129,17 +149,17 @@ class UserProfile(Base):
     # - 目的: 让后台worker知道哪些用户需要处理
 
     # ==================== 时间戳字段 ====================
-    created_at: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    created_at: Mapped[int] = mapped_column(Integer, default=_now_ts)
     # 创建时间 - 用户首次与机器人互动的时间
     # - 作用: 记录用户档案的创建时间
     # - 类型: Unix时间戳(整数,秒级)
-    # - 默认值: lambda: int(time.time()) - 插入记录时的当前时间
+    # - 默认值: _now_ts - 插入记录时的当前时间
     # - 只设置一次: 创建后不再修改
 
     updated_at: Mapped[int] = mapped_column(
         Integer,
-        default=lambda: int(time.time()),  # 创建时的初始值
-        onupdate=lambda: int(time.time()),  # 每次更新时自动更新
+        default=_now_ts,  # 创建时的初始值
+        onupdate=_now_ts,  # 每次更新时自动更新
     )
     # 更新时间 - 用户档案最后一次修改的时间
     # - 作用: 追踪用户档案的最后修改时间
@@ -148,6 +168,12 @@ class UserProfile(Base):
     # - 自动更新: 每次update操作时自动更新为当前时间(onupdate)
     # - 用途: 数据审计、用户活跃度分析
 
+    # WITHOUT ROWID: 主键即聚簇B树,省去隐藏rowid与主键自动索引的二次查找
+    # - 仅用于行很小的表(SQLite建议行宽 < 页大小的1/20)
+    # - 见迁移 0003_without_rowid.sql
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
 class RawMessage(Base):
     """原始消息表 - 存储所有收到和发送的消息(包括机器人自己发送的消息)
 
@@ -167,6 +193,7 @@ class RawMessage(Base):
     - 主键: id (自增)
     - 复合索引1: (qq_id, timestamp) - 用于查询某用户的历史消息
     - 复合索引2: (scene_type, scene_id, timestamp) - 用于查询某场景(群/私聊)的历史消息
+    - 复合索引3: (scene_type, scene_id, id) - 用于统计某场景在某条消息之后的消息数
 
     字段分类:
     - 标识字段: id, qq_id, scene_type, scene_id, timestamp
@@ -184,6 +211,10 @@ class RawMessage(Base):
     # - 类型: 自增整数(autoincrement=True)
     # - 用途: 作为消息引用、记忆证据链接的ID
     # - 单调性: 保证时间顺序(ID越大,消息越新)
+    # - DDL说明: autoincrement=True 在SQLite下只表示"INTEGER PRIMARY KEY(rowid别名)",
+    #   SQLAlchemy不会生成 AUTOINCREMENT 关键字(除非 sqlite_autoincrement=True);
+    #   迁移文件中的 AUTOINCREMENT 有意保留: id 被 memory_evidence、last_memory_msg_id、
+    #   index_jobs.ref_id 等引用,删除末尾行后也不得复用,代价仅是同一事务内一次 sqlite_sequence 更新
 
     qq_id: Mapped[str] = mapped_column(String)
     # 发送者QQ号 - 消息的发送方
@@ -265,6 +296,10 @@ class RawMessage(Base):
     # - 用途: 构建对话上下文、理解对话关联
 
     # ==================== 状态标记字段 ====================
+    # 说明: 三个布尔列保持独立,不合并为位标志(flags)整数列
+    # - SQLite记录格式中整数0/1是专用类型码(serial type 8/9),不占数据字节,
+    #   每列仅1字节头;合并为0~7的flags后仍需1字节头+1字节数据,几乎不省空间
+    # - 独立列可直接用于 `RawMessage.is_effective.is_(True)` 过滤与部分索引条件
     mentioned_bot: Mapped[bool] = mapped_column(Boolean, default=False)
     # @机器人标记 - 消息是否@了机器人
     # - 作用: 标记用户是否显式@机器人
@@ -302,8 +337,60 @@ class RawMessage(Base):
         # - 用途: 查询某场景(群聊/私聊)的历史消息,按时间排序
         # - 查询示例: SELECT * FROM raw_messages WHERE scene_type='group' AND scene_id='456' ORDER BY timestamp DESC
         # - 覆盖查询: 索引包含了查询和排序所需的所有字段,性能最优
+
+        Index(
+            "idx_raw_eff_scene_ts",
+            "scene_type",
+            "timestamp",
+            "scene_id",
+            sqlite_where=text("is_effective IS 1 AND is_bot IS 0"),
+        ),
+        # 索引3: 仅含"有效用户消息"的部分索引(scene_type, timestamp, scene_id)
+        # - 用途: 反思任务按时间窗口统计各群/私聊的有效消息数、@机器人次数
+        # - 部分索引: 只收录 is_effective=1 且非机器人的行,体积小,无需回表过滤
+        # - 条件写成 IS 1 / IS 0: 与 SQLAlchemy 的 .is_(True)/.is_(False) 生成的SQL一致,
+        #   SQLite 才能判定查询条件蕴含索引条件并选用该索引
+        # - 见迁移 0004_raw_effective_partial_index.sql
+
+        Index("idx_raw_scene_id", "scene_type", "scene_id", "id"),
+        # 索引4: (scene_type, scene_id, id) 联合索引
+        # - 用途: 统计某场景在某条消息之后的新消息数(发送前判断对话是否已"翻篇")
+        # - 查询示例: SELECT count(*) FROM raw_messages WHERE scene_type='group' AND scene_id='456' AND id>789
+        # - 索引2 的第三列是 timestamp,id 条件用不上范围,会扫描该场景全部索引项
+        # - 见迁移 0012_raw_scene_id_index.sql
     )
 
+class RawMessageMedia(Base):
+    """消息图片映射表 - 记录每条原始消息中出现的图片短标识(media_key)
+
+    这个表的作用:
+    1. 图片说明生成后,按 media_key 找出引用了该图片的历史消息,回填说明文字
+    2. 取代 content LIKE '%[image:key]%' 全表扫描,改为主键范围查找
+
+    数据来源:
+    - RawRepository 写入消息时,解析 content 中的 [image:...] 标记,同一事务内登记
+    - 见迁移 0013_raw_message_media.sql
+
+    主键策略:
+    - 复合主键: (media_key, msg_id) - 前缀 media_key 即查询条件,无需额外索引
+    """
+
+    __tablename__ = "raw_message_media"  # 数据库表名
+
+    # ==================== 复合主键 ====================
+    media_key: Mapped[str] = mapped_column(String, primary_key=True)
+    # 图片短标识 - 与消息内容中 [image:media_key] 标记一致
+    # - 主键: 与msg_id组成复合主键
+
+    msg_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 消息ID - 指向RawMessage表中包含该图片的消息
+    # - 关联: RawMessage.id
+
+    # WITHOUT ROWID: 主键即聚簇B树,省去隐藏rowid与主键自动索引的二次查找
+    # - 仅用于行很小的表(SQLite建议行宽 < 页大小的1/20)
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
 class Summary(Base):
     """对话摘要表 - 按场景和时间窗口生成的对话摘要
 
@@ -475,11 +562,11 @@ class BotPersonalityMemory(Base):
     model: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     prompt_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
-    created_at_ts: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    created_at_ts: Mapped[int] = mapped_column(Integer, default=_now_ts)
     updated_at_ts: Mapped[int] = mapped_column(
         Integer,
-        default=lambda: int(time.time()),
-        onupdate=lambda: int(time.time()),
+        default=_now_ts,
+        onupdate=_now_ts,
     )
     deleted_at_ts: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
@@ -500,7 +587,9 @@ class BotPersonalityMemory(Base):
             "memory_type",
             "updated_at_ts",
         ),
-        Index("idx_bpm_tier_window_end", "tier", "window_end_ts"),
+        # 不再建 (tier, window_end_ts) 索引(迁移 0007 已删除 idx_bpm_tier_window_end):
+        # 按 window_end_ts 的读取都带 scope_type/scope_id,走 idx_bpm_lookup 前缀;
+        # 仅每日清理任务按 tier+window_end_ts 扫描,小表全扫即可
         Index("idx_bpm_tier_type_updated", "tier", "memory_type", "updated_at_ts"),
     )
 
@@ -635,7 +724,7 @@ class Memory(Base):
     # - 用途: 记忆溯源、浓缩质量评估、回溯原始证据
 
     # ==================== 时间戳字段 ====================
-    created_at: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    created_at: Mapped[int] = mapped_column(Integer, default=_now_ts)
     # 创建时间 - 记忆首次提取的时间
     # - 作用: 记录记忆的创建时间
     # - 类型: Unix时间戳(整数,秒级)
@@ -643,8 +732,8 @@ class Memory(Base):
 
     updated_at: Mapped[int] = mapped_column(
         Integer,
-        default=lambda: int(time.time()),  # 创建时的初始值
-        onupdate=lambda: int(time.time()),  # 每次更新时自动更新
+        default=_now_ts,  # 创建时的初始值
+        onupdate=_now_ts,  # 每次更新时自动更新
     )
     # 更新时间 - 记忆最后一次修改或访问的时间
     # - 作用: 追踪记忆的最后活跃时间
@@ -663,14 +752,24 @@ class Memory(Base):
         #   ORDER BY updated_at DESC
         # - 场景: 获取用户的活跃记忆列表
 
-        Index("idx_mem_qq_type", "qq_id", "type", "updated_at"),
-        # 索引2: (qq_id, type, updated_at) 联合索引
-        # - 用途: 按类型查询用户记忆,并按更新时间排序
+        Index(
+            "idx_mem_expiry",
+            "tier",
+            text("(created_at + ttl_days * 86400)"),
+            sqlite_where=text("ttl_days IS NOT NULL"),
+        ),
+        # 索引2: (tier, 到期时间) 表达式部分索引(迁移 0009)
+        # - 用途: 定时清理查询已过期的 active 记忆
         # - 查询示例:
         #   SELECT * FROM memories
-        #   WHERE qq_id='123' AND type='preference'
-        #   ORDER BY updated_at DESC
-        # - 场景: 分析用户画像,如"获取用户所有偏好"
+        #   WHERE tier='active' AND ttl_days IS NOT NULL
+        #     AND (created_at + ttl_days * 86400) < now
+        # - 只收录设置了 ttl_days 的记忆; 查询侧表达式须与索引表达式一致(86400 为字面量)
+
+        # 说明: 不建 (qq_id, type, updated_at) 索引(迁移 0006 已删除 idx_mem_qq_type)
+        # - 所有记忆查询都按 qq_id + tier 过滤,没有按 type 过滤的查询
+        # - 也不把 type 插入索引1的 tier 与 updated_at 之间: 那样 ORDER BY updated_at
+        #   将无法直接利用索引顺序,反而需要额外排序
     )
 
 class MemoryEvidence(Base):
@@ -722,6 +821,11 @@ class MemoryEvidence(Base):
     # - 查找某条消息支撑了哪些记忆:
     #   SELECT memory_id FROM memory_evidence WHERE msg_id = 456
 
+    # WITHOUT ROWID: 主键即聚簇B树,省去隐藏rowid与主键自动索引的二次查找
+    # - 仅用于行很小的表(SQLite建议行宽 < 页大小的1/20)
+    # - 见迁移 0003_without_rowid.sql
+    __table_args__ = {"sqlite_with_rowid": False}
+
 
 class MediaCache(Base):
     """媒体缓存表 - 存储图片/表情包的预处理结果(caption、OCR等)
@@ -795,15 +899,15 @@ class MediaCache(Base):
     # - 用途: 图文理解、表情包文字匹配、信息提取
 
     # ==================== 时间戳字段 ====================
-    created_at: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    created_at: Mapped[int] = mapped_column(Integer, default=_now_ts)
     # 创建时间 - 缓存记录的创建时间
     # - 作用: 记录首次处理该图片的时间
     # - 类型: Unix时间戳(整数,秒级)
 
     updated_at: Mapped[int] = mapped_column(
         Integer,
-        default=lambda: int(time.time()),
-        onupdate=lambda: int(time.time()),
+        default=_now_ts,
+        onupdate=_now_ts,
     )
     # 更新时间 - 缓存记录的最后更新时间
     # - 作用: 追踪缓存的最后访问或修改时间
@@ -877,6 +981,11 @@ class BotRateLimit(Base):
     # - 重置时机: 超过窗口时间后归零
     # - 用途: 达到阈值(如12条)时触发刷屏保护
 
+    # WITHOUT ROWID: 主键即聚簇B树,省去隐藏rowid与主键自动索引的二次查找
+    # - 仅用于行很小的表(SQLite建议行宽 < 页大小的1/20)
+    # - 见迁移 0003_without_rowid.sql
+    __table_args__ = {"sqlite_with_rowid": False}
+
 
 class Sticker(Base):
     """表情包注册表 - 正式表情包库的权威清单
@@ -1030,14 +1139,14 @@ class Sticker(Base):
     # - 用途: 溯源、统计
 
     # ==================== 时间戳 ====================
-    created_at: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    created_at: Mapped[int] = mapped_column(Integer, default=_now_ts)
     # 创建时间 - 表情包入库时间
     # - 类型: Unix时间戳(整数,秒级)
 
     updated_at: Mapped[int] = mapped_column(
         Integer,
-        default=lambda: int(time.time()),
-        onupdate=lambda: int(time.time()),
+        default=_now_ts,
+        onupdate=_now_ts,
     )
     # 更新时间 - 表情包最后修改时间
     # - 类型: Unix时间戳(整数,秒级)
@@ -1048,12 +1157,57 @@ class Sticker(Base):
         # 索引1: fingerprint 单列索引
         # - 用途: 快速查找是否已有相同表情包(去重)
 
-        Index("idx_stk_enabled", "is_enabled"),
-        # 索引2: is_enabled 单列索引
-        # - 用途: 快速筛选所有启用的表情包
-        # - 查询示例: SELECT * FROM stickers WHERE is_enabled=True
+        # 说明: 不为 is_enabled 建索引(迁移 0005 已删除 idx_stk_enabled)
+        # - 布尔列只有2个取值,且绝大多数表情包为启用状态,全表扫描比"索引+回表"更快
+        # - 查询只会筛选"已启用",索引只会拖慢每次 INSERT/UPDATE
+
+        Index(
+            "idx_stk_pending_tag",
+            "pack",
+            sqlite_where=text("is_enabled IS 1 AND is_banned IS 0 AND (tags IS NULL OR tags = '')"),
+        ),
+        # 索引2: 待打标表情包的部分索引(pack)
+        # - 用途: StickerWorker 拉取 auto 包中尚未打标签的表情包
+        # - 部分索引: 只收录启用、未封禁且 tags 为空的行,打标后自动移出,体积只随积压增长
+        # - 条件与查询逐字一致('' 在查询中也以字面量内联),SQLite 才能选用该索引
+        # - 见迁移 0014_sticker_intent.sql
+    )
+
+
+class StickerIntent(Base):
+    """表情包意图表 - Sticker.intents 逗号分隔字符串的拆分形式
+
+    这个表的作用:
+    1. 按意图筛选可用表情包时走索引查找,取代 intents LIKE '%intent%' 全表扫描
+    2. 每个(表情包, 意图)一行,意图统一 trim + 小写
+
+    数据来源:
+    - StickerRepository 新增表情包/更新元信息时,同一事务内按 intents 整体替换
+    - 见迁移 0014_sticker_intent.sql(含存量回填)
+
+    主键策略:
+    - 复合主键: (sticker_id, intent) - 前缀 sticker_id 用于按表情包整体替换
+    - 索引: intent - 按意图查找,二级索引自带主键列,无需回表
+    """
+
+    __tablename__ = "sticker_intent"  # 数据库表名
+
+    # ==================== 复合主键 ====================
+    sticker_id: Mapped[str] = mapped_column(String, primary_key=True)
+    # 表情包ID - 指向Sticker表
+    # - 关联: Sticker.sticker_id
+
+    intent: Mapped[str] = mapped_column(String, primary_key=True)
+    # 意图 - intents 中的单个意图(trim + 小写)
+    # - 示例: "neutral"、"thanks"
+
+    # WITHOUT ROWID: 主键即聚簇B树,行很小(两列短文本)
+    __table_args__ = (
+        Index("idx_stk_intent", "intent"),
+        {"sqlite_with_rowid": False},
     )
 
+
 class StickerCandidate(Base):
     """表情包候选池 - 临时存放潜在表情包,重复出现后晋升
 
@@ -1197,7 +1351,7 @@ class StickerUsage(Base):
     数据增长:
     - 快速增长,每次发送表情包一条记录
     - 预计数据量: 随机器人活跃度增长,可能达到数万至数十万级
-    - 清理策略: 定期删除很久以前的记录(保留最近3个月)
+    - 清理策略: 每日删除3个月(90天)以前的记录(scheduler.jobs.purge_old_records)
 
     主键策略:
     - 自增主键: id - 每次使用独立记录
@@ -1241,13 +1395,23 @@ class StickerUsage(Base):
     # - 用途: 区分机器人使用和用户使用(未来扩展)
 
     # ==================== 时间戳 ====================
-    used_at: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    used_at: Mapped[int] = mapped_column(Integer, default=_now_ts)
     # 使用时间 - 表情包被发送的时间
     # - 作用: 记录使用时间点
     # - 类型: Unix时间戳(整数,秒级)
     # - 默认值: 当前时间
     # - 用途: 时间序列分析、冷却期判断、数据清理
 
+    # ==================== 索引定义 ====================
+    __table_args__ = (
+        Index("idx_su_scene_sticker_used", "scene_type", "scene_id", "sticker_id", "used_at"),
+        # 索引1: (scene_type, scene_id, sticker_id, used_at) 覆盖索引
+        # - 用途: 选表情时逐个候选查询"本场景上次使用时间"(冷却判断)
+        # - 查询示例: SELECT used_at FROM sticker_usage
+        #   WHERE scene_type=? AND scene_id=? AND sticker_id=? ORDER BY used_at DESC LIMIT 1
+        # - 覆盖查询: 直接在索引尾部取最大 used_at,无需回表,也不再全表扫描
+    )
+
 
 class IndexJob(Base):
     """索引任务表 - 后台异步处理的向量化和OCR任务队列
@@ -1274,7 +1438,7 @@ class IndexJob(Base):
     数据增长:
     - 快速增长,每条消息、每张图片都可能创建任务
     - 预计数据量: 随消息量增长,可能达到数十万级
-    - 清理策略: 定期删除completed和failed任务(保留最近7天)
+    - 清理策略: 每日删除7天前已结束(done/dead)的任务(scheduler.jobs.purge_old_records);failed仍会重试,不删除
 
     索引策略:
     - 主键: job_id (自增)
@@ -1352,7 +1516,7 @@ class IndexJob(Base):
     # - 用途: Worker只认领 next_retry_ts <= now() 的任务
 
     # ==================== 时间戳 ====================
-    created_at: Mapped[int] = mapped_column(Integer, default=lambda: int(time.time()))
+    created_at: Mapped[int] = mapped_column(Integer, default=_now_ts)
     # 创建时间 - 任务创建的时间
     # - 作用: 记录任务何时加入队列
     # - 类型: Unix时间戳(整数,秒级)
@@ -1360,8 +1524,8 @@ class IndexJob(Base):
 
     updated_at: Mapped[int] = mapped_column(
         Integer,
-        default=lambda: int(time.time()),
-        onupdate=lambda: int(time.time()),
+        default=_now_ts,
+        onupdate=_now_ts,
     )
     # 更新时间 - 任务最后修改的时间
     # - 作用: 追踪任务状态变更时间
@@ -1371,13 +1535,25 @@ class IndexJob(Base):
 
     # ==================== 索引定义 ====================
     __table_args__ = (
-        Index("idx_jobs_status", "status", "next_retry_ts"),
-        # 索引: (status, next_retry_ts) 联合索引
+        Index(
+            "idx_jobs_active",
+            "next_retry_ts",
+            "item_type",
+            "created_at",
+            "status",
+            sqlite_where=text("status IN ('pending', 'failed')"),
+        ),
+        # 索引: 可认领任务的部分索引(迁移 0011,取代 0010 的 idx_jobs_claim)
         # - 用途: Worker认领任务的核心查询
         # - 查询示例:
-        #   SELECT * FROM index_jobs
-        #   WHERE status='pending' AND next_retry_ts <= {now}
-        #   ORDER BY created_at ASC
-        #   LIMIT 10
-        # - 性能: 覆盖索引,高效支持任务认领
+        #   UPDATE index_jobs SET status='processing' WHERE job_id IN (
+        #     SELECT job_id FROM index_jobs
+        #     WHERE status IN ('pending', 'failed') AND next_retry_ts <= {now}
+        #       AND item_type IN (...)
+        #     ORDER BY created_at ASC
+        #     LIMIT 10
+        #   ) RETURNING *
+        # - 只收录 pending/failed 行: done/dead 任务再多,索引也只与积压量相关
+        # - 查询中的状态条件必须是字面量且与 WHERE 一致(见 index_jobs_repo._CLAIMABLE)
+        # - 末列 status + job_id(rowid) 使子查询无需回表
     )
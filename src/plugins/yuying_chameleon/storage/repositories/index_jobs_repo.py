@@ -3,13 +3,42 @@
 from __future__ import annotations
 
 import time
-from typing import List, Optional
+from typing import Any, Dict, List, cast
 
-from sqlalchemy import or_, select, update
+from sqlalchemy import CursorResult, Update, bindparam, delete, insert, literal_column, select, update
 
 from ..models import IndexJob
 from ..sqlalchemy_engine import get_session
 
+# 可认领状态条件：以字面量渲染 `status IN ('pending', 'failed')`，与部分索引
+# idx_jobs_active 的 WHERE 逐字一致（若作为绑定参数，SQLite 无法使用该部分索引）
+_CLAIMABLE = IndexJob.status.in_((literal_column("'pending'"), literal_column("'failed'")))
+
+# 任务认领语句：模块加载时构建一次；item_type 列表用 expanding 绑定参数，
+# 不同长度的类型列表共用同一个编译缓存项
+_CLAIM_STMT = (
+    update(IndexJob)
+    .where(
+        IndexJob.job_id.in_(
+            select(IndexJob.job_id)
+            .where(
+                _CLAIMABLE,
+                IndexJob.next_retry_ts <= bindparam("now"),
+                IndexJob.item_type.in_(bindparam("item_types", expanding=True)),
+            )
+            .order_by(IndexJob.created_at.asc())
+            .limit(bindparam("limit"))
+            .scalar_subquery()
+        )
+    )
+    .values(status="processing", updated_at=bindparam("now"))
+    .returning(IndexJob)
+    .execution_options(synchronize_session=False)
+)
+
+# add_many 单次执行的最大行数，限制单条语句的参数与内存占用
+_ADD_MANY_CHUNK = 500
+
 class IndexJobRepository:
     """索引任务仓储。"""
 
@@ -20,77 +49,116 @@ class IndexJobRepository:
         async with get_session() as session:
             session.add(job)
             await session.commit()
-            await session.refresh(job)
             return job
 
     @staticmethod
-    async def get_pending_jobs(limit: int = 10, item_type: Optional[str] = None) -> List[IndexJob]:
-        """获取待处理/可重试的任务。"""
+    async def add_many(rows: List[Dict[str, Any]]) -> None:
+        """以 Core 批量 INSERT 写入多条索引任务（不构造 ORM 实例，不回读 job_id）。
+
+        每 `_ADD_MANY_CHUNK` 行执行一次，整体一个事务、一次提交；
+        各行的键集合需一致，未给出的列使用模型默认值（created_at/updated_at 等）。
+        """
 
+        if not rows:
+            return
         async with get_session() as session:
-            current_ts = int(time.time())
-            stmt = (
-                select(IndexJob)
-                .where(
-                    or_(IndexJob.status == "pending", IndexJob.status == "failed"),
-                    IndexJob.next_retry_ts <= current_ts
-                )
-            )
-            if item_type:
-                stmt = stmt.where(IndexJob.item_type == item_type)
-            stmt = stmt.order_by(IndexJob.created_at.asc()).limit(limit)
-            result = await session.execute(stmt)
-            return list(result.scalars().all())
+            for start in range(0, len(rows), _ADD_MANY_CHUNK):
+                await session.execute(insert(IndexJob), rows[start : start + _ADD_MANY_CHUNK])
+            await session.commit()
 
     @staticmethod
-    async def get_pending_jobs_for_types(item_types: List[str], limit: int = 10) -> List[IndexJob]:
-        """获取指定类型集合的待处理/可重试任务。"""
+    async def claim_pending(item_types: List[str], limit: int = 10) -> List[IndexJob]:
+        """原子认领一批待处理/可重试任务（置为 processing 并返回）。
+
+        单条 `UPDATE ... WHERE job_id IN (SELECT ...) RETURNING`：
+        - 取代“先查询、再逐条 mark_processing”的 1+N 次往返与 N 次提交；
+        - 查询与标记在同一语句内完成，多个消费者不会认领到同一任务。
+        """
 
         if not item_types:
             return []
         async with get_session() as session:
-            current_ts = int(time.time())
-            stmt = (
-                select(IndexJob)
-                .where(
-                    or_(IndexJob.status == "pending", IndexJob.status == "failed"),
-                    IndexJob.next_retry_ts <= current_ts,
-                    IndexJob.item_type.in_(item_types),
-                )
-                .order_by(IndexJob.created_at.asc())
-                .limit(limit)
+            result = await session.execute(
+                _CLAIM_STMT,
+                {"now": int(time.time()), "item_types": list(item_types), "limit": int(limit)},
             )
-            result = await session.execute(stmt)
-            return list(result.scalars().all())
+            jobs = list(result.scalars().all())
+            await session.commit()
+            # RETURNING 不保证顺序，按创建时间恢复 FIFO
+            jobs.sort(key=lambda j: (j.created_at, j.job_id))
+            return jobs
 
     @staticmethod
-    async def mark_processing(job_id: int) -> None:
-        """将任务标记为 processing。"""
+    async def requeue_processing() -> int:
+        """把遗留的 processing 任务放回 pending，返回放回的行数。
+
+        `claim_pending` 一次把整批任务置为 processing，只有处理完才写回最终状态；
+        进程在处理中途退出时，这些任务不会再被认领（`_CLAIMABLE` 不含 processing）。
+        启动时、worker 开始认领之前调用一次：此时不可能有正在处理的任务。
+        """
 
         async with get_session() as session:
             stmt = (
                 update(IndexJob)
-                .where(IndexJob.job_id == job_id)
-                .values(status="processing", updated_at=int(time.time()))
+                .where(IndexJob.status == "processing")
+                .values(status="pending", updated_at=int(time.time()))
+                .execution_options(synchronize_session=False)
             )
-            await session.execute(stmt)
+            result = cast(CursorResult, await session.execute(stmt))
             await session.commit()
+            return int(result.rowcount or 0)
+
+    @staticmethod
+    def update_status_stmt(
+        job_id: int,
+        status: str,
+        next_retry_ts: int = 0,
+    ) -> Update:
+        """构建"更新任务状态"的 UPDATE 语句（failed 时 retry_count +1）。
+
+        供 `update_status` 与 DBWriter 合并写入任务共用。
+        """
+
+        values: Dict[str, Any] = {
+            "status": status,
+            "next_retry_ts": next_retry_ts,
+            "updated_at": int(time.time()),
+        }
+        if status == "failed":
+            values["retry_count"] = IndexJob.retry_count + 1
+        return update(IndexJob).where(IndexJob.job_id == job_id).values(**values)
 
     @staticmethod
     async def update_status(job_id: int, status: str, next_retry_ts: int = 0) -> None:
         """更新任务状态，并在失败时递增 retry_count。"""
 
         async with get_session() as session:
+            await session.execute(IndexJobRepository.update_status_stmt(job_id, status, next_retry_ts))
+            await session.commit()
+
+    @staticmethod
+    async def purge_finished(before_ts: int, batch: int = 5000) -> int:
+        """删除一批 updated_at 早于 before_ts 的已结束任务（done/dead），返回删除行数。
+
+        failed 任务仍会被重试，不在清理范围内。每次最多删除 `batch` 行，
+        调用方循环调用直到返回 0，单个事务不会长时间持有写锁。
+        """
+
+        async with get_session() as session:
+            victims = (
+                select(IndexJob.job_id)
+                .where(IndexJob.status.in_(("done", "dead")), IndexJob.updated_at < before_ts)
+                .limit(batch)
+                .scalar_subquery()
+            )
             stmt = (
-                update(IndexJob)
-                .where(IndexJob.job_id == job_id)
-                .values(status=status, next_retry_ts=next_retry_ts, updated_at=int(time.time()))
+                delete(IndexJob)
+                .where(IndexJob.job_id.in_(victims))
+                .execution_options(synchronize_session=False)
             )
-            if status == "failed":
-                stmt = stmt.values(retry_count=IndexJob.retry_count + 1)
-            
-            await session.execute(stmt)
+            result = cast(CursorResult, await session.execute(stmt))
             await session.commit()
+            return int(result.rowcount or 0)
 
     @staticmethod
     def compute_backoff_ts(retry_count: int) -> int:
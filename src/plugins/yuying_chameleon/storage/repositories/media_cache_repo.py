@@ -5,11 +5,15 @@ from __future__ import annotations
 import time
 from typing import Optional
 
-from sqlalchemy import select, update
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from ..models import MediaCache
 from ..sqlalchemy_engine import get_session
 
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_BY_KEY_STMT = select(MediaCache).where(MediaCache.media_key == bindparam("media_key"))
+
 class MediaCacheRepository:
     """媒体缓存仓储。"""
 
@@ -18,7 +22,7 @@ class MediaCacheRepository:
         """按 media_key 获取缓存记录。"""
 
         async with get_session() as session:
-            result = await session.execute(select(MediaCache).where(MediaCache.media_key == media_key))
+            result = await session.execute(_BY_KEY_STMT, {"media_key": media_key})
             return result.scalar_one_or_none()
 
     @staticmethod
@@ -28,7 +32,6 @@ class MediaCacheRepository:
         async with get_session() as session:
             session.add(media_cache)
             await session.commit()
-            await session.refresh(media_cache)
             return media_cache
 
     @staticmethod
@@ -40,34 +43,38 @@ class MediaCacheRepository:
         tags: Optional[str] = None,
         ocr_text: Optional[str] = None,
     ) -> MediaCache:
-        """插入或更新 media_cache。"""
+        """插入或更新 media_cache。
 
-        existing = await MediaCacheRepository.get(media_key)
-        now_ts = int(time.time())
-        if existing:
-            async with get_session() as session:
-                stmt = (
-                    update(MediaCache)
-                    .where(MediaCache.media_key == media_key)
-                    .values(
-                        media_type=media_type,
-                        caption=caption,
-                        tags=tags,
-                        ocr_text=ocr_text,
-                        updated_at=now_ts,
-                    )
-                )
-                await session.execute(stmt)
-                await session.commit()
-            return (await MediaCacheRepository.get(media_key)) or existing
+        使用 SQLite 的 `INSERT ... ON CONFLICT(media_key) DO UPDATE ... RETURNING`：
+        一条语句、一次提交完成插入/更新并取回最新行（原实现为 查询+更新+再查询）。
+        冲突时保留原 created_at。
+        """
 
-        record = MediaCache(
-            media_key=media_key,
-            media_type=media_type,
-            caption=caption,
-            tags=tags,
-            ocr_text=ocr_text,
-            created_at=now_ts,
-            updated_at=now_ts,
+        now_ts = int(time.time())
+        stmt = (
+            sqlite_insert(MediaCache)
+            .values(
+                media_key=media_key,
+                media_type=media_type,
+                caption=caption,
+                tags=tags,
+                ocr_text=ocr_text,
+                created_at=now_ts,
+                updated_at=now_ts,
+            )
         )
-        return await MediaCacheRepository.add(record)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaCache.media_key],
+            set_={
+                "media_type": stmt.excluded.media_type,
+                "caption": stmt.excluded.caption,
+                "tags": stmt.excluded.tags,
+                "ocr_text": stmt.excluded.ocr_text,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ).returning(MediaCache)
+        async with get_session() as session:
+            result = await session.execute(stmt, execution_options={"populate_existing": True})
+            record = result.scalar_one()
+            await session.commit()
+            return record
@@ -3,14 +3,38 @@
 from __future__ import annotations
 
 import time
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from sqlalchemy import insert
-from sqlalchemy import select, update
+from sqlalchemy import Select, bindparam, delete, literal_column, select, update
 
 from ..models import Memory, MemoryEvidence
 from ..sqlalchemy_engine import get_session
 
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_ACTIVE_FOR_USER_STMT = (
+    select(Memory)
+    .where(Memory.qq_id == bindparam("qq_id"), Memory.tier == "active")
+    .order_by(Memory.updated_at.desc())
+    .limit(200)
+)
+_BY_ID_STMT = select(Memory).where(Memory.id == bindparam("memory_id"))
+_BY_QQ_ID_STMT = select(Memory).where(Memory.qq_id == bindparam("qq_id"))
+_BY_QQ_TIER_STMT = select(Memory).where(
+    Memory.qq_id == bindparam("qq_id"), Memory.tier == bindparam("tier")
+)
+
+# 到期时间表达式：与 idx_mem_expiry 的索引表达式逐字一致（86400 内联为字面量，
+# 若作为绑定参数则 SQLite 无法匹配表达式索引）
+_EXPIRES_AT = Memory.created_at + Memory.ttl_days * literal_column("86400")
+
+# 流式查询每批从游标取出的行数
+_STREAM_CHUNK = 200
+
+# add_evidence 单条多行 INSERT 的最大行数：每行 2 个变量，
+# 保持在旧版 SQLite 默认 999 个绑定变量上限以内
+_EVIDENCE_CHUNK = min(500, 999 // 2)
+
 class MemoryRepository:
     """记忆仓储。"""
 
@@ -21,7 +45,6 @@ class MemoryRepository:
         async with get_session() as session:
             session.add(memory)
             await session.commit()
-            await session.refresh(memory)
             return memory
 
     @staticmethod
@@ -29,7 +52,7 @@ class MemoryRepository:
         """按 id 获取记忆。"""
 
         async with get_session() as session:
-            result = await session.execute(select(Memory).where(Memory.id == memory_id))
+            result = await session.execute(_BY_ID_STMT, {"memory_id": memory_id})
             return result.scalar_one_or_none()
 
     @staticmethod
@@ -37,34 +60,34 @@ class MemoryRepository:
         """按用户查询记忆（可按层级过滤）。"""
 
         async with get_session() as session:
-            stmt = select(Memory).where(Memory.qq_id == qq_id)
             if tier:
-                stmt = stmt.where(Memory.tier == tier)
-            result = await session.execute(stmt)
+                result = await session.execute(_BY_QQ_TIER_STMT, {"qq_id": qq_id, "tier": tier})
+            else:
+                result = await session.execute(_BY_QQ_ID_STMT, {"qq_id": qq_id})
             return list(result.scalars().all())
 
     @staticmethod
     async def get_active_memories(qq_id: str) -> List[Memory]:
         """获取用户的 active 层记忆。"""
-        return await MemoryRepository.get_by_qq_id(qq_id, tier="active")
+
+        async with get_session() as session:
+            result = await session.execute(_BY_QQ_TIER_STMT, {"qq_id": qq_id, "tier": "active"})
+            return list(result.scalars().all())
 
     @staticmethod
     async def get_core_memories(qq_id: str) -> List[Memory]:
         """获取用户的 core 层记忆。"""
-        return await MemoryRepository.get_by_qq_id(qq_id, tier="core")
+
+        async with get_session() as session:
+            result = await session.execute(_BY_QQ_TIER_STMT, {"qq_id": qq_id, "tier": "core"})
+            return list(result.scalars().all())
 
     @staticmethod
     async def list_active_for_user(qq_id: str) -> List[Memory]:
         """获取用户的 active 记忆（按更新时间倒序）。"""
 
         async with get_session() as session:
-            stmt = (
-                select(Memory)
-                .where(Memory.qq_id == qq_id, Memory.tier == "active")
-                .order_by(Memory.updated_at.desc())
-                .limit(200)
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(_ACTIVE_FOR_USER_STMT, {"qq_id": qq_id})
             return list(result.scalars().all())
 
     @staticmethod
@@ -92,50 +115,78 @@ class MemoryRepository:
             await session.execute(stmt)
             await session.commit()
 
+    @staticmethod
+    def _expired_active_stmt(current_ts: int) -> Select:
+        """已过期 active 记忆的查询语句（命中 idx_mem_expiry）。"""
+
+        return select(Memory).where(
+            Memory.tier == "active",
+            Memory.ttl_days.is_not(None),
+            _EXPIRES_AT < current_ts,
+        )
+
     @staticmethod
     async def get_expired_active(current_ts: int) -> List[Memory]:
         """获取已过期的 active 记忆。"""
 
         async with get_session() as session:
-            stmt = select(Memory).where(
-                Memory.tier == "active",
-                Memory.ttl_days.is_not(None),
-                (Memory.created_at + Memory.ttl_days * 86400) < current_ts
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(MemoryRepository._expired_active_stmt(current_ts))
             return list(result.scalars().all())
 
+    @staticmethod
+    async def iter_expired_active(current_ts: int) -> AsyncIterator[Memory]:
+        """流式遍历已过期的 active 记忆（每次取 `_STREAM_CHUNK` 行）。
+
+        与 `get_expired_active` 结果相同，但不一次性物化整个列表，
+        适用于定时清理等可能涉及大量行的场景。
+        """
+
+        stmt = MemoryRepository._expired_active_stmt(current_ts).execution_options(
+            yield_per=_STREAM_CHUNK
+        )
+        async with get_session() as session:
+            result = await session.stream(stmt)
+            async for mem in result.scalars():
+                yield mem
+
     @staticmethod
     async def add_evidence(memory_id: int, msg_ids: List[int]) -> None:
         """为某条记忆关联证据消息。"""
 
         cleaned: List[int] = []
+        seen: set[int] = set()
         for x in msg_ids:
             try:
                 v = int(x)
             except Exception:
                 continue
-            if v > 0 and v not in cleaned:
+            if v > 0 and v not in seen:
+                seen.add(v)
                 cleaned.append(v)
         if not cleaned:
             return
 
+        mid = int(memory_id)
         async with get_session() as session:
-            values = [{"memory_id": int(memory_id), "msg_id": int(msg_id)} for msg_id in cleaned]
-            # SQLite 复合主键冲突时忽略，避免抛异常中断主流程
-            stmt = insert(MemoryEvidence).values(values).prefix_with("OR IGNORE")
-            await session.execute(stmt)
+            # 多行 VALUES 每行占 2 个绑定变量：按块写入，避免超出 SQLite 变量上限；
+            # 所有块共用一个事务、一次提交
+            for start in range(0, len(cleaned), _EVIDENCE_CHUNK):
+                values = [{"memory_id": mid, "msg_id": v} for v in cleaned[start : start + _EVIDENCE_CHUNK]]
+                # SQLite 复合主键冲突时忽略，避免抛异常中断主流程
+                stmt = insert(MemoryEvidence).values(values).prefix_with("OR IGNORE")
+                await session.execute(stmt)
             await session.commit()
 
     @staticmethod
-    async def archive_memory(memory_id: int) -> None:
-        """将记忆归档：tier=archive 且 status=archived。"""
+    async def archive_memory(memory_id: int, now_ts: Optional[int] = None) -> None:
+        """将记忆归档：tier=archive 且 status=archived（批量调用方可传入共享的 now_ts）。"""
 
+        now_ts = int(time.time()) if now_ts is None else now_ts
         async with get_session() as session:
             stmt = (
                 update(Memory)
                 .where(Memory.id == memory_id)
-                .values(tier="archive", status="archived", updated_at=int(time.time()))
+                .values(tier="archive", status="archived", updated_at=now_ts)
             )
             await session.execute(stmt)
             await session.commit()
@@ -157,14 +208,17 @@ class MemoryRepository:
 
     @staticmethod
     async def replace_core_memories(qq_id: str, core_memories: List[Memory]) -> None:
-        """覆盖更新用户的 core 记忆集合。"""
+        """覆盖更新用户的 core 记忆集合。
+
+        旧 core 记忆用一条批量 DELETE 清除（Memory 无 relationship/级联，
+        无需先加载到 Session 逐条删除），新集合与删除在同一事务内提交。
+        """
 
         async with get_session() as session:
-            old = await session.execute(select(Memory).where(Memory.qq_id == qq_id, Memory.tier == "core"))
-            for item in old.scalars().all():
-                maybe_coro = session.delete(item)
-                if hasattr(maybe_coro, "__await__"):
-                    await maybe_coro
-            for mem in core_memories:
-                session.add(mem)
+            await session.execute(
+                delete(Memory)
+                .where(Memory.qq_id == qq_id, Memory.tier == "core")
+                .execution_options(synchronize_session=False)
+            )
+            session.add_all(core_memories)
             await session.commit()
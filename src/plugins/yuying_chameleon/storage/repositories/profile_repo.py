@@ -3,101 +3,136 @@
 from __future__ import annotations
 
 import time
-from typing import Optional
+from typing import Any, Dict
 
-from sqlalchemy import select, update
+from sqlalchemy import ColumnElement, bindparam, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.sql.dml import ReturningInsert
 
 from ..models import UserProfile
 from ..sqlalchemy_engine import get_session
 
 from ...config import plugin_config
 
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_BY_QQ_ID_STMT = select(UserProfile).where(UserProfile.qq_id == bindparam("qq_id"))
+
 class ProfileRepository:
     """用户档案仓储。"""
 
     @staticmethod
     async def get_or_create(qq_id: str) -> UserProfile:
-        """获取或创建用户档案。"""
+        """获取或创建用户档案。
+
+        常态（已存在）只有一次只读 SELECT；不存在时用
+        `INSERT ... ON CONFLICT DO NOTHING RETURNING` 创建，
+        并发创建冲突时（RETURNING 无行）再读一次，不会抛主键冲突。
+        """
 
         async with get_session() as session:
-            result = await session.execute(select(UserProfile).where(UserProfile.qq_id == qq_id))
+            result = await session.execute(_BY_QQ_ID_STMT, {"qq_id": qq_id})
             profile = result.scalar_one_or_none()
-            if not profile:
-                profile = UserProfile(
+            if profile:
+                return profile
+
+            stmt = (
+                sqlite_insert(UserProfile)
+                .values(
                     qq_id=qq_id,
                     next_memory_at=plugin_config.yuying_memory_effective_count_threshold,
                 )
-                session.add(profile)
-                await session.commit()
-                await session.refresh(profile)
+                .on_conflict_do_nothing()
+                .returning(UserProfile)
+            )
+            profile = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+            if profile is None:
+                profile = (await session.execute(_BY_QQ_ID_STMT, {"qq_id": qq_id})).scalar_one()
             return profile
 
+    @staticmethod
+    def increment_effective_count_stmt(qq_id: str) -> ReturningInsert[UserProfile]:
+        """构建“有效发言计数 +1”的 UPSERT 语句（RETURNING 更新后的档案）。
+
+        档案不存在时以 effective_count=1 创建，存在时在原行上 +1；
+        供 `increment_effective_count` 与 DBWriter 合并写入任务共用。
+        """
+
+        now_ts = int(time.time())
+        stmt = sqlite_insert(UserProfile).values(
+            qq_id=qq_id,
+            effective_count=1,
+            next_memory_at=plugin_config.yuying_memory_effective_count_threshold,
+            created_at=now_ts,
+            updated_at=now_ts,
+        )
+        return (
+            stmt.on_conflict_do_update(
+                index_elements=[UserProfile.qq_id],
+                set_={
+                    "effective_count": UserProfile.effective_count + 1,
+                    "updated_at": now_ts,
+                },
+            )
+            .returning(UserProfile)
+            .execution_options(populate_existing=True)
+        )
+
     @staticmethod
     async def increment_effective_count(qq_id: str) -> UserProfile:
-        """有效发言计数 +1（同时确保用户档案存在）。"""
+        """有效发言计数 +1（同时确保用户档案存在），一条语句完成。"""
 
         async with get_session() as session:
-            result = await session.execute(select(UserProfile).where(UserProfile.qq_id == qq_id))
-            profile = result.scalar_one_or_none()
-
-            if not profile:
-                profile = UserProfile(
-                    qq_id=qq_id,
-                    effective_count=0,
-                    next_memory_at=plugin_config.yuying_memory_effective_count_threshold,
-                )
-                session.add(profile)
-                await session.flush()
-
-            profile.effective_count += 1
-            profile.updated_at = int(time.time())
+            result = await session.execute(ProfileRepository.increment_effective_count_stmt(qq_id))
+            profile = result.scalar_one()
             await session.commit()
-            await session.refresh(profile)
             return profile
 
     @staticmethod
-    async def update_memory_status(qq_id: str, pending: bool) -> None:
-        """更新“待抽取记忆”标记。"""
-
-        # 确保用户存在（避免更新 0 行导致状态未落库）
-        await ProfileRepository.get_or_create(qq_id)
-
+    async def _upsert(qq_id: str, set_: Dict[str, Any]) -> None:
+        """以一条 `INSERT ... ON CONFLICT(qq_id) DO UPDATE` 写入档案字段。
+
+        不存在时按默认值创建档案（next_memory_at 取配置阈值）后即视为已更新；
+        存在时只更新 `set_` 中的列。取代“get_or_create + UPDATE”的两个会话、多次往返。
+        """
+
+        now_ts = int(time.time())
+        set_ = {**set_, "updated_at": now_ts}
+        insert_values = {
+            "qq_id": qq_id,
+            "next_memory_at": plugin_config.yuying_memory_effective_count_threshold,
+            "created_at": now_ts,
+        }
+        # 新建行上的取值与“先创建再更新”一致：set_ 中的 SQL 表达式（引用旧值）不适用于插入
+        for key, value in set_.items():
+            if not isinstance(value, ColumnElement):
+                insert_values[key] = value
+        stmt = sqlite_insert(UserProfile).values(**insert_values)
+        stmt = stmt.on_conflict_do_update(index_elements=[UserProfile.qq_id], set_=set_)
         async with get_session() as session:
-            stmt = (
-                update(UserProfile)
-                .where(UserProfile.qq_id == qq_id)
-                .values(pending_memory=pending, updated_at=int(time.time()))
-            )
             await session.execute(stmt)
             await session.commit()
 
+    @staticmethod
+    async def update_memory_status(qq_id: str, pending: bool) -> None:
+        """更新“待抽取记忆”标记（档案不存在时一并创建）。"""
+
+        await ProfileRepository._upsert(qq_id, {"pending_memory": pending})
+
     @staticmethod
     async def bump_next_memory_checkpoint(qq_id: str) -> None:
-        """更新下一次“记忆抽取检查点”。"""
+        """更新下一次“记忆抽取检查点”（档案不存在时一并创建）。
 
-        profile = await ProfileRepository.get_or_create(qq_id)
-        threshold = plugin_config.yuying_memory_effective_count_threshold
-        next_at = max(profile.effective_count + threshold, profile.next_memory_at)
+        next_memory_at = max(effective_count + 阈值, next_memory_at)，在 SQL 内基于当前行计算；
+        新建档案时 effective_count=0，结果即为阈值，与插入默认值一致。
+        """
 
-        async with get_session() as session:
-            stmt = (
-                update(UserProfile)
-                .where(UserProfile.qq_id == qq_id)
-                .values(next_memory_at=next_at, updated_at=int(time.time()))
-            )
-            await session.execute(stmt)
-            await session.commit()
+        threshold = plugin_config.yuying_memory_effective_count_threshold
+        next_at = func.max(UserProfile.effective_count + threshold, UserProfile.next_memory_at)
+        await ProfileRepository._upsert(qq_id, {"next_memory_at": next_at})
 
     @staticmethod
     async def update_last_memory_msg_id(qq_id: str, last_msg_id: int) -> None:
-        """更新用户的 last_memory_msg_id。"""
+        """更新用户的 last_memory_msg_id（档案不存在时一并创建）。"""
 
-        await ProfileRepository.get_or_create(qq_id)
-        async with get_session() as session:
-            stmt = (
-                update(UserProfile)
-                .where(UserProfile.qq_id == qq_id)
-                .values(last_memory_msg_id=int(last_msg_id), updated_at=int(time.time()))
-            )
-            await session.execute(stmt)
-            await session.commit()
+        await ProfileRepository._upsert(qq_id, {"last_memory_msg_id": int(last_msg_id)})
@@ -4,58 +4,80 @@ from __future__ import annotations
 
 import time
 
-from sqlalchemy import select, update
+from sqlalchemy import bindparam, select
+from sqlalchemy.dialects.sqlite import Insert, insert as sqlite_insert
 
 from ..models import BotRateLimit
 from ..sqlalchemy_engine import get_session
 
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_BY_SCENE_STMT = select(BotRateLimit).where(
+    BotRateLimit.scene_type == bindparam("scene_type"),
+    BotRateLimit.scene_id == bindparam("scene_id"),
+)
+
 
 class RateLimitRepository:
     """机器人频率状态仓储（按场景维度）。"""
 
     @staticmethod
     async def get_or_create(scene_type: str, scene_id: str) -> BotRateLimit:
-        """获取或创建场景频率状态。"""
+        """获取或创建场景频率状态。
+
+        常态（已存在）只有一次只读 SELECT；不存在时用
+        `INSERT ... ON CONFLICT DO NOTHING RETURNING` 创建，
+        并发创建冲突时（RETURNING 无行）再读一次，不会抛主键冲突。
+        """
 
+        params = {"scene_type": scene_type, "scene_id": scene_id}
         async with get_session() as session:
-            result = await session.execute(
-                select(BotRateLimit).where(
-                    BotRateLimit.scene_type == scene_type,
-                    BotRateLimit.scene_id == scene_id,
-                )
-            )
+            result = await session.execute(_BY_SCENE_STMT, params)
             state = result.scalar_one_or_none()
             if state:
                 return state
 
-            state = BotRateLimit(scene_type=scene_type, scene_id=scene_id)
-            session.add(state)
+            stmt = (
+                sqlite_insert(BotRateLimit)
+                .values(scene_type=scene_type, scene_id=scene_id)
+                .on_conflict_do_nothing()
+                .returning(BotRateLimit)
+            )
+            state = (await session.execute(stmt)).scalar_one_or_none()
             await session.commit()
-            await session.refresh(state)
+            if state is None:
+                state = (await session.execute(_BY_SCENE_STMT, params)).scalar_one()
             return state
 
     @staticmethod
-    async def mark_sent(scene_type: str, scene_id: str, cooldown_seconds: int) -> None:
-        """记录一次机器人已发送消息，并刷新冷却截止时间。"""
+    def mark_sent_stmt(scene_type: str, scene_id: str, cooldown_seconds: int) -> Insert:
+        """构建“记录一次发送”的 UPSERT 语句。
+
+        不存在则以本次发送为首条记录插入，存在则在原行上更新；
+        供 `mark_sent` 与 DBWriter 合并写入任务共用。
+        """
 
         now_ts = int(time.time())
         cooldown_until_ts = now_ts + max(0, int(cooldown_seconds))
+        stmt = sqlite_insert(BotRateLimit).values(
+            scene_type=scene_type,
+            scene_id=scene_id,
+            last_sent_ts=now_ts,
+            cooldown_until_ts=cooldown_until_ts,
+            recent_bot_msg_count=1,
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=[BotRateLimit.scene_type, BotRateLimit.scene_id],
+            set_={
+                "last_sent_ts": now_ts,
+                "cooldown_until_ts": cooldown_until_ts,
+                "recent_bot_msg_count": BotRateLimit.recent_bot_msg_count + 1,
+            },
+        )
 
-        # 先确保存在（避免更新 0 行）
-        await RateLimitRepository.get_or_create(scene_type, scene_id)
+    @staticmethod
+    async def mark_sent(scene_type: str, scene_id: str, cooldown_seconds: int) -> None:
+        """记录一次机器人已发送消息，并刷新冷却截止时间。"""
 
         async with get_session() as session:
-            stmt = (
-                update(BotRateLimit)
-                .where(
-                    BotRateLimit.scene_type == scene_type,
-                    BotRateLimit.scene_id == scene_id,
-                )
-                .values(
-                    last_sent_ts=now_ts,
-                    cooldown_until_ts=cooldown_until_ts,
-                    recent_bot_msg_count=BotRateLimit.recent_bot_msg_count + 1,
-                )
-            )
-            await session.execute(stmt)
+            await session.execute(RateLimitRepository.mark_sent_stmt(scene_type, scene_id, cooldown_seconds))
             await session.commit()
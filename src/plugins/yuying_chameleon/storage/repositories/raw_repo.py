@@ -2,15 +2,103 @@
 
 from __future__ import annotations
 
+import re
 import time
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from sqlalchemy import select, update
+from sqlalchemy import Row, bindparam, insert, select, update
 from sqlalchemy import func
 
-from ..models import RawMessage
+from ..models import RawMessage, RawMessageMedia
 from ..sqlalchemy_engine import get_session
 
+# 热路径查询：模块加载时构建一次，调用时只传参数（免去每次构造语句，编译结果走引擎缓存）
+# 场景查询的排序列与 idx_raw_scene_ts 一致（索引隐含 rowid 即 id 作为末列），按索引顺序读取，无需临时排序
+_RECENT_BY_SCENE_STMT = (
+    select(RawMessage)
+    .where(
+        RawMessage.scene_type == bindparam("scene_type"),
+        RawMessage.scene_id == bindparam("scene_id"),
+    )
+    .order_by(RawMessage.timestamp.desc(), RawMessage.id.desc())
+    .limit(bindparam("limit"))
+)
+# 同上，但只取只读上下文拼装用到的列，返回 Row 而非 ORM 实体
+_RECENT_ROWS_BY_SCENE_STMT = (
+    select(
+        RawMessage.id,
+        RawMessage.qq_id,
+        RawMessage.content,
+        RawMessage.timestamp,
+        RawMessage.msg_type,
+        RawMessage.raw_ref,
+        RawMessage.is_bot,
+    )
+    .where(
+        RawMessage.scene_type == bindparam("scene_type"),
+        RawMessage.scene_id == bindparam("scene_id"),
+    )
+    .order_by(RawMessage.timestamp.desc(), RawMessage.id.desc())
+    .limit(bindparam("limit"))
+)
+_SCENE_TIME_RANGE_STMT = (
+    select(RawMessage)
+    .where(
+        RawMessage.scene_type == bindparam("scene_type"),
+        RawMessage.scene_id == bindparam("scene_id"),
+        RawMessage.timestamp >= bindparam("start_ts"),
+        RawMessage.timestamp <= bindparam("end_ts"),
+    )
+    .order_by(RawMessage.timestamp.asc(), RawMessage.id.asc())
+    .limit(bindparam("limit"))
+)
+# 同上，但只取 content 列（摘要生成只需要文本）
+_SCENE_TIME_RANGE_CONTENT_STMT = _SCENE_TIME_RANGE_STMT.with_only_columns(RawMessage.content)
+_BY_ID_STMT = select(RawMessage).where(RawMessage.id == bindparam("msg_id"))
+_USER_SINCE_STMT = (
+    select(RawMessage)
+    .where(RawMessage.qq_id == bindparam("qq_id"), RawMessage.id > bindparam("after_id"))
+    .order_by(RawMessage.id.asc())
+    .limit(bindparam("limit"))
+)
+
+# 消息内容中的图片标记：[image:media_key] 或回填说明后的 [image:media_key:说明]
+_IMAGE_MARKER_RE = re.compile(r"\[image:([^\]:]+)")
+# 按 media_key 查找消息：走 raw_message_media 主键范围查找，再回表取消息；
+# 按映射表的 msg_id 排序，直接沿主键倒序读取，无需临时排序
+_WITH_IMAGE_MARKER_STMT = (
+    select(RawMessage)
+    .join(RawMessageMedia, RawMessageMedia.msg_id == RawMessage.id)
+    .where(
+        RawMessageMedia.media_key == bindparam("media_key"),
+        RawMessage.content.like(bindparam("pattern")),
+    )
+    .order_by(RawMessageMedia.msg_id.desc())
+    .limit(bindparam("limit"))
+)
+# 场景计数：分别命中 idx_raw_scene_ts 与 idx_raw_scene_id 的覆盖索引范围扫描
+_COUNT_SINCE_STMT = (
+    select(func.count())
+    .select_from(RawMessage)
+    .where(
+        RawMessage.scene_type == bindparam("scene_type"),
+        RawMessage.scene_id == bindparam("scene_id"),
+        RawMessage.timestamp >= bindparam("since_ts"),
+    )
+)
+_COUNT_AFTER_ID_STMT = (
+    select(func.count())
+    .select_from(RawMessage)
+    .where(
+        RawMessage.scene_type == bindparam("scene_type"),
+        RawMessage.scene_id == bindparam("scene_id"),
+        RawMessage.id > bindparam("after_id"),
+    )
+)
+
+# 流式查询每批从游标取出的行数
+_STREAM_CHUNK = 100
+
 
 class RawRepository:
     """原始消息仓储。"""
@@ -23,23 +111,47 @@ class RawRepository:
             message: 待写入的 ORM 对象。
 
         返回：
-            RawMessage: 写入并刷新后的对象（包含自增 id）。
+            RawMessage: 写入后的对象（包含自增 id）。
+
+        说明：
+            flush 时自增 id 与 Python 侧默认值已回填到对象上，且会话 expire_on_commit=False，
+            因此不再 refresh（省去每条消息一次额外的 SELECT 往返）。
+            内容中的 [image:...] 标记在同一事务内登记到 raw_message_media。
         """
 
         async with get_session() as session:
             session.add(message)
+            keys = set(_IMAGE_MARKER_RE.findall(message.content or ""))
+            if keys:
+                await session.flush()
+                await session.execute(
+                    insert(RawMessageMedia).prefix_with("OR IGNORE"),
+                    [{"media_key": k, "msg_id": message.id} for k in keys],
+                )
             await session.commit()
-            await session.refresh(message)
             return message
 
+    @staticmethod
+    async def add_many(rows: List[Dict[str, Any]]) -> None:
+        """以 Core 批量 INSERT 写入多条消息（不构造 ORM 实例，不回读 id）。
+
+        SQLAlchemy 2.0 会把参数列表合并为分页的多行 INSERT（insertmanyvalues），
+        一次事务写入全部行；适用于不需要立即拿到 id 的写入（如机器人自身消息留痕）。
+        不登记 raw_message_media：拿不到 id，且机器人消息不参与图片说明回填。
+        """
+
+        if not rows:
+            return
+        async with get_session() as session:
+            await session.execute(insert(RawMessage), rows)
+            await session.commit()
+
     @staticmethod
     async def get_by_id(msg_id: int) -> Optional[RawMessage]:
         """按消息 id 获取原始消息。"""
 
         async with get_session() as session:
-            result = await session.execute(
-                select(RawMessage).where(RawMessage.id == msg_id)
-            )
+            result = await session.execute(_BY_ID_STMT, {"msg_id": msg_id})
             return result.scalar_one_or_none()
 
     @staticmethod
@@ -59,15 +171,11 @@ class RawRepository:
     async def list_with_image_marker(media_key: str, limit: int = 50) -> List[RawMessage]:
         """查找包含指定图片短标识的消息（用于补全图片说明）。"""
 
-        token = f"[image:{media_key}]"
+        # 先经 raw_message_media 按 media_key 定位候选消息，LIKE 只用于过滤这几行
+        # （保持原语义：只返回仍带有未回填标记 [image:key] 的消息）
+        params = {"media_key": media_key, "pattern": f"%[image:{media_key}]%", "limit": int(limit)}
         async with get_session() as session:
-            stmt = (
-                select(RawMessage)
-                .where(RawMessage.content.like(f"%{token}%"))
-                .order_by(RawMessage.id.desc())
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(_WITH_IMAGE_MARKER_STMT, params)
             return list(result.scalars().all())
 
     @staticmethod
@@ -79,15 +187,32 @@ class RawRepository:
         """获取某个场景最近的若干条消息（按时间倒序）。"""
 
         async with get_session() as session:
-            stmt = (
-                select(RawMessage)
-                .where(RawMessage.scene_type == scene_type, RawMessage.scene_id == scene_id)
-                .order_by(RawMessage.timestamp.desc(), RawMessage.id.desc())
-                .limit(limit)
+            result = await session.execute(
+                _RECENT_BY_SCENE_STMT,
+                {"scene_type": scene_type, "scene_id": scene_id, "limit": int(limit)},
             )
-            result = await session.execute(stmt)
             return list(result.scalars().all())
 
+    @staticmethod
+    async def get_recent_rows_by_scene(
+        scene_type: str,
+        scene_id: str,
+        limit: int = 2,
+    ) -> List[Row]:
+        """获取某个场景最近的若干条消息的只读行（按时间倒序）。
+
+        与 `get_recent_by_scene` 顺序相同，但只取 id/qq_id/content/timestamp/
+        msg_type/raw_ref/is_bot 列并返回 Row（可按属性名访问），
+        不构造 ORM 实体、不进入 identity map；适用于只读取上下文的热路径。
+        """
+
+        async with get_session() as session:
+            result = await session.execute(
+                _RECENT_ROWS_BY_SCENE_STMT,
+                {"scene_type": scene_type, "scene_id": scene_id, "limit": int(limit)},
+            )
+            return list(result.all())
+
     @staticmethod
     async def get_recent_by_scene_with_roles(
         scene_type: str,
@@ -108,21 +233,44 @@ class RawRepository:
     ) -> List[RawMessage]:
         """按时间范围获取某个场景的消息（时间正序）。"""
 
+        params = {
+            "scene_type": scene_type,
+            "scene_id": scene_id,
+            "start_ts": int(start_ts),
+            "end_ts": int(end_ts),
+            "limit": int(limit),
+        }
         async with get_session() as session:
-            stmt = (
-                select(RawMessage)
-                .where(
-                    RawMessage.scene_type == scene_type,
-                    RawMessage.scene_id == scene_id,
-                    RawMessage.timestamp >= start_ts,
-                    RawMessage.timestamp <= end_ts,
-                )
-                .order_by(RawMessage.timestamp.asc(), RawMessage.id.asc())
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(_SCENE_TIME_RANGE_STMT, params)
             return list(result.scalars().all())
 
+    @staticmethod
+    async def iter_contents_by_scene_time_range(
+        scene_type: str,
+        scene_id: str,
+        start_ts: int,
+        end_ts: int,
+        limit: int = 200,
+    ) -> AsyncIterator[str]:
+        """流式遍历某个场景时间范围内消息的 content（时间正序，每次取 `_STREAM_CHUNK` 行）。
+
+        与 `get_messages_by_scene_time_range` 的行集合、顺序相同，但只查询 content 列：
+        不构造 ORM 实体、不进入 identity map，已处理的行可随即释放。
+        """
+
+        params = {
+            "scene_type": scene_type,
+            "scene_id": scene_id,
+            "start_ts": int(start_ts),
+            "end_ts": int(end_ts),
+            "limit": int(limit),
+        }
+        stmt = _SCENE_TIME_RANGE_CONTENT_STMT.execution_options(yield_per=_STREAM_CHUNK)
+        async with get_session() as session:
+            result = await session.stream(stmt, params)
+            async for content in result.scalars():
+                yield content
+
     @staticmethod
     async def get_user_messages_since(
         qq_id: str,
@@ -133,32 +281,18 @@ class RawRepository:
         """获取用户在某条消息之后的消息列表，并包含 overlap 条重叠窗口。"""
 
         effective_after = max(0, int(after_msg_id) - max(0, int(overlap)))
+        params = {"qq_id": qq_id, "after_id": effective_after, "limit": int(limit)}
         async with get_session() as session:
-            stmt = (
-                select(RawMessage)
-                .where(RawMessage.qq_id == qq_id, RawMessage.id > effective_after)
-                .order_by(RawMessage.id.asc())
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(_USER_SINCE_STMT, params)
             return list(result.scalars().all())
 
     @staticmethod
     async def count_scene_messages_since(scene_type: str, scene_id: str, since_ts: int) -> int:
         """统计某个场景在指定时间戳之后的消息数量。"""
 
+        params = {"scene_type": scene_type, "scene_id": scene_id, "since_ts": int(since_ts)}
         async with get_session() as session:
-            stmt = (
-                select(func.count())
-                .select_from(RawMessage)
-                .where(
-                    RawMessage.scene_type == scene_type,
-                    RawMessage.scene_id == scene_id,
-                    RawMessage.timestamp >= since_ts,
-                )
-            )
-            result = await session.execute(stmt)
-            return int(result.scalar_one() or 0)
+            return int(await session.scalar(_COUNT_SINCE_STMT, params) or 0)
 
     @staticmethod
     async def count_scene_messages_after_id(
@@ -168,16 +302,6 @@ class RawRepository:
     ) -> int:
         """统计某个场景在某条 raw_messages.id 之后的消息数量（不含该条）。"""
 
-        after_id = int(after_id or 0)
+        params = {"scene_type": scene_type, "scene_id": scene_id, "after_id": int(after_id or 0)}
         async with get_session() as session:
-            stmt = (
-                select(func.count())
-                .select_from(RawMessage)
-                .where(
-                    RawMessage.scene_type == scene_type,
-                    RawMessage.scene_id == scene_id,
-                    RawMessage.id > after_id,
-                )
-            )
-            result = await session.execute(stmt)
-            return int(result.scalar_one() or 0)
+            return int(await session.scalar(_COUNT_AFTER_ID_STMT, params) or 0)
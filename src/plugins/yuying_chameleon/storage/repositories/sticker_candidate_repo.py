@@ -3,24 +3,82 @@
 from __future__ import annotations
 
 import time
-import json
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 
-from sqlalchemy import select, update
+from sqlalchemy import bindparam, insert, select, text, update
 
 from ..models import StickerCandidate
 from ..sqlalchemy_engine import get_session
 
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_BY_FINGERPRINT_STMT = select(StickerCandidate).where(
+    StickerCandidate.fingerprint == bindparam("fingerprint")
+)
+
+# source_qq_ids 的规范化表达式：空值/非法 JSON/非数组一律按空数组处理
+# （json_type 遇到非法 JSON 会报错，需先用 json_valid 判断）
+_SOURCE_IDS_EXPR = (
+    "CASE WHEN json_valid(source_qq_ids) THEN "
+    "(CASE WHEN json_type(source_qq_ids) = 'array' THEN source_qq_ids ELSE '[]' END) "
+    "ELSE '[]' END"
+)
+
+# 候选再次出现：计数 +1、刷新 last_seen_ts、去重追加来源 qq_id，单条 UPDATE ... RETURNING 完成
+_RECORD_SIGHTING_SQL = text(
+    f"UPDATE sticker_candidates SET "
+    f"seen_count = seen_count + 1, "
+    f"last_seen_ts = :now, "
+    f"source_qq_ids = CASE "
+    f"WHEN EXISTS (SELECT 1 FROM json_each({_SOURCE_IDS_EXPR}) WHERE value = :qq_id) "
+    f"THEN {_SOURCE_IDS_EXPR} "
+    f"ELSE json_insert({_SOURCE_IDS_EXPR}, '$[#]', :qq_id) END "
+    f"WHERE candidate_id = :candidate_id "
+    f"RETURNING *"
+)
+
+# get_by_fingerprint 的未命中缓存（fingerprint -> 过期时刻，time.monotonic()）
+# - 偷图流程对每张收到的图片都按 fingerprint 查一次，首次出现的图片占多数，查询结果为空
+# - 同一张新图在短时间内被连发/转发时，重复查询直接返回 None，不再访问数据库
+# - 只缓存"不存在"：add/add_core 提交后移除对应条目，TTL 兜底其他途径写入的行
+_MISS_TTL_SEC = 30.0
+_MISS_CACHE_SIZE = 4096
+_miss_cache: "OrderedDict[str, float]" = OrderedDict()
+# 每次写入递增；查询前后不一致说明期间有新候选写入，未命中结果不缓存
+_miss_gen = 0
+
+
+def _forget_miss(fingerprint: Optional[str]) -> None:
+    """新增候选后移除其 fingerprint 的未命中缓存。"""
+
+    global _miss_gen
+    _miss_gen += 1
+    if fingerprint is not None:
+        _miss_cache.pop(fingerprint, None)
+
+
 class StickerCandidateRepository:
     """表情包候选仓储。"""
 
     @staticmethod
     async def get_by_fingerprint(fingerprint: str) -> Optional[StickerCandidate]:
-        """按 fingerprint 获取候选记录。"""
+        """按 fingerprint 获取候选记录（近期确认不存在的 fingerprint 直接返回 None）。"""
 
+        expires = _miss_cache.get(fingerprint)
+        if expires is not None:
+            if expires > time.monotonic():
+                return None
+            _miss_cache.pop(fingerprint, None)
+
+        gen = _miss_gen
         async with get_session() as session:
-            result = await session.execute(select(StickerCandidate).where(StickerCandidate.fingerprint == fingerprint))
-            return result.scalar_one_or_none()
+            result = await session.execute(_BY_FINGERPRINT_STMT, {"fingerprint": fingerprint})
+            candidate = result.scalar_one_or_none()
+        if candidate is None and gen == _miss_gen:
+            _miss_cache[fingerprint] = time.monotonic() + _MISS_TTL_SEC
+            if len(_miss_cache) > _MISS_CACHE_SIZE:
+                _miss_cache.popitem(last=False)
+        return candidate
 
     @staticmethod
     async def add(candidate: StickerCandidate) -> StickerCandidate:
@@ -29,25 +87,61 @@ class StickerCandidateRepository:
         async with get_session() as session:
             session.add(candidate)
             await session.commit()
-            await session.refresh(candidate)
-            return candidate
+        _forget_miss(candidate.fingerprint)
+        return candidate
 
     @staticmethod
-    async def increment_seen_count(candidate_id: int) -> StickerCandidate:
-        """seen_count +1，并刷新 last_seen_ts。"""
+    async def add_core(values: Dict[str, Any]) -> None:
+        """以 Core INSERT 新增候选记录（热路径：不构造 ORM 实例、不回读）。"""
 
         async with get_session() as session:
-            stmt = (
-                update(StickerCandidate)
-                .where(StickerCandidate.candidate_id == candidate_id)
-                .values(seen_count=StickerCandidate.seen_count + 1, last_seen_ts=int(time.time()))
-                .returning(StickerCandidate)
-            )
-            result = await session.execute(stmt)
+            await session.execute(insert(StickerCandidate).values(**values))
+            await session.commit()
+        _forget_miss(values.get("fingerprint"))
+
+    @staticmethod
+    async def increment_seen_count(
+        candidate_id: int,
+        *,
+        return_row: bool = False,
+    ) -> Optional[StickerCandidate]:
+        """seen_count +1，并刷新 last_seen_ts。
+
+        默认只执行 UPDATE（无 RETURNING、不构造 ORM 实例），返回 None；
+        需要更新后的候选时传 `return_row=True`，此时候选不存在会抛 NoResultFound。
+        """
+
+        stmt = (
+            update(StickerCandidate)
+            .where(StickerCandidate.candidate_id == candidate_id)
+            .values(seen_count=StickerCandidate.seen_count + 1, last_seen_ts=int(time.time()))
+        )
+        async with get_session() as session:
+            if not return_row:
+                await session.execute(stmt)
+                await session.commit()
+                return None
+            result = await session.execute(stmt.returning(StickerCandidate))
             candidate = result.scalar_one()
             await session.commit()
             return candidate
 
+    @staticmethod
+    async def record_sighting(candidate_id: int, qq_id: str) -> Optional[StickerCandidate]:
+        """候选再次出现：seen_count +1、刷新 last_seen_ts，并去重追加来源 qq_id。
+
+        等价于依次调用 `increment_seen_count` 与 `append_source_qq_id`，
+        但只有一条语句、一次提交；返回更新后的候选（不存在时返回 None）。
+        """
+
+        params = {"candidate_id": candidate_id, "qq_id": qq_id, "now": int(time.time())}
+        async with get_session() as session:
+            stmt = select(StickerCandidate).from_statement(_RECORD_SIGHTING_SQL)
+            result = await session.execute(stmt, params)
+            candidate = result.scalar_one_or_none()
+            await session.commit()
+            return candidate
+
     @staticmethod
     async def update_status(candidate_id: int, status: str) -> None:
         """更新候选状态（pending/promoted/ignored）。"""
@@ -63,30 +157,19 @@ class StickerCandidateRepository:
 
     @staticmethod
     async def append_source_qq_id(candidate_id: int, qq_id: str) -> None:
-        """将来源 qq_id 追加到 source_qq_ids（JSON 数组字符串）。"""
-
+        """将来源 qq_id 追加到 source_qq_ids（JSON 数组字符串）。
+
+        说明：
+        - 使用 SQLite JSON1 在单条 UPDATE 内完成去重与追加，避免 Python 侧读-改-写；
+        - source_qq_ids 为空或不是合法 JSON 数组时按空数组处理。
+        """
+
+        ids_expr = _SOURCE_IDS_EXPR
+        stmt = text(
+            f"UPDATE sticker_candidates SET source_qq_ids = json_insert({ids_expr}, '$[#]', :qq_id) "
+            f"WHERE candidate_id = :candidate_id "
+            f"AND NOT EXISTS (SELECT 1 FROM json_each({ids_expr}) WHERE value = :qq_id)"
+        )
         async with get_session() as session:
-            result = await session.execute(
-                select(StickerCandidate).where(StickerCandidate.candidate_id == candidate_id)
-            )
-            candidate = result.scalar_one_or_none()
-            if not candidate:
-                return
-
-            raw = candidate.source_qq_ids or "[]"
-            try:
-                ids = json.loads(raw)
-                if not isinstance(ids, list):
-                    ids = []
-            except Exception:
-                ids = []
-            if qq_id not in ids:
-                ids.append(qq_id)
-
-            stmt = (
-                update(StickerCandidate)
-                .where(StickerCandidate.candidate_id == candidate_id)
-                .values(source_qq_ids=json.dumps(ids, ensure_ascii=False))
-            )
-            await session.execute(stmt)
+            await session.execute(stmt, {"candidate_id": candidate_id, "qq_id": qq_id})
             await session.commit()
@@ -3,31 +3,144 @@
 from __future__ import annotations
 
 import time
-from typing import Any, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, literal_column, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Sticker, StickerIntent
+from ..sqlalchemy_engine import get_session, use_session
+
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_BY_ID_STMT = select(Sticker).where(Sticker.sticker_id == bindparam("sticker_id"))
+_BY_FINGERPRINT_STMT = select(Sticker).where(Sticker.fingerprint == bindparam("fingerprint"))
+# 按意图筛选：经 sticker_intent 的 idx_stk_intent 定位，再按主键回表
+_ENABLED_BY_INTENT_STMT = (
+    select(Sticker)
+    .join(StickerIntent, StickerIntent.sticker_id == Sticker.sticker_id)
+    .where(
+        StickerIntent.intent == bindparam("intent"),
+        Sticker.is_enabled.is_(True),
+        Sticker.is_banned.is_(False),
+    )
+    .limit(bindparam("limit"))
+)
+# 待打标：条件与 idx_stk_pending_tag 的 WHERE 逐字一致（'' 内联为字面量，
+# 若作为绑定参数则 SQLite 无法判定查询蕴含部分索引条件）
+_PENDING_TAGGING_STMT = (
+    select(Sticker)
+    .where(
+        Sticker.pack == "auto",
+        Sticker.is_enabled.is_(True),
+        Sticker.is_banned.is_(False),
+        or_(Sticker.tags.is_(None), Sticker.tags == literal_column("''")),
+    )
+    .limit(bindparam("limit"))
+)
+
+# get_by_id 的进程内 LRU 缓存（sticker_id -> 已脱离会话的 Sticker）
+# - 表情包元信息写入后基本不变，选表情/索引任务反复按 id 读取同一批记录
+# - 只缓存命中的行：不存在的 id 不缓存，新增后无需额外失效
+# - 本仓储的所有写方法在提交后失效对应条目；调用方只读返回对象，不要修改其属性
+_ID_CACHE_SIZE = 1024
+_id_cache: "OrderedDict[str, Sticker]" = OrderedDict()
+# 每次失效递增；查询前后不一致说明期间发生过写入，结果不回填，避免把旧值写回缓存
+_cache_gen = 0
+
+# get_by_fingerprint 的未命中缓存（fingerprint -> 过期时刻，time.monotonic()）
+# - 只缓存"不存在"：add/add_core 提交后移除对应条目（同样受 _cache_gen 保护），TTL 兜底
+_MISS_TTL_SEC = 30.0
+_MISS_CACHE_SIZE = 4096
+_fp_miss_cache: "OrderedDict[str, float]" = OrderedDict()
+
+
+def _invalidate(sticker_id: Optional[str] = None, fingerprint: Optional[str] = None) -> None:
+    """失效单个 sticker_id 的缓存条目（不传则清空全部），并移除 fingerprint 的未命中缓存。"""
+
+    global _cache_gen
+    _cache_gen += 1
+    if sticker_id is None:
+        _id_cache.clear()
+    else:
+        _id_cache.pop(sticker_id, None)
+    if fingerprint is not None:
+        _fp_miss_cache.pop(fingerprint, None)
+
+
+def _split_intents(intents: Optional[str]) -> List[str]:
+    """把逗号分隔的 intents 拆成去重后的意图列表（trim + 小写，与迁移 0014 回填一致）。"""
+
+    seen: List[str] = []
+    for item in (intents or "").split(","):
+        v = item.strip().lower()
+        if v and v not in seen:
+            seen.append(v)
+    return seen
+
+
+async def _write_intents(session: AsyncSession, sticker_id: str, intents: Optional[str], *, replace: bool) -> None:
+    """在调用方事务内登记 sticker_intent（replace=True 时先清除该表情包的旧意图）。"""
+
+    if replace:
+        await session.execute(delete(StickerIntent).where(StickerIntent.sticker_id == sticker_id))
+    rows = [{"sticker_id": sticker_id, "intent": v} for v in _split_intents(intents)]
+    if rows:
+        await session.execute(insert(StickerIntent).prefix_with("OR IGNORE"), rows)
 
-from sqlalchemy import or_, select, update
-
-from ..models import Sticker
-from ..sqlalchemy_engine import get_session
 
 class StickerRepository:
     """表情包仓储。"""
 
     @staticmethod
-    async def get_by_id(sticker_id: str) -> Optional[Sticker]:
-        """按 sticker_id 获取表情包。"""
+    async def get_by_id(sticker_id: str, *, session: Optional[AsyncSession] = None) -> Optional[Sticker]:
+        """按 sticker_id 获取表情包（可传入调用方的 session 以复用连接）。
+
+        先查进程内 LRU 缓存，未命中再查库并回填。
+        """
+
+        cached = _id_cache.get(sticker_id)
+        if cached is not None:
+            _id_cache.move_to_end(sticker_id)
+            return cached
+
+        gen = _cache_gen
+        async with use_session(session) as s:
+            result = await s.execute(_BY_ID_STMT, {"sticker_id": sticker_id})
+            sticker = result.scalar_one_or_none()
+        if sticker is not None and gen == _cache_gen:
+            _id_cache[sticker_id] = sticker
+            if len(_id_cache) > _ID_CACHE_SIZE:
+                _id_cache.popitem(last=False)
+        return sticker
+
+    @staticmethod
+    async def get_by_fingerprint(fingerprint: str) -> Optional[Sticker]:
+        """按 fingerprint 获取表情包（近期确认不存在的 fingerprint 直接返回 None）。"""
 
+        expires = _fp_miss_cache.get(fingerprint)
+        if expires is not None:
+            if expires > time.monotonic():
+                return None
+            _fp_miss_cache.pop(fingerprint, None)
+
+        gen = _cache_gen
         async with get_session() as session:
-            result = await session.execute(select(Sticker).where(Sticker.sticker_id == sticker_id))
-            return result.scalar_one_or_none()
+            result = await session.execute(_BY_FINGERPRINT_STMT, {"fingerprint": fingerprint})
+            sticker = result.scalar_one_or_none()
+        if sticker is None and gen == _cache_gen:
+            _fp_miss_cache[fingerprint] = time.monotonic() + _MISS_TTL_SEC
+            if len(_fp_miss_cache) > _MISS_CACHE_SIZE:
+                _fp_miss_cache.popitem(last=False)
+        return sticker
 
     @staticmethod
-    async def get_by_fingerprint(fingerprint: str) -> Optional[Sticker]:
-        """按 fingerprint 获取表情包。"""
+    async def list_ids_and_phashes() -> List[Tuple[str, Optional[str]]]:
+        """获取全部表情包的 (sticker_id, phash)（用于构建内存索引）。"""
 
         async with get_session() as session:
-            result = await session.execute(select(Sticker).where(Sticker.fingerprint == fingerprint))
-            return result.scalar_one_or_none()
+            result = await session.execute(select(Sticker.sticker_id, Sticker.phash))
+            return [(row.sticker_id, row.phash) for row in result.all()]
 
     @staticmethod
     async def add(sticker: Sticker) -> Sticker:
@@ -35,9 +148,20 @@ class StickerRepository:
 
         async with get_session() as session:
             session.add(sticker)
+            await _write_intents(session, sticker.sticker_id, sticker.intents, replace=False)
+            await session.commit()
+        _invalidate(sticker.sticker_id, sticker.fingerprint)
+        return sticker
+
+    @staticmethod
+    async def add_core(values: Dict[str, Any]) -> None:
+        """以 Core INSERT 新增表情包记录（热路径：不构造 ORM 实例、不回读）。"""
+
+        async with get_session() as session:
+            await session.execute(insert(Sticker).values(**values))
+            await _write_intents(session, values["sticker_id"], values.get("intents"), replace=False)
             await session.commit()
-            await session.refresh(sticker)
-            return sticker
+        _invalidate(values.get("sticker_id"), values.get("fingerprint"))
 
     @staticmethod
     async def update_status(sticker_id: str, is_enabled: bool, is_banned: bool, ban_reason: Optional[str] = None) -> None:
@@ -51,24 +175,15 @@ class StickerRepository:
             )
             await session.execute(stmt)
             await session.commit()
+        _invalidate(sticker_id)
 
     @staticmethod
     async def list_enabled_by_intent(intent: str, limit: int = 50) -> List[Sticker]:
-        """按意图筛选可用表情包（intents 为逗号分隔字符串）。"""
+        """按意图筛选可用表情包（精确匹配 intents 中的某一项，不区分大小写）。"""
 
-        like = f"%{intent}%"
+        params = {"intent": (intent or "").strip().lower(), "limit": int(limit)}
         async with get_session() as session:
-            stmt = (
-                select(Sticker)
-                .where(
-                    Sticker.is_enabled.is_(True),
-                    Sticker.is_banned.is_(False),
-                    Sticker.intents.is_not(None),
-                    Sticker.intents.like(like),
-                )
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(_ENABLED_BY_INTENT_STMT, params)
             return list(result.scalars().all())
 
     @staticmethod
@@ -76,17 +191,7 @@ class StickerRepository:
         """获取需要进行标签/违规判定的表情包（auto 包且缺少标签/意图）。"""
 
         async with get_session() as session:
-            stmt = (
-                select(Sticker)
-                .where(
-                    Sticker.pack == "auto",
-                    Sticker.is_enabled.is_(True),
-                    Sticker.is_banned.is_(False),
-                    or_(Sticker.tags.is_(None), Sticker.tags == ""),
-                )
-                .limit(limit)
-            )
-            result = await session.execute(stmt)
+            result = await session.execute(_PENDING_TAGGING_STMT, {"limit": int(limit)})
             return list(result.scalars().all())
 
     @staticmethod
@@ -128,4 +233,7 @@ class StickerRepository:
                 .values(**values)
             )
             await session.execute(stmt)
+            if intents is not None:
+                await _write_intents(session, sticker_id, intents, replace=True)
             await session.commit()
+        _invalidate(sticker_id)
@@ -3,12 +3,25 @@
 from __future__ import annotations
 
 import time
-from typing import Optional
+from typing import Optional, cast
 
-from sqlalchemy import desc, select
+from sqlalchemy import CursorResult, Insert, bindparam, delete, desc, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import StickerUsage
-from ..sqlalchemy_engine import get_session
+from ..sqlalchemy_engine import get_session, use_session
+
+# 热路径查询：模块加载时构建一次，调用时只传参数（选表情时每个候选都会查一次）
+_LAST_USED_STMT = (
+    select(StickerUsage.used_at)
+    .where(
+        StickerUsage.scene_type == bindparam("scene_type"),
+        StickerUsage.scene_id == bindparam("scene_id"),
+        StickerUsage.sticker_id == bindparam("sticker_id"),
+    )
+    .order_by(desc(StickerUsage.used_at))
+    .limit(1)
+)
 
 
 class StickerUsageRepository:
@@ -33,24 +46,62 @@ class StickerUsageRepository:
         async with get_session() as session:
             session.add(usage)
             await session.commit()
-            await session.refresh(usage)
             return usage
 
     @staticmethod
-    async def get_last_used_ts(scene_type: str, scene_id: str, sticker_id: str) -> int:
-        """获取某个表情包在场景内最近一次使用时间戳（秒）。"""
+    def add_usage_stmt(
+        sticker_id: str,
+        scene_type: str,
+        scene_id: str,
+        qq_id: Optional[str] = None,
+    ) -> Insert:
+        """构建"新增一条使用记录"的 INSERT 语句（供 DBWriter 合并写入任务使用）。"""
+
+        return insert(StickerUsage).values(
+            sticker_id=sticker_id,
+            scene_type=scene_type,
+            scene_id=scene_id,
+            qq_id=qq_id,
+            used_at=int(time.time()),
+        )
+
+    @staticmethod
+    async def get_last_used_ts(
+        scene_type: str,
+        scene_id: str,
+        sticker_id: str,
+        *,
+        session: Optional[AsyncSession] = None,
+    ) -> int:
+        """获取某个表情包在场景内最近一次使用时间戳（秒）。
+
+        循环中逐个检查冷却时，调用方可传入同一个 session 复用连接。
+        """
+
+        params = {"scene_type": scene_type, "scene_id": scene_id, "sticker_id": sticker_id}
+        async with use_session(session) as s:
+            ts = await s.scalar(_LAST_USED_STMT, params)
+            return int(ts or 0)
+
+    @staticmethod
+    async def purge_before(before_ts: int, batch: int = 5000) -> int:
+        """删除一批 used_at 早于 before_ts 的使用记录，返回删除行数。
+
+        每次最多删除 `batch` 行，调用方循环调用直到返回 0。
+        """
 
         async with get_session() as session:
+            victims = (
+                select(StickerUsage.id)
+                .where(StickerUsage.used_at < before_ts)
+                .limit(batch)
+                .scalar_subquery()
+            )
             stmt = (
-                select(StickerUsage.used_at)
-                .where(
-                    StickerUsage.scene_type == scene_type,
-                    StickerUsage.scene_id == scene_id,
-                    StickerUsage.sticker_id == sticker_id,
-                )
-                .order_by(desc(StickerUsage.used_at))
-                .limit(1)
+                delete(StickerUsage)
+                .where(StickerUsage.id.in_(victims))
+                .execution_options(synchronize_session=False)
             )
-            result = await session.execute(stmt)
-            ts = result.scalar_one_or_none()
-            return int(ts or 0)
+            result = cast(CursorResult, await session.execute(stmt))
+            await session.commit()
+            return int(result.rowcount or 0)
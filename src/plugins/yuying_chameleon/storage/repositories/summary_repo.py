@@ -4,11 +4,20 @@ from __future__ import annotations
 
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select
 
 from ..models import Summary
 from ..sqlalchemy_engine import get_session
 
+# 热路径查询：模块加载时构建一次，调用时只传参数
+_LATEST_BY_SCENE_STMT = (
+    select(Summary)
+    .where(Summary.scene_type == bindparam("scene_type"), Summary.scene_id == bindparam("scene_id"))
+    .order_by(Summary.window_end_ts.desc())
+    .limit(1)
+)
+_BY_ID_STMT = select(Summary).where(Summary.id == bindparam("summary_id"))
+
 class SummaryRepository:
     """摘要仓储。"""
 
@@ -19,7 +28,6 @@ class SummaryRepository:
         async with get_session() as session:
             session.add(summary)
             await session.commit()
-            await session.refresh(summary)
             return summary
 
     @staticmethod
@@ -27,13 +35,9 @@ class SummaryRepository:
         """获取指定场景最新的一条摘要。"""
 
         async with get_session() as session:
-            stmt = (
-                select(Summary)
-                .where(Summary.scene_type == scene_type, Summary.scene_id == scene_id)
-                .order_by(Summary.window_end_ts.desc())
-                .limit(1)
+            result = await session.execute(
+                _LATEST_BY_SCENE_STMT, {"scene_type": scene_type, "scene_id": scene_id}
             )
-            result = await session.execute(stmt)
             return result.scalar_one_or_none()
 
     @staticmethod
@@ -41,5 +45,5 @@ class SummaryRepository:
         """按 id 获取摘要记录。"""
 
         async with get_session() as session:
-            result = await session.execute(select(Summary).where(Summary.id == summary_id))
+            result = await session.execute(_BY_ID_STMT, {"summary_id": summary_id})
             return result.scalar_one_or_none()
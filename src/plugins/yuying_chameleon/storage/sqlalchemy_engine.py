@@ -16,6 +16,8 @@ SQLite优化说明:
 - 同步模式NORMAL: 平衡数据安全和性能
 - busy_timeout: 当数据库被锁定时等待的时间
 - 外键约束: 保证数据完整性
+- temp_store=MEMORY / mmap_size: 临时表放内存、读走内存映射,减少系统调用
+- cache_size: 每个连接的页缓存上限(64MB),热点表常驻内存
 
 关键概念(新手必读):
 - Engine(引擎): 数据库连接池的管理者,整个应用只需一个
@@ -38,6 +40,9 @@ async def some_function():
 
 from __future__ import annotations
 
+# asyncio - 并发执行互不依赖的读查询(gather_reads)
+import asyncio
+
 # contextlib.asynccontextmanager - 异步上下文管理器装饰器
 # 作用: 将async生成器函数转换为可以用async with的对象
 from contextlib import asynccontextmanager
@@ -45,8 +50,8 @@ from contextlib import asynccontextmanager
 # pathlib.Path - 文件路径处理
 from pathlib import Path
 
-# typing.AsyncIterator - 异步迭代器类型提示
-from typing import AsyncIterator
+# typing - 类型提示
+from typing import Any, AsyncIterator, Awaitable, List, Optional
 
 from nonebot import logger  # NoneBot日志记录器
 
@@ -134,14 +139,30 @@ _ensure_sqlite_parent_dir(plugin_config.yuying_database_url)
 # create_async_engine(): 创建SQLAlchemy异步引擎
 # 引擎是整个应用的数据库连接池管理者
 # 一个应用通常只需要一个引擎实例
+# 连接池: 文件型SQLite + aiosqlite 默认使用 AsyncAdaptedQueuePool(pool_size=5, max_overflow=10)
+# - 连接建立后复用,下面的PRAGMA监听器每个连接只执行一次,而不是每次查询都执行
+# - 不要改为 NullPool: 每个会话都会重新建连接、重跑PRAGMA;
+#   内存库(:memory:)由SQLAlchemy自动改用 StaticPool(单连接),无需在此区分
 engine = create_async_engine(
     plugin_config.yuying_database_url,  # 数据库连接URL
     echo=False,  # 是否打印SQL语句(False=不打印,避免日志刷屏)
     future=True,  # 使用SQLAlchemy 2.0的新API风格
+    query_cache_size=2048,  # 编译缓存容量(默认500),覆盖全部仓储查询形态,避免热查询被挤出后重新编译
 )
 
 # ==================== 配置SQLite性能参数 ====================
 
+# 新连接要执行的 PRAGMA 脚本(模块加载时拼接一次,各项含义见 set_sqlite_pragma)
+_PRAGMA_SCRIPT = (
+    "PRAGMA journal_mode=WAL;"  # 启用WAL模式
+    "PRAGMA synchronous=NORMAL;"  # 设置同步级别
+    f"PRAGMA busy_timeout={int(plugin_config.yuying_sqlite_busy_timeout_ms)};"  # 锁等待超时(从配置读取)
+    "PRAGMA foreign_keys=ON;"  # 启用外键约束
+    "PRAGMA temp_store=MEMORY;"  # 临时数据放内存
+    "PRAGMA mmap_size=134217728;"  # 内存映射读取(上限128MB)
+    "PRAGMA cache_size=-64000;"  # 页缓存上限约64MB
+)
+
 # @event.listens_for(): SQLAlchemy事件监听装饰器
 # 监听引擎的"connect"事件 = 每次创建新的数据库连接时触发
 # engine.sync_engine: 获取同步引擎对象(因为PRAGMA设置需要同步API)
@@ -174,6 +195,20 @@ def set_sqlite_pragma(dbapi_connection, _connection_record) -> None:
        - 好处: SQLite默认不检查外键,开启后保证数据完整性
        - 示例: 删除用户时,相关的消息记录也会被级联删除
 
+    5. temp_store=MEMORY
+       - 作用: 排序/临时索引等临时数据放在内存而非临时文件
+       - 好处: ORDER BY / GROUP BY 等查询不再产生临时文件I/O
+
+    6. mmap_size=134217728 (128MB)
+       - 作用: 通过内存映射读取数据库文件
+       - 好处: 读页面时省去read()系统调用与内核到用户态拷贝
+       - 说明: 只是映射上限,不会预先占用内存;平台不支持时SQLite会忽略
+
+    7. cache_size=-64000
+       - 作用: 页缓存上限,负数表示以KiB计(约64MB;默认仅约2MB)
+       - 好处: raw_messages/memories/stickers等热点页留在缓存,减少重复读盘
+       - 说明: 按需增长,不会预先分配
+
     Args:
         dbapi_connection: 底层数据库连接对象(DBAPI层面)
         _connection_record: 连接记录对象(未使用,用_前缀表示)
@@ -183,20 +218,10 @@ def set_sqlite_pragma(dbapi_connection, _connection_record) -> None:
         - 这些设置只对当前连接生效,每个连接都需要重新设置
     """
 
-    # 获取数据库游标(cursor),用于执行SQL命令
-    cursor = dbapi_connection.cursor()
-
-    # 执行PRAGMA命令设置各项参数
-    # cursor.execute(): 执行SQL语句
-    cursor.execute("PRAGMA journal_mode=WAL")  # 启用WAL模式
-    cursor.execute("PRAGMA synchronous=NORMAL")  # 设置同步级别
-    cursor.execute(
-        f"PRAGMA busy_timeout={int(plugin_config.yuying_sqlite_busy_timeout_ms)}"
-    )  # 设置锁等待超时(从配置读取)
-    cursor.execute("PRAGMA foreign_keys=ON")  # 启用外键约束
-
-    # 关闭游标,释放资源
-    cursor.close()
+    # run_async(): 在 aiosqlite 连接上执行一个协程(此处同步等待其完成)
+    # executescript(): 整段 PRAGMA 一次提交给 SQLite 执行,
+    # 只需一次到 aiosqlite 工作线程的往返,而不是每条 PRAGMA 各一次
+    dbapi_connection.run_async(lambda conn: conn.executescript(_PRAGMA_SCRIPT))
 
 
 # ==================== 创建会话工厂 ====================
@@ -214,6 +239,8 @@ AsyncSessionLocal = async_sessionmaker(
 # - 默认情况下,commit后所有对象都会过期(访问属性需要重新查询)
 # - 设为False后,commit后对象仍然可用,不需要重新查询
 # - 适合: 提交后还要继续使用对象的场景
+# - 仓储的 add 系列方法因此不再 commit 后 refresh: 自增主键在 flush 时回填,
+#   所有列默认值都在应用侧(无 server_default),flush 时也已写回对象
 
 # 关于autoflush=False的说明:
 # - flush: 将内存中的修改写入数据库(但不提交事务)
@@ -282,3 +309,59 @@ async def get_session() -> AsyncIterator[AsyncSession]:
             await session.rollback()
             # raise: 重新抛出异常,让调用方知道发生了错误
             raise
+
+
+@asynccontextmanager
+async def use_session(session: Optional[AsyncSession] = None) -> AsyncIterator[AsyncSession]:
+    """复用调用方传入的会话；未传入时等价于 `get_session()`。
+
+    用于仓储的只读方法接受可选 `session` 参数：调用方在循环中批量读取时，
+    可先开一个会话并传入，所有查询共用同一个连接与事务快照，
+    省去每次查询都从连接池取连接、开启/结束隐式事务的开销。
+
+    传入的会话由调用方负责关闭与提交/回滚，这里不做任何处理。
+
+    Examples:
+        >>> async with get_session() as session:
+        ...     for sid in sticker_ids:
+        ...         s = await StickerRepository.get_by_id(sid, session=session)
+    """
+
+    if session is not None:
+        yield session
+        return
+    async with get_session() as own:
+        yield own
+
+
+# gather_reads 同时在途的读查询上限: 连接池常驻 5 个连接,留 1 个给 DBWriter 等写入方
+_READ_CONCURRENCY = asyncio.Semaphore(4)
+
+
+async def _bounded_read(aw: Awaitable[Any]) -> Any:
+    """在并发上限内执行单个读查询。"""
+
+    async with _READ_CONCURRENCY:
+        return await aw
+
+
+async def gather_reads(*aws: Awaitable[Any], return_exceptions: bool = False) -> List[Any]:
+    """并发执行多个互不依赖的仓储读方法,按传入顺序返回结果。
+
+    每个读方法各自从连接池取连接(WAL 下读读互不阻塞),整体耗时约等于最慢的一个,
+    而不是逐个 await 的总和;同时在途的查询数受 `_READ_CONCURRENCY` 限制,
+    不会把连接池占满。
+
+    注意: 只用于直接包裹仓储的读方法;不要把内部还会调用 gather_reads 的协程
+    传进来,嵌套占用并发名额可能互相等待。
+
+    Examples:
+        >>> recent, summary = await gather_reads(
+        ...     RawRepository.get_recent_rows_by_scene(scene_type, scene_id, limit=30),
+        ...     SummaryRepository.get_latest(scene_type, scene_id),
+        ... )
+    """
+
+    return list(
+        await asyncio.gather(*(_bounded_read(aw) for aw in aws), return_exceptions=return_exceptions)
+    )
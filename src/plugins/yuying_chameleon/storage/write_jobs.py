@@ -4,21 +4,109 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from dataclasses import field
-from typing import Awaitable, Callable
+from typing import Awaitable, Callable, ClassVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import IndexJob
 from .repositories.index_jobs_repo import IndexJobRepository
+from .repositories.profile_repo import ProfileRepository
+from .repositories.rate_limit_repo import RateLimitRepository
+from .repositories.sticker_usage_repo import StickerUsageRepository
 
 
 @dataclass(frozen=True, slots=True)
 class AddIndexJobJob:
-    """新增一条 IndexJob。"""
+    """新增一条 IndexJob（可合并：连续的新增共用一次 commit）。"""
+
+    batchable: ClassVar[bool] = True
 
     job: IndexJob
 
     async def execute(self) -> object:
         return await IndexJobRepository.add(self.job)
 
+    async def execute_in(self, session: AsyncSession) -> object:
+        session.add(self.job)
+        return self.job
+
+
+@dataclass(frozen=True, slots=True)
+class IncrementEffectiveCountJob:
+    """用户有效发言计数 +1（可合并：消息突发时连续的计数共用一次 commit）。"""
+
+    batchable: ClassVar[bool] = True
+
+    qq_id: str
+
+    async def execute(self) -> object:
+        return await ProfileRepository.increment_effective_count(self.qq_id)
+
+    async def execute_in(self, session: AsyncSession) -> object:
+        result = await session.execute(ProfileRepository.increment_effective_count_stmt(self.qq_id))
+        return result.scalar_one()
+
+
+@dataclass(frozen=True, slots=True)
+class MarkSentJob:
+    """记录一次机器人发送并刷新冷却（可合并）。"""
+
+    batchable: ClassVar[bool] = True
+
+    scene_type: str
+    scene_id: str
+    cooldown_seconds: int
+
+    async def execute(self) -> object:
+        return await RateLimitRepository.mark_sent(self.scene_type, self.scene_id, self.cooldown_seconds)
+
+    async def execute_in(self, session: AsyncSession) -> object:
+        await session.execute(
+            RateLimitRepository.mark_sent_stmt(self.scene_type, self.scene_id, self.cooldown_seconds)
+        )
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class UpdateIndexJobStatusJob:
+    """写回一个后台任务的处理结果（可合并：同批任务陆续完成时共用一次 commit）。"""
+
+    batchable: ClassVar[bool] = True
+
+    job_id: int
+    status: str
+    next_retry_ts: int = 0
+
+    async def execute(self) -> object:
+        return await IndexJobRepository.update_status(self.job_id, self.status, self.next_retry_ts)
+
+    async def execute_in(self, session: AsyncSession) -> object:
+        await session.execute(IndexJobRepository.update_status_stmt(self.job_id, self.status, self.next_retry_ts))
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class AddStickerUsageJob:
+    """记录一次表情包使用（可合并：与相邻的计数/冷却等写入共用一次 commit）。"""
+
+    batchable: ClassVar[bool] = True
+
+    sticker_id: str
+    scene_type: str
+    scene_id: str
+    qq_id: str | None = None
+
+    async def execute(self) -> object:
+        return await StickerUsageRepository.add_usage(
+            self.sticker_id, self.scene_type, self.scene_id, qq_id=self.qq_id
+        )
+
+    async def execute_in(self, session: AsyncSession) -> object:
+        await session.execute(
+            StickerUsageRepository.add_usage_stmt(self.sticker_id, self.scene_type, self.scene_id, self.qq_id)
+        )
+        return None
+
 
 @dataclass(frozen=True, slots=True)
 class AsyncCallableJob:
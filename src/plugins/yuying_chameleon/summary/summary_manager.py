@@ -224,7 +224,7 @@ class SummaryManager:
 
         # ==================== 步骤6: 查询窗口内的所有消息 ====================
 
-        # await RawRepository.get_messages_by_scene_time_range(): 按时间范围查询消息
+        # RawRepository.iter_contents_by_scene_time_range(): 按时间范围流式查询消息内容
         # - 参数:
         #   * scene_type: 场景类型
         #   * scene_id: 场景标识
@@ -232,20 +232,23 @@ class SummaryManager:
         #   * end_ts: 结束时间
         #   * limit: 最多查询300条(避免过多)
         # - SQL: WHERE scene_type=? AND scene_id=? AND timestamp BETWEEN start AND end
-        # - 返回: RawMessage对象列表
-        messages = await RawRepository.get_messages_by_scene_time_range(
-            scene_type,
-            scene_id,
-            start_ts=window_start,
-            end_ts=window_end,
-            limit=300,  # 限制最多300条消息
-        )
+        # - 只查询content列,逐批产出文本,不构造ORM对象
+        contents = [
+            content
+            async for content in RawRepository.iter_contents_by_scene_time_range(
+                scene_type,
+                scene_id,
+                start_ts=window_start,
+                end_ts=window_end,
+                limit=300,  # 限制最多300条消息
+            )
+        ]
 
         # ==================== 步骤7: 处理消息为空的情况 ====================
 
-        # not messages: 查询结果为空
+        # not contents: 查询结果为空
         # - 可能原因: 窗口内的消息已被清理或数据库异常
-        if not messages:
+        if not contents:
             # 重置窗口状态,开始新的积累周期
             # summary_state_store.reset(): 重置状态
             # - 功能: window_start_ts=now_ts, message_count=0
@@ -255,10 +258,9 @@ class SummaryManager:
         # ==================== 步骤8: 调用LLM生成摘要 ====================
 
         # await SummaryManager.generate_summary(): 生成摘要文本
-        # - 参数: [m.content for m in messages] - 消息内容列表
-        #   * 列表推导式: 提取所有消息的content字段
+        # - 参数: contents - 消息内容列表
         # - 返回: 摘要文本(字符串)
-        summary_text = await SummaryManager.generate_summary([m.content for m in messages])
+        summary_text = await SummaryManager.generate_summary(contents)
 
         # ==================== 步骤9: 创建Summary记录 ====================
 
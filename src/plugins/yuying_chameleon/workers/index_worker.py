@@ -5,7 +5,7 @@ from __future__ import annotations
 import asyncio
 import json
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, cast
 
 import httpx
 from nonebot import logger
@@ -22,6 +22,7 @@ from ..storage.db_writer import db_writer
 from ..storage.write_jobs import AsyncCallableJob
 from ..vector.embedder import embedder
 from ..vector.qdrant_client import qdrant_manager
+from .job_status import set_job_status
 
 
 class IndexWorker:
@@ -93,9 +94,16 @@ class IndexWorker:
         logger.info("IndexWorker 已启动。")
         while True:
             try:
-                jobs = await IndexJobRepository.get_pending_jobs_for_types(
-                    ["msg_chunk", "summary", "memory", "sticker"],
-                    limit=10,
+                jobs = cast(
+                    List[IndexJob],
+                    await db_writer.submit_and_wait(
+                        AsyncCallableJob(
+                            IndexJobRepository.claim_pending,
+                            args=(["msg_chunk", "summary", "memory", "sticker"],),
+                            kwargs={"limit": 10},
+                        ),
+                        priority=5,
+                    ),
                 )
                 if not jobs:
                     await asyncio.sleep(3)
@@ -128,10 +136,6 @@ class IndexWorker:
         - 保证向量化任务不会因图片问题而完全失败
         """
 
-        await db_writer.submit_and_wait(
-            AsyncCallableJob(IndexJobRepository.mark_processing, args=(job.job_id,)),
-            priority=5,
-        )
         try:
             # 获取索引数据（可能包含 image_path）
             collection_name, point_id, text, payload, image_path = await self._build_payload(job)
@@ -167,60 +171,30 @@ class IndexWorker:
             )
 
             # 标记任务完成
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "done")),
-                priority=5,
-            )
+            await set_job_status(job, "done")
         except UnexpectedResponse as exc:
             status = getattr(exc, "status_code", None)
             if status in {400, 401, 403, 404}:
                 logger.error(f"索引任务永久失败（不再重试）job_id={job.job_id}：{exc}")
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "dead")),
-                    priority=5,
-                )
+                await set_job_status(job, "dead")
                 return
             next_ts = IndexJobRepository.compute_backoff_ts(job.retry_count + 1)
             logger.warning(f"索引任务失败，将重试 job_id={job.job_id}：{exc}")
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(
-                    IndexJobRepository.update_status,
-                    args=(job.job_id, "failed"),
-                    kwargs={"next_retry_ts": next_ts},
-                ),
-                priority=5,
-            )
+            await set_job_status(job, "failed", next_ts)
         except httpx.HTTPStatusError as exc:
             # 400/401/403/404 通常是配置或参数问题，重试没有意义，直接标记为 dead，避免日志刷屏
             status = getattr(exc.response, "status_code", None)
             if status in {400, 401, 403, 404}:
                 logger.error(f"索引任务永久失败（不再重试）job_id={job.job_id}：{exc}")
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "dead")),
-                    priority=5,
-                )
+                await set_job_status(job, "dead")
                 return
             next_ts = IndexJobRepository.compute_backoff_ts(job.retry_count + 1)
             logger.warning(f"索引任务失败，将重试 job_id={job.job_id}：{exc}")
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(
-                    IndexJobRepository.update_status,
-                    args=(job.job_id, "failed"),
-                    kwargs={"next_retry_ts": next_ts},
-                ),
-                priority=5,
-            )
+            await set_job_status(job, "failed", next_ts)
         except Exception as exc:
             next_ts = IndexJobRepository.compute_backoff_ts(job.retry_count + 1)
             logger.warning(f"索引任务失败，将重试 job_id={job.job_id}：{exc}")
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(
-                    IndexJobRepository.update_status,
-                    args=(job.job_id, "failed"),
-                    kwargs={"next_retry_ts": next_ts},
-                ),
-                priority=5,
-            )
+            await set_job_status(job, "failed", next_ts)
 
     async def _build_payload(
         self, job: IndexJob
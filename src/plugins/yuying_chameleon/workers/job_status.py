@@ -0,0 +1,19 @@
+"""后台任务结果写回：index/media/sticker 三个 worker 共用。"""
+
+from __future__ import annotations
+
+from ..storage.db_writer import db_writer
+from ..storage.models import IndexJob
+from ..storage.write_jobs import UpdateIndexJobStatusJob
+
+
+async def set_job_status(job: IndexJob, status: str, next_retry_ts: int = 0) -> None:
+    """任务处理完即提交其结果（不等待执行）。
+
+    - 每个任务完成后立即入队，不在内存中攒到整批结束：副作用（向量写入/图片说明/打标）
+      已发生的任务，其 done 状态不会因进程在批次中途退出而丢失；
+    - 写回任务可合并，同一批陆续完成的结果由 DBWriter 合并为一个事务、一次 commit；
+    - 与下一次认领同优先级、按 FIFO 执行，认领前本批结果已全部写回。
+    """
+
+    await db_writer.submit(UpdateIndexJobStatusJob(job.job_id, status, next_retry_ts), priority=5)
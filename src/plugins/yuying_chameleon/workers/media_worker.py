@@ -6,7 +6,7 @@ import asyncio
 import json
 import urllib.request
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, cast
 
 from nonebot import logger
 
@@ -20,6 +20,7 @@ from ..storage.repositories.raw_repo import RawRepository
 from ..storage.write_jobs import AddIndexJobJob, AsyncCallableJob
 from ..storage.db_writer import db_writer
 from ..paths import assets_dir
+from .job_status import set_job_status
 
 
 class MediaWorker:
@@ -39,7 +40,13 @@ class MediaWorker:
         logger.info("MediaWorker 已启动。")
         while True:
             try:
-                jobs = await IndexJobRepository.get_pending_jobs(limit=10, item_type="ocr")
+                jobs = cast(
+                    List[IndexJob],
+                    await db_writer.submit_and_wait(
+                        AsyncCallableJob(IndexJobRepository.claim_pending, args=(["ocr"],), kwargs={"limit": 10}),
+                        priority=5,
+                    ),
+                )
                 if not jobs:
                     await asyncio.sleep(5)
                     continue
@@ -52,10 +59,6 @@ class MediaWorker:
     async def _process_job(self, job: IndexJob) -> None:
         """处理单个媒体预处理任务。"""
 
-        await db_writer.submit_and_wait(
-            AsyncCallableJob(IndexJobRepository.mark_processing, args=(job.job_id,)),
-            priority=5,
-        )
         try:
             payload = json.loads(job.payload_json) if job.payload_json else {}
             media_key = str(payload.get("media_key") or job.ref_id)
@@ -131,21 +134,11 @@ class MediaWorker:
             except Exception as exc:
                 logger.debug(f"回填图片说明到历史消息失败：{exc}")
 
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "done")),
-                priority=5,
-            )
+            await set_job_status(job, "done")
         except Exception as exc:
             next_ts = IndexJobRepository.compute_backoff_ts(job.retry_count + 1)
             logger.warning(f"媒体任务失败，将重试 job_id={job.job_id}：{exc}")
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(
-                    IndexJobRepository.update_status,
-                    args=(job.job_id, "failed"),
-                    kwargs={"next_retry_ts": next_ts},
-                ),
-                priority=5,
-            )
+            await set_job_status(job, "failed", next_ts)
 
     @staticmethod
     def _maybe_local_file(file_path: Optional[str]) -> Optional[str]:
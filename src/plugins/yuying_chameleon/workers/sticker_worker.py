@@ -6,7 +6,7 @@ import asyncio
 import json
 import re
 from pathlib import Path  # 新增：读取文件路径
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, cast
 
 from nonebot import logger
 
@@ -18,6 +18,7 @@ from ..storage.db_writer import db_writer
 from ..storage.repositories.index_jobs_repo import IndexJobRepository
 from ..storage.repositories.sticker_repo import StickerRepository
 from ..storage.write_jobs import AddIndexJobJob, AsyncCallableJob
+from .job_status import set_job_status
 
 
 class StickerWorker:
@@ -37,7 +38,13 @@ class StickerWorker:
         logger.info("StickerWorker 已启动。")
         while True:
             try:
-                jobs = await IndexJobRepository.get_pending_jobs(limit=10, item_type="sticker_tag")
+                jobs = cast(
+                    List[IndexJob],
+                    await db_writer.submit_and_wait(
+                        AsyncCallableJob(IndexJobRepository.claim_pending, args=(["sticker_tag"],), kwargs={"limit": 10}),
+                        priority=5,
+                    ),
+                )
                 if not jobs:
                     await asyncio.sleep(10)
                     continue
@@ -63,10 +70,6 @@ class StickerWorker:
     async def _process_job(self, job: IndexJob) -> None:
         """为一个表情包生成 OCR文字 + tags/intents/style + 违规判定（一次 LLM 调用完成）。"""
 
-        await db_writer.submit_and_wait(
-            AsyncCallableJob(IndexJobRepository.mark_processing, args=(job.job_id,)),
-            priority=5,
-        )
         try:
             payload = json.loads(job.payload_json) if job.payload_json else {}
             sticker_id = str(payload.get("sticker_id") or job.ref_id)
@@ -74,10 +77,7 @@ class StickerWorker:
 
             sticker = await StickerRepository.get_by_id(sticker_id)
             if not sticker:
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "dead")),
-                    priority=5,
-                )
+                await set_job_status(job, "dead")
                 return
 
             # ==================== 准备图片 data URL ====================
@@ -86,10 +86,7 @@ class StickerWorker:
                 image_url = VisionHelper._to_data_url(p.read_bytes(), p.suffix)
             except Exception as exc:
                 logger.error(f"读取表情包图片失败 sticker_id={sticker_id}: {exc}")
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "failed")),
-                    priority=5,
-                )
+                await set_job_status(job, "failed")
                 return
 
             # ==================== 构建 prompt（合并 OCR + 打标签） ====================
@@ -140,19 +137,13 @@ class StickerWorker:
             llm = get_task_llm("sticker_tagging")
             content = await llm.chat_completion(messages, temperature=0.2)
             if not content:
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "failed")),
-                    priority=5,
-                )
+                await set_job_status(job, "failed")
                 return
 
             data = self._extract_first_json_object(content)
             if not isinstance(data, dict):
                 logger.warning(f"StickerWorker 无法解析 JSON: {content[:200]}")
-                await db_writer.submit_and_wait(
-                    AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "failed")),
-                    priority=5,
-                )
+                await set_job_status(job, "failed")
                 return
 
             # ==================== 解析 LLM 输出 ====================
@@ -202,16 +193,10 @@ class StickerWorker:
                 priority=5,
             )
 
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "done")),
-                priority=5,
-            )
+            await set_job_status(job, "done")
         except Exception as exc:
             logger.error(f"StickerWorker 处理任务失败 job_id={job.job_id}：{exc}")
-            await db_writer.submit_and_wait(
-                AsyncCallableJob(IndexJobRepository.update_status, args=(job.job_id, "failed")),
-                priority=5,
-            )
+            await set_job_status(job, "failed")
 
         # sticker 向量索引：在打标完成后写入 index_jobs(item_type=sticker)
 